@@ -116,6 +116,8 @@ setup(
             "matplotlib<3.6.0a0",
         ],
         "database_access": ["psycopg2-binary"],
+        # used for --output-format parquet or feather
+        "columnar_output": ["pyarrow"],
     },
     entry_points={"console_scripts": ["switch = switch_model.main:main"]},
 )
@@ -32,6 +32,13 @@ except ImportError:
     from pyomo.repn import generate_canonical_repn as generate_standard_repn
 
 import switch_model.utilities as utilities
+from switch_model.utilities import (
+    constraint_duals,
+    solution_cache,
+    rebuild_components,
+    update_persistent_constraints,
+    using_persistent_solver,
+)
 
 # TODO: move part of the reporting back into Hawaii module and eliminate these dependencies
 from switch_model.hawaii.save_results import DispatchGenByFuel
@@ -69,7 +76,8 @@ def define_components(m):
 
     # load scipy.optimize; this is done here to avoid loading it during unit tests
     try:
-        global scipy
+        global np, scipy
+        import numpy as np
         import scipy.optimize
     except ImportError:
         print("=" * 80)
@@ -730,23 +738,50 @@ def total_direct_costs_per_year(m, period):
 
 def electricity_marginal_cost(m, z, tp, prod):
     """Return marginal cost of providing product prod in load_zone z during timepoint tp."""
-    if hasattr(m, "zone_balancing_area"):
-        ba = m.zone_balancing_area[z]
+    return electricity_marginal_costs(m)[z, tp, prod]
+
+
+def marginal_cost_constraint(m, prod):
+    """Return the constraint whose duals give the marginal cost of product prod."""
     if prod == "energy":
-        component = m.Zone_Energy_Balance[z, tp]
+        return m.Zone_Energy_Balance
     elif prod == "energy up":
         if hasattr(m, "Limit_DemandResponseSpinningReserveUp"):
-            component = m.Limit_DemandResponseSpinningReserveUp[ba, tp]
+            return m.Limit_DemandResponseSpinningReserveUp
         else:
-            component = m.Satisfy_Spinning_Reserve_Up_Requirement[ba, tp]
+            return m.Satisfy_Spinning_Reserve_Up_Requirement
     elif prod == "energy down":
         if hasattr(m, "Limit_DemandResponseSpinningReserveUp"):
-            component = m.Limit_DemandResponseSpinningReserveDown[ba, tp]
+            return m.Limit_DemandResponseSpinningReserveDown
         else:
-            component = m.Satisfy_Spinning_Reserve_Down_Requirement[ba, tp]
+            return m.Satisfy_Spinning_Reserve_Down_Requirement
     else:
         raise ValueError("Unrecognized electricity product: {}.".format(prod))
-    return m.dual[component] / m.bring_timepoint_costs_to_base_year[tp]
+
+
+def electricity_marginal_costs(m):
+    """
+    Return a dict of marginal costs for each (load_zone, timepoint, product)
+    in the current solution. This is built from the duals of each constraint
+    in bulk, and cached until the next solve.
+    """
+    cache = solution_cache(m)
+    if "electricity_marginal_costs" not in cache:
+        costs = {}
+        for prod in m.DR_PRODUCTS:
+            constraint = marginal_cost_constraint(m, prod)
+            duals = dict(
+                zip(constraint.index_set(), constraint_duals(m, constraint).tolist())
+            )
+            if prod == "energy":
+                zone_key = {z: z for z in m.LOAD_ZONES}
+            else:
+                zone_key = {z: m.zone_balancing_area[z] for z in m.LOAD_ZONES}
+            for z, key in zone_key.items():
+                for tp in m.TIMEPOINTS:
+                    costs[z, tp, prod] = duals[key, tp]
+        cache["electricity_marginal_costs"] = costs
+    return cache["electricity_marginal_costs"]
 
 
 def electricity_demand(m, z, tp, prod):
@@ -865,23 +900,77 @@ def get_bids(m):
     prices = get_prices(m)
 
     # get bids for all load zones and timeseries
+    keys = [(z, ts) for z in m.LOAD_ZONES for ts in m.TIMESERIES]
     bids = []
-    for z in m.LOAD_ZONES:
-        for ts in m.TIMESERIES:
-            demand, wtp = demand_module.bid(m, z, ts, prices[z, ts])
-            # import pdb; pdb.set_trace()
-            if m.options.dr_flat_pricing:
-                # assume demand side will not provide reserves, even if they offered some
-                # (at zero price)
-                for (k, v) in demand.items():
-                    if k != "energy":
-                        for i in range(len(v)):
-                            v[i] = 0.0
-            bids.append((z, ts, prices[z, ts], demand, wtp))
+    for (z, ts), (demand, wtp) in zip(keys, demand_bids(m, keys, prices)):
+        if m.options.dr_flat_pricing:
+            # assume demand side will not provide reserves, even if they offered some
+            # (at zero price)
+            for (k, v) in demand.items():
+                if k != "energy":
+                    for i in range(len(v)):
+                        v[i] = 0.0
+        bids.append((z, ts, prices[z, ts], demand, wtp))
 
     return bids
 
 
+def group_by_length(m, keys):
+    """Divide a list of (load_zone, timeseries) tuples into lists of tuples for
+    timeseries with the same number of timepoints, so the prices and bids for each
+    group can be stacked into arrays. Returns a list of lists of positions in keys."""
+    groups = dict()
+    for i, (z, ts) in enumerate(keys):
+        groups.setdefault(len(m.TPS_IN_TS[ts]), []).append(i)
+    return list(groups.values())
+
+
+def bid_arrays(m, keys, prices):
+    """Get bids from the demand system for a list of (load_zone, timeseries) tuples
+    that all have the same number of timepoints. prices should be a dictionary of
+    stacked price arrays for each product, with one row per item in keys. Returns a
+    dictionary of stacked demand arrays for each product and a vector of willingness
+    to pay. Uses a single call to the demand module's bid_batch() function if it has
+    one, otherwise calls bid() for each load zone and timeseries."""
+    if hasattr(demand_module, "bid_batch"):
+        demand, wtp = demand_module.bid_batch(m, keys, prices)
+        demand = {prod: np.asarray(d, dtype=float) for prod, d in demand.items()}
+        return demand, np.asarray(wtp, dtype=float)
+    bids = [
+        demand_module.bid(m, z, ts, {prod: list(prices[prod][i]) for prod in prices})
+        for i, (z, ts) in enumerate(keys)
+    ]
+    demand = {
+        prod: np.array([d[prod] for (d, wtp) in bids], dtype=float)
+        for prod in bids[0][0]
+    }
+    return demand, np.array([wtp for (d, wtp) in bids], dtype=float)
+
+
+def demand_bids(m, keys, prices):
+    """Get bids from the demand system for each (load_zone, timeseries) in keys, at
+    the hourly prices given for each product in prices[z, ts]. Returns a list of
+    (demand, wtp) tuples, where demand is a dictionary of hourly quantities for each
+    product."""
+    bids = [None] * len(keys)
+    for rows in group_by_length(m, keys):
+        group_keys = [keys[i] for i in rows]
+        demand, wtp = bid_arrays(
+            m,
+            group_keys,
+            {
+                prod: np.array([prices[k][prod] for k in group_keys], dtype=float)
+                for prod in m.DR_PRODUCTS
+            },
+        )
+        for j, i in enumerate(rows):
+            bids[i] = (
+                {prod: d[j].tolist() for prod, d in demand.items()},
+                float(wtp[j]),
+            )
+    return bids
+
+
 # def zone_period_average_marginal_cost(m, load_zone, period):
 #     avg_cost = value(
 #         sum(
@@ -915,10 +1004,10 @@ def find_flat_prices(m, marginal_costs, revenue_neutral):
     # if > 0: decrease price (q will go up across the board)
     # if < 0: increase price (q will go down across the board) but
 
-    flat_prices = dict()
-    for z in m.LOAD_ZONES:
-        for p in m.PERIODS:
-            price_guess = value(
+    zone_periods = [(z, p) for z in m.LOAD_ZONES for p in m.PERIODS]
+    price_guess = np.array(
+        [
+            value(
                 sum(
                     marginal_costs[z, ts]["energy"][i]
                     * electricity_demand(m, z, tp, "energy")
@@ -931,17 +1020,72 @@ def find_flat_prices(m, marginal_costs, revenue_neutral):
                     for tp in m.TPS_IN_PERIOD[p]
                 )
             )
+            for (z, p) in zone_periods
+        ]
+    )
 
-            if revenue_neutral:
-                # find a flat price that produces revenue equal to marginal costs
-                flat_prices[z, p] = scipy.optimize.newton(
-                    revenue_imbalance, price_guess, args=(m, z, p, marginal_costs)
+    if revenue_neutral:
+        # find flat prices that produce revenue equal to marginal costs;
+        # all the zones and periods are solved together, using a single batch
+        # of bids from the demand system for each step
+        keys = [(z, ts) for (z, p) in zone_periods for ts in m.TS_IN_PERIOD[p]]
+        zone_period_index = {zp: n for n, zp in enumerate(zone_periods)}
+        groups = []
+        for rows in group_by_length(m, keys):
+            group_keys = [keys[i] for i in rows]
+            groups.append(
+                (
+                    group_keys,
+                    np.array(
+                        [
+                            zone_period_index[z, m.ts_period[ts]]
+                            for (z, ts) in group_keys
+                        ]
+                    ),
+                    np.array(
+                        [marginal_costs[k]["energy"] for k in group_keys], dtype=float
+                    ),
+                    np.array(
+                        [
+                            [m.ts_duration_of_tp[ts] * m.ts_scale_to_year[ts]]
+                            for (z, ts) in group_keys
+                        ],
+                        dtype=float,
+                    ),
                 )
-            else:
-                # used in final round, when LSE is considered to have
-                # bought the final constructed quantity at the final
-                # marginal cost
-                flat_prices[z, p] = price_guess
+            )
+        # newton() only warns if some elements fail to converge in array
+        # mode, so we check them ourselves. It switches to scalar mode (and
+        # returns a RootResults object) if there is only one zone and period.
+        if len(zone_periods) == 1:
+            root, result = scipy.optimize.newton(
+                lambda x: revenue_imbalance(np.array([x]), m, zone_periods, groups)[0],
+                price_guess[0],
+                full_output=True,
+                disp=False,
+            )
+            price, converged = np.array([root]), [result.converged]
+        else:
+            price, converged, zero_der = scipy.optimize.newton(
+                revenue_imbalance,
+                price_guess,
+                args=(m, zone_periods, groups),
+                full_output=True,
+            )
+        failed = [zp for zp, ok in zip(zone_periods, converged) if not ok]
+        if failed:
+            raise RuntimeError(
+                "Unable to find revenue-neutral flat prices for these load "
+                "zones and periods: {}.".format(
+                    ", ".join("{} {}".format(z, p) for z, p in failed)
+                )
+            )
+    else:
+        # used in final round, when LSE is considered to have
+        # bought the final constructed quantity at the final
+        # marginal cost
+        price = price_guess
+    flat_prices = {zp: float(p) for zp, p in zip(zone_periods, price)}
 
     # construct a collection of flat prices with the right structure
     final_prices = {
@@ -957,36 +1101,38 @@ def find_flat_prices(m, marginal_costs, revenue_neutral):
     return final_prices
 
 
-def revenue_imbalance(flat_price, m, load_zone, period, dynamic_prices):
-    """find demand and revenue that would occur in this load_zone and period with flat prices, and
-    compare to the cost of meeting that demand by purchasing power at the current dynamic prices"""
-    flat_price_revenue = 0.0
-    dynamic_price_revenue = 0.0
-    for ts in m.TS_IN_PERIOD[period]:
+def revenue_imbalance(flat_prices, m, zone_periods, groups):
+    """find demand and revenue that would occur in each load_zone and period with the
+    corresponding flat prices, and compare to the cost of meeting that demand by
+    purchasing power at the current dynamic prices. groups is a list of tuples of
+    (keys, zone_period_index, dynamic_prices, weights) for all the load zones and
+    timeseries with the same number of timepoints, as created by find_flat_prices()."""
+    imbalance = np.zeros(len(zone_periods))
+    for keys, zone_period_index, dynamic_prices, weights in groups:
+        energy_prices = np.repeat(
+            flat_prices[zone_period_index][:, np.newaxis],
+            dynamic_prices.shape[1],
+            axis=1,
+        )
         prices = {
-            prod: [flat_price if prod == "energy" else 0.0] * len(m.TPS_IN_TS[ts])
+            prod: (energy_prices if prod == "energy" else np.zeros(energy_prices.shape))
             for prod in m.DR_PRODUCTS
         }
-        demand, wtp = demand_module.bid(m, load_zone, ts, prices)
-        # flat_price_revenue += sum(
-        #     p * d * m.ts_duration_of_tp[ts] * m.ts_scale_to_year[ts]
-        #     for p, d in zip(prices['energy'], demand['energy']
-        # )
-        flat_price_revenue += flat_price * sum(
-            d * m.ts_duration_of_tp[ts] * m.ts_scale_to_year[ts]
-            for d in demand["energy"]
+        demand, wtp = bid_arrays(m, keys, prices)
+        # difference between dynamic and flat price revenue for each timeseries
+        ts_imbalance = np.sum(
+            (dynamic_prices - energy_prices) * demand["energy"] * weights, axis=1
         )
-        dynamic_price_revenue += sum(
-            p * d * m.ts_duration_of_tp[ts] * m.ts_scale_to_year[ts]
-            for p, d in zip(dynamic_prices[load_zone, ts]["energy"], demand["energy"])
+        imbalance += np.bincount(
+            zone_period_index, weights=ts_imbalance, minlength=len(zone_periods)
         )
-    imbalance = dynamic_price_revenue - flat_price_revenue
 
-    print(
-        "{}, {}: price ${} produces revenue imbalance of ${}/year".format(
-            load_zone, period, flat_price, imbalance
+    for (z, p), price, imb in zip(zone_periods, flat_prices, imbalance):
+        print(
+            "{}, {}: price ${} produces revenue imbalance of ${}/year".format(
+                z, p, price, imb
+            )
         )
-    )
 
     return imbalance
 
@@ -1021,45 +1167,80 @@ def add_bids(m, bids):
     print("len(m.DR_BID_LIST): {l}".format(l=len(m.DR_BID_LIST)))
     print("m.DR_BID_LIST: {b}".format(b=[x for x in m.DR_BID_LIST]))
 
-    # reconstruct the components that depend on m.DR_BID_LIST, m.dr_bid_benefit and m.dr_bid
-    m.DRBidWeight.reconstruct()
-    m.DR_Convex_Bid_Weight.reconstruct()
-    m.DR_Load_Zone_Shared_Bid_Weight.reconstruct()
-    if hasattr(m, "DR_Flat_Bid_Weight"):
-        m.DR_Flat_Bid_Weight.reconstruct()
-    m.FlexibleDemand.reconstruct()
-    m.DemandUpReserveSales.reconstruct()
-    m.DemandDownReserveSales.reconstruct()
-    if hasattr(m, "DemandResponseSlackUp"):
-        m.DemandResponseSlackUp.reconstruct()
-        m.DemandResponseSlackDown.reconstruct()
-    if hasattr(m, "Limit_DemandResponseSpinningReserveUp"):
-        m.Limit_DemandResponseSpinningReserveUp.reconstruct()
-        m.Limit_DemandResponseSpinningReserveDown.reconstruct()
-
-    m.DR_Welfare_Cost.reconstruct()
-    # it seems like we have to reconstruct the higher-level components that depend on these
-    # ones (even though these are Expressions), because otherwise they refer to objects that
-    # used to be returned by the Expression but aren't any more (e.g., versions of DRBidWeight
-    # that no longer exist in the model).
-    # (i.e., Energy_Balance refers to the items returned by FlexibleDemand instead of referring
-    # to FlexibleDemand itself)
-    m.Zone_Energy_Balance.reconstruct()
-    if hasattr(m, "Aggregate_Spinning_Reserve_Details"):
-        m.Aggregate_Spinning_Reserve_Details.reconstruct()
-    if hasattr(m, "Satisfy_Spinning_Reserve_Up_Requirement"):
-        m.Satisfy_Spinning_Reserve_Up_Requirement.reconstruct()
-        m.Satisfy_Spinning_Reserve_Down_Requirement.reconstruct()
-    # reconstruct_energy_balance(m)
-    m.SystemCostPerPeriod.reconstruct()
-    m.SystemCost.reconstruct()
+    # add the new bid to the components that depend on m.DR_BID_LIST,
+    # m.dr_bid_benefit and m.dr_bid
+    add_bid_columns(m, b)
+
+
+def add_bid_columns(m, b):
+    """
+    Add the DRBidWeight variables for bid b to the model, along with their
+    terms in the existing constraints and expressions (column generation).
+    Only the model elements for bid b are created, so the time needed for
+    this doesn't grow as more bids are added. Components that refer to the
+    expressions modified here (e.g., Zone_Energy_Balance or SystemCost) pick
+    up the new terms automatically, so they don't need to be rebuilt.
+    """
+    # accessing a missing index creates the variable
+    weight = {
+        (z, ts): m.DRBidWeight[b, z, ts] for z in m.LOAD_ZONES for ts in m.TIMESERIES
+    }
+    # DR_Convex_Bid_Weight is skipped until the first bid is added
+    first_bid = len(m.DR_Convex_Bid_Weight) == 0
+    new_constraints = []
+    for (z, ts), w in weight.items():
+        if first_bid:
+            new_constraints.append(m.DR_Convex_Bid_Weight[z, ts])
+        else:
+            con = m.DR_Convex_Bid_Weight[z, ts]
+            con.set_value(con.body + w == 1)
+        new_constraints.append(m.DR_Load_Zone_Shared_Bid_Weight[b, z, ts])
+        if hasattr(m, "DR_Flat_Bid_Weight"):
+            new_constraints.append(m.DR_Flat_Bid_Weight[b, z, ts])
+
+    for tp in m.TIMEPOINTS:
+        ts = m.tp_ts[tp]
+        for z in m.LOAD_ZONES:
+            w = weight[z, ts]
+            m.FlexibleDemand[z, tp].expr += w * m.dr_bid[b, z, tp, "energy"]
+            m.DemandUpReserveSales[z, tp].expr -= w * m.dr_bid[b, z, tp, "energy up"]
+            m.DemandDownReserveSales[z, tp].expr -= (
+                w * m.dr_bid[b, z, tp, "energy down"]
+            )
+        m.DR_Welfare_Cost[tp].expr += (
+            (-1.0)
+            * sum(weight[z, ts] * m.dr_bid_benefit[b, z, ts] for z in m.LOAD_ZONES)
+            * m.tp_duration_hrs[tp]
+            / m.ts_num_tps[ts]
+        )
+
+    if using_persistent_solver(m):
+        # send the new columns to the solver, then replace the constraints
+        # that use the expressions modified above (the objective is sent
+        # again before each solve)
+        for w in weight.values():
+            m.solver.add_var(w)
+        for con in new_constraints:
+            m.solver.add_constraint(con)
+        changed = [m.Zone_Energy_Balance]
+        if not first_bid:
+            changed.append(m.DR_Convex_Bid_Weight)
+        for c in [
+            "Limit_DemandResponseSpinningReserveUp",
+            "Limit_DemandResponseSpinningReserveDown",
+            "Satisfy_Spinning_Reserve_Up_Requirement",
+            "Satisfy_Spinning_Reserve_Down_Requirement",
+        ]:
+            if hasattr(m, c):
+                changed.append(getattr(m, c))
+        update_persistent_constraints(m, *changed)
 
 
 def reconstruct_energy_balance(m):
     """Reconstruct Energy_Balance constraint, preserving dual values (if present)."""
     # copy the existing Energy_Balance object
     old_Energy_Balance = dict(m.Zone_Energy_Balance)
-    m.Zone_Energy_Balance.reconstruct()
+    rebuild_components(m, m.Zone_Energy_Balance)
     # TODO: now that this happens just before a solve, there may be no need to
     # preserve duals across the reconstruct().
     if m.iteration_number > 0:
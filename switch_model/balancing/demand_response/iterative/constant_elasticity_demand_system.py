@@ -1,7 +1,7 @@
 from __future__ import division
 
 
-def calibrate(base_data, dr_elasticity_scenario=3):
+def calibrate(m, base_data, dr_elasticity_scenario=None):
     """Accept a list of tuples showing [base hourly loads], and [base hourly prices] for each
     location (load_zone) and date (time_series). Store these for later reference by bid().
     """
@@ -20,10 +20,12 @@ def calibrate(base_data, dr_elasticity_scenario=3):
         (z, ts): np.array(base_prices, float)
         for (z, ts, base_loads, base_prices) in base_data
     }
+    if dr_elasticity_scenario is None:
+        dr_elasticity_scenario = getattr(m.options, "dr_elasticity_scenario", 3)
     elasticity_scenario = dr_elasticity_scenario
 
 
-def bid(load_zone, time_series, prices):
+def bid(m, load_zone, time_series, prices):
     """Accept a vector of current prices, for a particular location (load_zone) and day (time_series).
     Return a tuple showing hourly load levels and willingness to pay for those loads (relative to the
     loads achieved at the base_price).
@@ -32,22 +34,44 @@ def bid(load_zone, time_series, prices):
     substitution between hours (this part is called "elastic load" below), and the rest of the load is inelastic
     in total volume, but schedules itself to the cheapest hours (this part is called "shiftable load")."""
 
+    demand, wtp = bid_batch(
+        m,
+        [(load_zone, time_series)],
+        {prod: np.array([p], float) for prod, p in prices.items()},
+    )
+    return ({prod: d[0].tolist() for prod, d in demand.items()}, float(wtp[0]))
+
+
+def bid_batch(m, keys, prices):
+    """Accept a list of (load_zone, time_series) tuples and a dictionary of stacked
+    price arrays for each product, with one row per item in keys and one column per
+    timepoint. Return a tuple showing stacked hourly load levels for each product
+    (same shape as prices) and a vector of willingness to pay for those loads, as
+    described in bid(). This demand system doesn't offer reserves, so the quantities
+    for products other than energy are always zero."""
+
     elasticity = 0.1
     shiftable_share = 0.1 * elasticity_scenario  # 1-3
 
-    # convert prices to a numpy vector, and make non-zero
+    # convert prices to a numpy array, and make non-zero
     # to avoid errors when raising to a negative power
-    p = np.maximum(1.0, np.array(prices, float))
+    p = np.maximum(1.0, np.asarray(prices["energy"], float))
 
-    # get vectors of base loads and prices for this location and date
-    bl = base_load_dict[load_zone, time_series]
-    bp = base_price_dict[load_zone, time_series]
+    # get arrays of base loads and prices for these locations and dates
+    bl = np.array([base_load_dict[k] for k in keys], float)
+    bp = np.array([base_price_dict[k] for k in keys], float)
 
     # spread shiftable load among all minimum-cost hours,
     # shaped like the original load during those hours (so base prices result in base loads)
-    mins = p == np.min(p)
-    shiftable_load = np.zeros(len(p))
-    shiftable_load[mins] = bl[mins] * shiftable_share * np.sum(bl) / sum(bl[mins])
+    mins = p == np.min(p, axis=1, keepdims=True)
+    shiftable_load = np.where(
+        mins,
+        bl
+        * shiftable_share
+        * np.sum(bl, axis=1, keepdims=True)
+        / np.sum(bl * mins, axis=1, keepdims=True),
+        0.0,
+    )
 
     # the shiftable load is inelastic, so wtp is the same high number, regardless of when the load is served
     # so _relative_ wtp is always zero
@@ -60,14 +84,16 @@ def bid(load_zone, time_series, prices):
     # if p < bp, consumer surplus decreases as we move from p to bp, so cs_p - cs_p0
     # (given by this integral) is positive.
     elastic_load_cs_diff = np.sum(
-        (1 - (p / bp) ** (1 - elasticity)) * bp * elastic_base_load / (1 - elasticity)
+        (1 - (p / bp) ** (1 - elasticity)) * bp * elastic_base_load / (1 - elasticity),
+        axis=1,
     )
     # _relative_ amount actually paid for elastic load under current price, vs base price
-    base_elastic_load_paid = np.sum(bp * elastic_base_load)
-    elastic_load_paid = np.sum(p * elastic_load)
+    base_elastic_load_paid = np.sum(bp * elastic_base_load, axis=1)
+    elastic_load_paid = np.sum(p * elastic_load, axis=1)
     elastic_load_paid_diff = elastic_load_paid - base_elastic_load_paid
 
-    demand = shiftable_load + elastic_load
+    demand = {prod: np.zeros(p.shape) for prod in prices}
+    demand["energy"] = shiftable_load + elastic_load
     wtp = shiftable_load_wtp + elastic_load_cs_diff + elastic_load_paid_diff
 
     return (demand, wtp)
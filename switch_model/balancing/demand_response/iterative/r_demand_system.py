@@ -127,6 +127,48 @@ def bid(m, load_zone, timeseries, prices):
     return (demand, wtp)
 
 
+def bid_batch(m, keys, prices):
+    """Accept a list of (load_zone, time_series) tuples and a dictionary of stacked
+    price arrays for each product, with one row per item in keys and one column per
+    hour. Return a tuple showing stacked hourly load levels for each product and a
+    vector of willingness to pay for those loads.
+
+    If the R script provides a bid_batch() function, all the bids are calculated with
+    a single call to it. It should accept vectors of load zones and time series, price
+    matrices for energy, up reserves and down reserves (one row per bid) and the
+    elasticity scenario, and return a list of the corresponding energy, up reserve and
+    down reserve matrices and a vector of willingness to pay. Otherwise, the R bid()
+    function is called for each load zone and time series."""
+
+    if r("exists('bid_batch')")[0]:
+        result = r.bid_batch(
+            np.array([str(z) for (z, ts) in keys]),
+            np.array([str(ts) for (z, ts) in keys]),
+            np.asarray(prices["energy"], dtype=float),
+            np.asarray(prices["energy up"], dtype=float),
+            np.asarray(prices["energy down"], dtype=float),
+            m.options.dr_elasticity_scenario,
+        )
+        demand = {
+            "energy": np.asarray(result[0]),
+            "energy up": np.asarray(result[1]),
+            "energy down": np.asarray(result[2]),
+        }
+        wtp = np.asarray(result[3])
+    else:
+        bids = [
+            bid(m, z, ts, {prod: prices[prod][i] for prod in prices})
+            for i, (z, ts) in enumerate(keys)
+        ]
+        demand = {
+            prod: np.array([d[prod] for (d, w) in bids], dtype=float)
+            for prod in ["energy", "energy up", "energy down"]
+        }
+        wtp = np.array([w for (d, w) in bids], dtype=float)
+
+    return (demand, wtp)
+
+
 def test_calib():
     """Test calibration routines with sample data. Results should match r.test_calib()."""
     base_data = [
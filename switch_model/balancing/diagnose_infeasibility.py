@@ -14,7 +14,41 @@ the model becomes infeasible when specifying `--no-relax Constraint1
 Constraint2`, we know that Constraint1 and Constraint2 cannot be satisfied at
 the same time. Users should then look for inconsistencies in the data used for
 these two constraints.
+
+For large models, relaxing every constraint can double the size of the model
+and still leave many violations to sort through. As an alternative, run
+"switch solve --diagnose-infeasibility" without adding this module. If the
+model turns out to be infeasible, find_conflict() then searches for a minimal
+set of constraints that cannot all be satisfied together:
+
+1. The constraint matrix is relaxed with one pair of slack columns for each
+   constraint family (indexed constraint), shared by all the rows in that
+   family, and the total violation is minimized once (without integer
+   restrictions). This adds only a few columns, even for large models. If
+   the shared slacks cannot make the model feasible (e.g., when the variable
+   bounds prevent some rows in a family from following the others), each
+   constraint is given its own pair of slack columns instead. Families that
+   need any slack become the candidates for the search.
+
+2. If the candidate families are infeasible on their own, the search is
+   restricted to them; otherwise (e.g., if the conflict only appears with
+   integer restrictions) all families are searched. A deletion filter drops
+   whole families that are not needed to keep the model infeasible, testing
+   the non-candidate and least violated families first, then drops
+   individual constraints from the families that remain, testing the least
+   violated ones first. Each trial is a feasibility check with the HiGHS
+   solver included with scipy; trials are tested in chunks of decreasing
+   size, and chunks can be tested in parallel with --diagnose-jobs.
+
+The remaining constraints are written to infeasibility_conflict.csv in the
+outputs directory, ranked by their violation in the relaxed model. Variable
+bounds are never removed, so they may also be part of the conflict.
 """
+import csv
+import math
+import multiprocessing
+import os
+
 from switch_model.utilities import make_iterable
 import pyomo.environ as pyo
 
@@ -28,6 +62,10 @@ relax_var_dir = {1: "up", -1: "down"}
 # can just check to see which deactivated constraints are violated after solving
 # the model.
 
+# data for the feasibility trials, shared with worker processes when they are
+# forked
+_lp = None
+
 # Note: this module mostly doesn't distinguish between indexed and scalar
 # constraints, but Pyomo generally presents scalar constraints as having an
 # indexing set of [None], which can then be used as an index on the scalar
@@ -226,3 +264,240 @@ def assign_relaxation_prices(m):
     # is not very useful and makes solutions much slower.
     m.Total_Constraint_Relaxations = pyo.Objective(rule=cost_rule, sense=pyo.minimize)
     m.Minimize_System_Cost.deactivate()
+
+
+def add_diagnosis_args(parser):
+    parser.add_argument(
+        "--diagnose-infeasibility",
+        default=False,
+        action="store_true",
+        help="""
+            If the model is infeasible, search for a minimal set of constraints
+            that cannot all be satisfied together and write it to
+            infeasibility_conflict.csv in the outputs directory (see {}).
+            Requires scipy 1.9 or later.
+        """.format(
+            __name__
+        ),
+    )
+    parser.add_argument(
+        "--diagnose-jobs",
+        type=int,
+        default=1,
+        help="""
+            Number of feasibility trials to run at the same time during
+            --diagnose-infeasibility, in separate processes (default is 1).
+            Not available on Windows.
+        """,
+    )
+
+
+def report_conflict(m):
+    """
+    Find a minimal set of conflicting constraints in infeasible model instance
+    m, log it and write it to infeasibility_conflict.csv in the outputs
+    directory.
+    """
+    conflict = find_conflict(m, m.options.diagnose_jobs)
+    if not conflict:
+        return
+    if not os.path.isdir(m.options.outputs_dir):
+        os.makedirs(m.options.outputs_dir)
+    path = os.path.join(m.options.outputs_dir, "infeasibility_conflict.csv")
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["rank", "constraint", "family", "lower", "upper", "violation"])
+        for rank, (con, family, violation) in enumerate(conflict, start=1):
+            w.writerow([rank, con.name, family, con.lb, con.ub, violation])
+    m.logger.error(
+        f"These {len(conflict)} constraints cannot all be satisfied together "
+        "(most violated in the relaxed model first):"
+    )
+    for con, family, violation in conflict:
+        m.logger.error(f"  {con.name} (violated by {violation:.4g} units)")
+    m.logger.error(f"Wrote {path}.")
+
+
+def find_conflict(m, jobs=1):
+    """
+    Return a list of (constraint, family name, violation) for a minimal set of
+    constraints in model instance m that cannot all be satisfied at the same
+    time, ranked by their violation in the relaxed model. Returns an empty
+    list if no conflict can be found (e.g., if the variable bounds alone are
+    inconsistent or HiGHS finds the model feasible).
+    """
+    global _lp, np
+    import numpy as np
+    import scipy.sparse
+    from concurrent.futures import ProcessPoolExecutor
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from switch_model.matrix import build_matrix
+
+    _lp = lp = build_matrix(m)
+    A = lp["A"]
+    n_rows, n_cols = A.shape
+    families = [con.parent_component().name for con in lp["constraints"]]
+    m.logger.info(
+        f"\nSearching for conflicting constraints among {n_rows} constraints in "
+        f"{len(set(families))} families..."
+    )
+
+    rows = {}
+    for i, f in enumerate(families):
+        rows.setdefault(f, []).append(i)
+    rows = {f: np.array(r) for f, r in rows.items()}
+
+    def relax(groups, n_groups):
+        # relax the rows with a shared pair of slack columns for each group
+        # and minimize the total violation
+        slack = scipy.sparse.csr_matrix(
+            (np.ones(n_rows), (np.arange(n_rows), groups)), shape=(n_rows, n_groups)
+        )
+        return milp(
+            np.concatenate([np.zeros(n_cols), np.ones(2 * n_groups)]),
+            bounds=Bounds(
+                np.concatenate([lp["col_lb"], np.zeros(2 * n_groups)]),
+                np.concatenate([lp["col_ub"], np.full(2 * n_groups, np.inf)]),
+            ),
+            constraints=LinearConstraint(
+                scipy.sparse.hstack([A, slack, -slack], format="csr"),
+                lp["row_lb"],
+                lp["row_ub"],
+            ),
+        )
+
+    family_index = {f: k for k, f in enumerate(rows)}
+    res = relax([family_index[f] for f in families], len(rows))
+    if res.x is None:
+        # A shared slack can't relax rows in the same family that need to
+        # move by different amounts if the variable bounds get in the way,
+        # so try again with a separate pair of slack columns for each row.
+        m.logger.info(
+            "Unable to relax the model with one slack per constraint family; "
+            "relaxing each constraint separately."
+        )
+        res = relax(np.arange(n_rows), n_rows)
+    if res.x is None:
+        m.logger.error(
+            "Unable to relax the model; the bounds on the variables may be "
+            "inconsistent."
+        )
+        return []
+    # violation of each row at the relaxed solution (positive if the row
+    # activity is below its lower bound, negative if above its upper bound)
+    activity = A @ res.x[:n_cols]
+    violation = np.maximum(lp["row_lb"] - activity, 0) - np.maximum(
+        activity - lp["row_ub"], 0
+    )
+    violation[abs(violation) <= 1e-9] = 0.0
+    family_violation = {f: float(abs(violation[r]).sum()) for f, r in rows.items()}
+    candidates = [f for f, v in family_violation.items() if v > 0]
+    if candidates:
+        m.logger.info(
+            "Constraint families violated in the relaxed model: "
+            + ", ".join(candidates)
+        )
+
+    n_procs = jobs
+    if n_procs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        m.logger.warning(
+            "WARNING: --diagnose-jobs is not supported on this platform; "
+            "running feasibility trials one at a time."
+        )
+        n_procs = 1
+    pool = None
+    if n_procs > 1:
+        pool = ProcessPoolExecutor(
+            n_procs, mp_context=multiprocessing.get_context("fork")
+        )
+
+    def deletion_filter(units):
+        # Remove chunks of units (arrays of row numbers) as long as the rows
+        # that remain are still infeasible, starting with large chunks and
+        # moving to single units. Units earlier in the list are more likely
+        # to be removed.
+        current = list(units)
+        granularity = min(len(current), max(2, n_procs))
+        while current:
+            size = math.ceil(len(current) / granularity)
+            chunks = [
+                range(k, min(k + size, len(current)))
+                for k in range(0, len(current), size)
+            ]
+            trials = [
+                np.concatenate(
+                    [u for k, u in enumerate(current) if k not in chunk]
+                    + [np.array([], dtype=int)]
+                )
+                for chunk in chunks
+            ]
+            results = (pool.map if pool else map)(is_infeasible, trials)
+            removed = next(
+                (chunk for chunk, infeasible in zip(chunks, results) if infeasible),
+                None,
+            )
+            if removed is not None:
+                current = [u for k, u in enumerate(current) if k not in removed]
+                granularity = min(len(current), max(2, n_procs, granularity - 1))
+            elif size == 1:
+                break
+            else:
+                granularity = min(len(current), 2 * granularity)
+        return current
+
+    try:
+        if not is_infeasible(np.arange(n_rows)):
+            m.logger.error(
+                "HiGHS found the model to be feasible, so no conflicting "
+                "constraints could be identified."
+            )
+            return []
+        # drop whole families first, then individual constraints; only the
+        # candidate families are searched if they are infeasible on their own
+        search = rows
+        if candidates and is_infeasible(np.concatenate([rows[f] for f in candidates])):
+            search = candidates
+        else:
+            m.logger.info(
+                "The violated constraint families are feasible on their own; "
+                "searching all constraint families."
+            )
+        order = sorted(search, key=lambda f: (f in candidates, family_violation[f], f))
+        kept = deletion_filter([rows[f] for f in order])
+        kept_rows = np.sort(np.concatenate(kept + [np.array([], dtype=int)]))
+        m.logger.info(
+            f"{len(kept)} constraint families are needed to make the model "
+            f"infeasible, with {len(kept_rows)} constraints; searching for a "
+            "minimal set of constraints..."
+        )
+        kept_rows = kept_rows[np.argsort(abs(violation[kept_rows]), kind="stable")]
+        conflict = np.concatenate(
+            deletion_filter([np.array([i]) for i in kept_rows])
+            + [np.array([], dtype=int)]
+        )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    conflict = sorted(conflict.tolist(), key=lambda i: -abs(violation[i]))
+    return [(lp["constraints"][i], families[i], float(violation[i])) for i in conflict]
+
+
+def is_infeasible(rows):
+    """
+    Return True if the problem in _lp is infeasible when only the constraints
+    with the specified row numbers are included.
+    """
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    res = milp(
+        np.zeros(_lp["A"].shape[1]),
+        integrality=_lp["integrality"],
+        bounds=Bounds(_lp["col_lb"], _lp["col_ub"]),
+        constraints=(
+            LinearConstraint(_lp["A"][rows], _lp["row_lb"][rows], _lp["row_ub"][rows])
+            if len(rows)
+            else None
+        ),
+    )
+    return res.status == 2
@@ -230,8 +230,8 @@ def define_components(model):
         GENS = [
             g
             for z in ZONES
-            for g in m.GENS_IN_ZONE[z]
-            if (g, t) in m.GEN_TPS and m.gen_can_provide_cap_reserves[g]
+            for g in m.GENS_IN_ZONE_TP[z, t]
+            if m.gen_can_provide_cap_reserves[g]
         ]
         STORAGE_GENS = getattr(m, "STORAGE_GENS", set())
         for g in GENS:
@@ -0,0 +1,24 @@
+# Copyright (c) 2015-2022 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0, which is in the LICENSE file.
+
+"""
+Benchmark Switch on synthetic models of increasing size.
+
+The main entry point is the switch console tool. See:
+    switch benchmark --help
+
+This generates a ladder of synthetic input directories (see
+switch_model.benchmark.synthetic), times each phase of a Switch run on them
+(create_model, load_inputs, construct_instance, pre_solve, write_problem,
+solve and post_solve) and writes the results to a JSON file. It also reports
+how fast the time for each phase grows relative to the size of the model, and
+can compare the results to a file saved by an earlier version of Switch.
+
+API Synopsis:
+    from switch_model.benchmark import generate_inputs, run_phases
+
+    generate_inputs("big/inputs", zones=30, timepoints=8760)
+    print(run_phases("big", solver="gurobi"))
+"""
+from .runner import main, run_phases, scaling_report, compare_results
+from .synthetic import generate_inputs
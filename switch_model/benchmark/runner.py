@@ -0,0 +1,313 @@
+# Copyright (c) 2015-2022 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0, which is in the LICENSE file.
+
+"""
+Time each phase of a Switch run on a ladder of synthetic models of increasing
+size, and report phases whose time grows faster than the size of the model.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import switch_model
+from switch_model.benchmark.synthetic import generate_inputs
+from switch_model.utilities import StepTimer, create_model, max_rss_mb
+
+phases = [
+    "create_model",
+    "load_inputs",
+    "construct_instance",
+    "pre_solve",
+    "write_problem",
+    "solve",
+    "post_solve",
+]
+
+size_params = [
+    "zones",
+    "projects",
+    "build_years",
+    "periods",
+    "timepoints",
+    "storage_share",
+    "transmission_density",
+]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="switch benchmark",
+        description="""
+            Generate synthetic models of increasing size, time each phase of
+            building, solving and reporting on them, and write the results
+            to a JSON file that can be compared between versions of Switch.
+        """,
+    )
+    parser.add_argument("--zones", type=int, default=3)
+    parser.add_argument(
+        "--projects", type=int, default=6, help="Projects per zone (default is 6)."
+    )
+    parser.add_argument(
+        "--build-years",
+        type=int,
+        default=2,
+        help="Existing vintages of each project (default is 2).",
+    )
+    parser.add_argument("--periods", type=int, default=2)
+    parser.add_argument(
+        "--timepoints",
+        type=int,
+        default=24,
+        help="Timepoints per period (default is 24).",
+    )
+    parser.add_argument("--storage-share", type=float, default=0.2)
+    parser.add_argument("--transmission-density", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scales",
+        type=float,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="""
+            Multiples of the base size to run (default is 1 2 4 8); each
+            parameter named in --scale-params is multiplied by these.
+        """,
+    )
+    parser.add_argument(
+        "--scale-params",
+        nargs="+",
+        default=["zones", "timepoints"],
+        choices=["zones", "projects", "build_years", "periods", "timepoints"],
+        help="Size parameters to scale (default is zones and timepoints).",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=1,
+        help="Number of times to run each size; the fastest time is reported.",
+    )
+    parser.add_argument("--solver", default="glpk")
+    parser.add_argument(
+        "--no-solve",
+        default=False,
+        action="store_true",
+        help="Skip the solve and post_solve phases.",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="""
+            Directory to keep the synthetic inputs and outputs in (default
+            is a temporary directory that is deleted afterwards).
+        """,
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmark_results.json",
+        help='File to write the results to (default is "benchmark_results.json").',
+    )
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="""
+            Results file from an earlier run to compare against; the command
+            fails if any phase is more than --tolerance slower.
+        """,
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown relative to --baseline (default is 0.25).",
+    )
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        default=1.3,
+        help="""
+            Report phases whose time grows faster than (model size) ** this
+            between sizes (default is 1.3).
+        """,
+    )
+    options = parser.parse_args(args)
+
+    work_dir = options.work_dir or tempfile.mkdtemp(prefix="switch_benchmark_")
+    results = []
+    try:
+        for scale in options.scales:
+            sizes = {p: getattr(options, p) for p in size_params}
+            for p in options.scale_params:
+                sizes[p] = max(1, int(round(sizes[p] * scale)))
+            case_dir = os.path.join(work_dir, f"scale_{scale:g}")
+            generate_inputs(
+                os.path.join(case_dir, "inputs"), seed=options.seed, **sizes
+            )
+            for repeat in range(options.repeats):
+                for r in run_phases(case_dir, options.solver, not options.no_solve):
+                    r.update(sizes, scale=scale, repeat=repeat)
+                    results.append(r)
+                    print(f"scale {scale:g}: {r['phase']:<20} {r['seconds']:8.2f} s")
+                    sys.stdout.flush()
+    finally:
+        if options.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(options.output, "w") as f:
+        json.dump(
+            {
+                "switch_version": switch_model.__version__,
+                "commit": get_commit(),
+                "options": vars(options),
+                "results": results,
+            },
+            f,
+            indent=1,
+        )
+    print(f"\nWrote {options.output}.")
+
+    for line in scaling_report(results, options.max_exponent):
+        print(line)
+    if options.baseline is not None:
+        with open(options.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_results(baseline, results, options.tolerance)
+        for line in regressions:
+            print(line)
+        if regressions:
+            return 1
+    return 0
+
+
+def run_phases(case_dir, solver, solve=True):
+    """
+    Run each phase of a Switch model for the inputs in case_dir/inputs and
+    return a list of dicts showing the time for each one, with the number of
+    variables and constraints in the model and the peak memory used so far.
+    """
+    from pyomo.environ import Constraint, Var
+    import switch_model.solve
+
+    inputs_dir = os.path.join(case_dir, "inputs")
+    outputs_dir = os.path.join(case_dir, "outputs")
+    args = [
+        "--inputs-dir",
+        inputs_dir,
+        "--outputs-dir",
+        outputs_dir,
+        "--module-list",
+        os.path.join(inputs_dir, "modules.txt"),
+        "--solver",
+        solver,
+        "--log-level",
+        "warning",
+    ]
+    if not os.path.isdir(outputs_dir):
+        os.makedirs(outputs_dir)
+    results = []
+    timer = StepTimer()
+
+    def record(phase):
+        results.append(
+            dict(phase=phase, seconds=timer.step_time(), max_rss_mb=max_rss_mb())
+        )
+
+    model = create_model(switch_model.solve.get_module_list(args), args=args)
+    record("create_model")
+    data = model.read_inputs()
+    record("load_inputs")
+    instance = model.construct_instance(data)
+    record("construct_instance")
+    instance.pre_solve()
+    record("pre_solve")
+    instance.write(
+        os.path.join(outputs_dir, "problem.lp"),
+        io_options={"symbolic_solver_labels": False},
+    )
+    record("write_problem")
+    if solve:
+        switch_model.solve.solve(instance)
+        record("solve")
+        instance.post_solve()
+        record("post_solve")
+
+    n_vars = sum(1 for v in instance.component_data_objects(Var))
+    n_cons = sum(1 for c in instance.component_data_objects(Constraint))
+    for r in results:
+        r.update(variables=n_vars, constraints=n_cons)
+    return results
+
+
+def get_commit():
+    """Return the git commit of the Switch code being benchmarked, if known."""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(switch_model.__file__),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def best_times(results):
+    """Return {(scale, phase): (fastest time, variables)} for a set of results."""
+    best = {}
+    for r in results:
+        key = (r["scale"], r["phase"])
+        if key not in best or r["seconds"] < best[key][0]:
+            best[key] = (r["seconds"], r["variables"])
+    return best
+
+
+def scaling_report(results, max_exponent, min_seconds=0.1):
+    """
+    Return lines describing how the time for each phase grows with the number
+    of variables in the model, flagging steps where it grows faster than
+    variables ** max_exponent (ignoring phases that take less than
+    min_seconds).
+    """
+    best = best_times(results)
+    scales = sorted({s for s, p in best})
+    lines = ["\nScaling exponents (time growth vs. model size):"]
+    for phase in phases:
+        steps = [s for s in scales if (s, phase) in best]
+        exponents = []
+        for s1, s2 in zip(steps[:-1], steps[1:]):
+            (t1, n1), (t2, n2) = best[s1, phase], best[s2, phase]
+            if n2 == n1 or t1 <= 0 or t2 <= 0:
+                continue
+            e = math.log(t2 / t1) / math.log(n2 / n1)
+            flag = " *" if e > max_exponent and t2 >= min_seconds else ""
+            exponents.append(f"{e:5.2f}{flag}")
+        if exponents:
+            lines.append(f"  {phase:<20} " + "  ".join(exponents))
+    if any(line.endswith("*") for line in lines):
+        lines.append(f"  * grows faster than model size ** {max_exponent}")
+    return lines
+
+
+def compare_results(baseline, results, tolerance, min_seconds=0.1):
+    """
+    Return a list of lines describing phases that are more than tolerance
+    slower in results than in baseline (ignoring phases that take less than
+    min_seconds).
+    """
+    old, new = best_times(baseline), best_times(results)
+    lines = []
+    for key in sorted(set(old) & set(new)):
+        t_old, t_new = old[key][0], new[key][0]
+        if t_new >= min_seconds and t_new > (1 + tolerance) * t_old:
+            lines.append(
+                f"Regression at scale {key[0]:g}, {key[1]}: "
+                f"{t_old:.2f} s -> {t_new:.2f} s"
+            )
+    return lines
@@ -0,0 +1,349 @@
+# Copyright (c) 2015-2022 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2.0, which is in the LICENSE file.
+
+"""
+Generate synthetic but valid input directories of any size, for benchmarking.
+
+The generated models use the modules in synthetic_modules: a capacity
+expansion model with fuel-burning, variable renewable and storage projects in
+each zone, simple fuel costs and transport-model transmission. Every zone can
+build unlimited gas capacity, so the models are always feasible. The data are
+random but reproducible for a given seed.
+"""
+import csv
+import math
+import os
+import random
+
+import switch_model
+
+synthetic_modules = [
+    "switch_model",
+    "switch_model.timescales",
+    "switch_model.financials",
+    "switch_model.balancing.load_zones",
+    "switch_model.energy_sources.properties",
+    "switch_model.generators.core.build",
+    "switch_model.generators.core.dispatch",
+    "switch_model.reporting",
+    "switch_model.generators.core.no_commit",
+    "switch_model.energy_sources.fuel_costs.simple",
+    "switch_model.transmission.transport.build",
+    "switch_model.transmission.transport.dispatch",
+    "switch_model.generators.extensions.storage",
+]
+
+# technology settings: energy source, heat rate, variable O&M, overnight cost,
+# fixed O&M, variable?, baseload?, max age, forced outage rate
+technologies = {
+    "Gas_CC": ("NaturalGas", 7.0, 3.5, 1100000.0, 12000.0, 0, 0, 30, 0.04),
+    "Gas_CT": ("NaturalGas", 10.5, 4.5, 800000.0, 8000.0, 0, 0, 30, 0.05),
+    "Coal_ST": ("Coal", 9.5, 4.0, 2700000.0, 21000.0, 0, 1, 40, 0.06),
+    "Wind": ("Wind", None, 0.0, 1500000.0, 30000.0, 1, 0, 25, 0.02),
+    "Solar": ("Solar", None, 0.0, 1200000.0, 20000.0, 1, 0, 25, 0.01),
+}
+fuels = {"NaturalGas": (0.05306, 4.0), "Coal": (0.09552, 2.0)}  # CO2, $/MMBtu
+
+
+def generate_inputs(
+    inputs_dir,
+    zones=3,
+    projects=6,
+    build_years=2,
+    periods=2,
+    timepoints=24,
+    storage_share=0.2,
+    transmission_density=0.5,
+    seed=0,
+):
+    """
+    Write a synthetic input directory to inputs_dir.
+
+    zones: number of load zones
+    projects: number of generation projects in each zone
+    build_years: number of existing vintages of each non-storage project,
+        built before the first period (new capacity can also be built in
+        each period)
+    periods: number of investment periods (10 years each, starting in 2020)
+    timepoints: number of timepoints per period; these are grouped into
+        daily timeseries with up to 24 hourly timepoints each
+    storage_share: fraction of the projects in each zone that are batteries
+    transmission_density: fraction of all possible pairs of zones that are
+        connected by a transmission line (zones are always connected in a
+        chain, so the minimum is zones - 1 lines)
+    seed: seed for the random number generator
+
+    Returns the number of rows written to each file, as a dict.
+    """
+    rand = random.Random(seed)
+    if not os.path.isdir(inputs_dir):
+        os.makedirs(inputs_dir)
+    row_counts = {}
+
+    def write(file, header, rows):
+        rows = list(rows)
+        with open(os.path.join(inputs_dir, file), "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(rows)
+        row_counts[file] = len(rows)
+
+    with open(os.path.join(inputs_dir, "modules.txt"), "w") as f:
+        f.write("\n".join(synthetic_modules) + "\n")
+    with open(os.path.join(inputs_dir, "switch_inputs_version.txt"), "w") as f:
+        f.write(switch_model.__version__ + "\n")
+
+    # time
+    period_years = [2020 + 10 * i for i in range(periods)]
+    tps_per_ts = max(1, min(24, timepoints))
+    n_ts = max(1, timepoints // tps_per_ts)
+    hours_per_tp = 24 / tps_per_ts
+    write(
+        "periods.csv",
+        ["INVESTMENT_PERIOD", "period_start", "period_end"],
+        [(p, p - 5, p + 4) for p in period_years],
+    )
+    write(
+        "timeseries.csv",
+        [
+            "TIMESERIES",
+            "ts_period",
+            "ts_duration_of_tp",
+            "ts_num_tps",
+            "ts_scale_to_period",
+        ],
+        [
+            (f"{p}_{d}", p, hours_per_tp, tps_per_ts, 10 * 365.25 / n_ts)
+            for p in period_years
+            for d in range(n_ts)
+        ],
+    )
+    # (timepoint, timestamp, timeseries, period, day, hour of day)
+    tps = [
+        (f"{p}_{d}_{i}", f"{p}{d:03d}{i:02d}", f"{p}_{d}", p, d, i * hours_per_tp)
+        for p in period_years
+        for d in range(n_ts)
+        for i in range(tps_per_ts)
+    ]
+    write(
+        "timepoints.csv",
+        ["timepoint_id", "timestamp", "timeseries"],
+        [tp[:3] for tp in tps],
+    )
+
+    # zones and loads; loads follow a daily and seasonal cycle and grow 2% per
+    # year
+    zone_names = [f"Z{z + 1}" for z in range(zones)]
+    peak = {z: rand.uniform(500, 5000) for z in zone_names}
+    write("load_zones.csv", ["LOAD_ZONE"], [(z,) for z in zone_names])
+    write(
+        "loads.csv",
+        ["LOAD_ZONE", "TIMEPOINT", "zone_demand_mw"],
+        [
+            (
+                z,
+                tp,
+                round(
+                    peak[z]
+                    * 1.02 ** (p - 2020)
+                    * (0.7 + 0.2 * math.sin(math.pi * (h - 6) / 12))
+                    * (1 + 0.1 * math.cos(2 * math.pi * d / n_ts))
+                    * rand.uniform(0.95, 1.05),
+                    3,
+                ),
+            )
+            for z in zone_names
+            for tp, ts, _, p, d, h in tps
+        ],
+    )
+
+    # energy sources
+    write(
+        "fuels.csv",
+        ["fuel", "co2_intensity", "upstream_co2_intensity"],
+        [(f, co2, 0) for f, (co2, cost) in fuels.items()],
+    )
+    write(
+        "non_fuel_energy_sources.csv",
+        ["energy_source"],
+        [("Wind",), ("Solar",), ("Electricity",)],
+    )
+    write(
+        "fuel_cost.csv",
+        ["load_zone", "fuel", "period", "fuel_cost"],
+        [
+            (z, f, p, round(cost * rand.uniform(0.8, 1.2), 4))
+            for z in zone_names
+            for f, (co2, cost) in fuels.items()
+            for p in period_years
+        ],
+    )
+
+    # generation projects; the first one in each zone is always Gas_CC, so
+    # every zone can meet its own load
+    n_storage = min(projects - 1, int(round(storage_share * projects)))
+    tech_names = list(technologies)
+    gens = []  # (project, tech, zone)
+    for z in zone_names:
+        for i in range(projects):
+            if i >= projects - n_storage:
+                tech = "Battery"
+            else:
+                tech = tech_names[i % len(tech_names)]
+            gens.append((f"{z}-{tech}-{i}", tech, z))
+    gen_info = []
+    build_costs = []
+    predetermined = []
+    cap_factors = []
+    for g, tech, z in gens:
+        if tech == "Battery":
+            gen_info.append(
+                (g, tech, z, 10000.0, ".", ".", 0.5, 15, 0, 0.0, 0.02, 0, 0)
+                + ("Electricity", 0.85, 0.25)
+            )
+            build_costs.extend(
+                (g, p, rand.uniform(300000, 500000), 5000.0, 200000.0)
+                for p in period_years
+            )
+            continue
+        (
+            source,
+            heat_rate,
+            vom,
+            capital,
+            fom,
+            variable,
+            baseload,
+            age,
+            forced,
+        ) = technologies[tech]
+        existing = [period_years[0] - 5 * (k + 1) for k in range(build_years)]
+        sizes = [round(rand.uniform(0, 0.3) * peak[z] / projects, 1) for y in existing]
+        predetermined.extend((g, y, mw, ".") for y, mw in zip(existing, sizes))
+        gen_info.append(
+            (
+                g,
+                tech,
+                z,
+                rand.uniform(20000, 150000),
+                round(sum(sizes) + rand.uniform(50, 500), 1) if variable else ".",
+                "." if heat_rate is None else heat_rate,
+                vom,
+                age,
+                0,
+                0.03,
+                forced,
+                variable,
+                baseload,
+                source,
+                ".",
+                ".",
+            )
+        )
+        build_costs.extend(
+            (g, y, capital * rand.uniform(0.9, 1.1), fom, ".")
+            for y in existing + period_years
+        )
+        if variable:
+            # solar follows the sun; wind varies randomly around 35%
+            cap_factors.extend(
+                (
+                    g,
+                    tp,
+                    round(
+                        max(0.0, math.sin(math.pi * (h - 6) / 12))
+                        * rand.uniform(0.6, 1.0)
+                        if tech == "Solar"
+                        else min(1.0, max(0.0, rand.gauss(0.35, 0.2))),
+                        4,
+                    ),
+                )
+                for tp, ts, _, p, d, h in tps
+            )
+    write(
+        "gen_info.csv",
+        [
+            "GENERATION_PROJECT",
+            "gen_tech",
+            "gen_load_zone",
+            "gen_connect_cost_per_mw",
+            "gen_capacity_limit_mw",
+            "gen_full_load_heat_rate",
+            "gen_variable_om",
+            "gen_max_age",
+            "gen_min_build_capacity",
+            "gen_scheduled_outage_rate",
+            "gen_forced_outage_rate",
+            "gen_is_variable",
+            "gen_is_baseload",
+            "gen_energy_source",
+            "gen_storage_efficiency",
+            "gen_store_to_release_ratio",
+        ],
+        gen_info,
+    )
+    write(
+        "gen_build_costs.csv",
+        [
+            "GENERATION_PROJECT",
+            "build_year",
+            "gen_overnight_cost",
+            "gen_fixed_om",
+            "gen_storage_energy_overnight_cost",
+        ],
+        build_costs,
+    )
+    write(
+        "gen_build_predetermined.csv",
+        [
+            "GENERATION_PROJECT",
+            "build_year",
+            "build_gen_predetermined",
+            "build_gen_energy_predetermined",
+        ],
+        predetermined,
+    )
+    write(
+        "variable_capacity_factors.csv",
+        ["GENERATION_PROJECT", "timepoint", "gen_max_capacity_factor"],
+        cap_factors,
+    )
+
+    # transmission: a chain connecting all the zones, plus randomly chosen
+    # extra lines
+    pairs = [(a, b) for i, a in enumerate(zone_names) for b in zone_names[i + 1 :]]
+    lines = list(zip(zone_names[:-1], zone_names[1:]))
+    extra = [pair for pair in pairs if pair not in lines]
+    rand.shuffle(extra)
+    n_lines = max(len(lines), int(round(transmission_density * len(pairs))))
+    lines.extend(extra[: n_lines - len(lines)])
+    write(
+        "transmission_lines.csv",
+        [
+            "TRANSMISSION_LINE",
+            "trans_lz1",
+            "trans_lz2",
+            "trans_length_km",
+            "trans_efficiency",
+            "existing_trans_cap",
+        ],
+        [
+            (f"{a}-{b}", a, b, round(rand.uniform(50, 500), 1), 0.95, 100)
+            for a, b in lines
+        ],
+    )
+    write(
+        "trans_params.csv",
+        [
+            "trans_capital_cost_per_mw_km",
+            "trans_lifetime_yrs",
+            "trans_fixed_om_fraction",
+        ],
+        [(1000.0, 20, 0.03)],
+    )
+    write(
+        "financials.csv",
+        ["base_financial_year", "discount_rate", "interest_rate"],
+        [(2015, 0.05, 0.07)],
+    )
+    return row_counts
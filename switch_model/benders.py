@@ -0,0 +1,545 @@
+"""
+Solve a model by Benders decomposition, with the capacity decisions in a
+master problem and the dispatch decisions in a set of subproblems.
+
+This is used by "switch solve --benders". Variables listed in
+first_stage_components (capacity decisions such as BuildGen, BuildTx and
+BuildStorageEnergy) are placed in the master problem, along with the
+constraints that only refer to those variables. All the other variables and
+constraints are split into the smallest groups that do not share any
+variables; each group becomes a separate subproblem. With the standard
+modules, this gives one subproblem per timeseries, unless per-period
+constraints (e.g., carbon caps, hydro budgets or fuel supply tiers) or
+cross-timeseries storage link the timeseries of a period, in which case
+there is one subproblem per period.
+
+Each iteration solves the master problem to get a trial set of capacity
+decisions, then solves each subproblem with those decisions fixed. If
+--benders-jobs is more than 1, the subproblems are divided into that many
+groups of similar size, and each group is always solved by the same worker
+process, so each worker only builds and keeps its own subproblems. The
+master problem and subproblems are solved with --solver, or with the HiGHS
+solver included with scipy if --matrix-backend is specified (see
+switch_model.matrix). The duals of the constraints
+that fix the capacity decisions in each subproblem give an optimality cut
+for the master problem, showing how that subproblem's cost would change
+with different capacity. Iterations stop when the total cost of the best
+solution so far (upper bound) is within --benders-tolerance of the master
+problem's estimate (lower bound).
+
+Subproblems are kept feasible by adding slack variables to the constraints
+that refer to the capacity decisions, with a cost of --benders-penalty per
+unit. An error is reported if any of these slacks are used in the final
+solution. Subproblems must be linear programs, so this cannot be used with
+integer dispatch variables (e.g., CommitGenUnits); capacity decisions can be
+integer or binary. The final capacity and dispatch decisions are loaded into
+the model (along with duals of the dispatch constraints if the model has a
+dual suffix), so the usual outputs are written after the solve.
+"""
+import multiprocessing
+
+from pyomo.environ import *
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+from switch_model.utilities import clear_solution_cache
+
+# variables to place in the master problem
+first_stage_components = [
+    "BuildGen",
+    "BuildMinGenCap",
+    "BuildUnits",
+    "BuildStorageEnergy",
+    "BuildTx",
+    "BuildLocalTD",
+    "RFMBuildSupplyTier",
+]
+
+# data for the subproblems, shared with worker processes when they are forked
+_blocks = []
+_solver = None
+_solver_args = {}
+_penalty = None
+_subproblems = {}
+
+
+def add_benders_args(parser):
+    parser.add_argument(
+        "--benders",
+        default=False,
+        action="store_true",
+        help="""
+            Solve the model by Benders decomposition, with capacity decisions
+            in a master problem and dispatch in separate subproblems for each
+            timeseries or period (see switch_model.benders).
+        """,
+    )
+    parser.add_argument(
+        "--benders-tolerance",
+        type=float,
+        default=1e-4,
+        help="""
+            Relative gap between the upper and lower bounds on total cost at
+            which to stop the Benders iterations (default is 1e-4).
+        """,
+    )
+    parser.add_argument(
+        "--benders-max-iter",
+        type=int,
+        default=200,
+        help="Maximum number of Benders iterations (default is 200; must be at "
+        "least 1).",
+    )
+    parser.add_argument(
+        "--benders-jobs",
+        type=int,
+        default=1,
+        help="""
+            Number of Benders subproblems to solve at the same time, in
+            separate processes (default is 1). Not available on Windows.
+        """,
+    )
+    parser.add_argument(
+        "--benders-penalty",
+        type=float,
+        default=None,
+        help="""
+            Cost per unit of violating a subproblem constraint that refers to
+            capacity decisions, used to keep subproblems feasible during the
+            Benders iterations (default is 100 times the largest cost
+            coefficient in the objective function).
+        """,
+    )
+
+
+def solve_benders(m):
+    """
+    Solve model instance m by Benders decomposition and load the solution into
+    it. Returns a SolverResults object showing the outcome.
+    """
+    global _blocks, _solver, _solver_args, _penalty
+    from concurrent.futures import ProcessPoolExecutor
+
+    if m.options.benders_max_iter < 1:
+        raise ValueError("--benders-max-iter must be at least 1.")
+    clear_solution_cache(m)
+    m.logger.info("\nSolving model by Benders decomposition...")
+    x_vars, master_cons, master_cost, blocks = decompose(m)
+    m.logger.info(
+        f"Master problem has {len(x_vars)} variables and {len(master_cons)} "
+        f"constraints; dispatch is split into {len(blocks)} subproblems."
+    )
+
+    _blocks = blocks
+    if m.options.matrix_backend:
+        _solver = None  # use solve_with_highs()
+    else:
+        _solver = SolverFactory(m.options.solver, solver_io=m.options.solver_io)
+    _solver_args = dict(options_string=m.options.solver_options_string)
+    _solver_args = {k: v for k, v in _solver_args.items() if v is not None}
+    if m.options.benders_penalty is None:
+        _penalty = 100 * max(
+            [abs(a) for a, j in master_cost[1]]
+            + [abs(a) for b in blocks for a, i in b["cost"]]
+            + [1.0]
+        )
+    else:
+        _penalty = m.options.benders_penalty
+    _subproblems.clear()
+
+    n_procs = min(m.options.benders_jobs, len(blocks))
+    if n_procs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        m.logger.warning(
+            "WARNING: --benders-jobs is not supported on this platform; "
+            "solving subproblems one at a time."
+        )
+        n_procs = 1
+    if n_procs > 1:
+        # one long-lived worker per group of subproblems, so each subproblem
+        # is always built and cached in the same process
+        partitions = partition_blocks(blocks, n_procs)
+        pools = [
+            ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("fork"))
+            for part in partitions
+        ]
+
+        def solve_all(x_hat):
+            futures = [
+                pool.submit(
+                    solve_subproblems, [subproblem_args(k, x_hat) for k in part]
+                )
+                for pool, part in zip(pools, partitions)
+            ]
+            results = [None] * len(blocks)
+            for part, future in zip(partitions, futures):
+                for k, r in zip(part, future.result()):
+                    results[k] = r
+            return results
+
+    else:
+        pools = []
+
+        def solve_all(x_hat):
+            return solve_subproblems(
+                [subproblem_args(k, x_hat) for k in range(len(blocks))]
+            )
+
+    try:
+        # lower bound for each subproblem's cost, which is zero if all its
+        # variables and costs are non-negative; otherwise we solve the
+        # subproblem with the capacity decisions left free
+        if all(
+            all(lb is not None and lb >= 0 for lb, ub in b["y_bounds"])
+            and all(a >= 0 for a, i in b["cost"])
+            for b in blocks
+        ):
+            lower_bounds = [0.0] * len(blocks)
+        else:
+            lower_bounds = [r["cost"] for r in solve_all(None)]
+
+        master = build_master(x_vars, master_cons, master_cost, lower_bounds)
+        upper_bound = float("inf")
+        best = None
+        converged = False
+        for iteration in range(1, m.options.benders_max_iter + 1):
+            termination = solve_model(master)
+            if termination != TerminationCondition.optimal:
+                raise RuntimeError(
+                    "Benders master problem could not be solved (termination "
+                    f"condition {termination})."
+                )
+            lower_bound = value(master.Cost)
+            x_hat = [value(master.X[j], exception=False) or 0.0 for j in master.X]
+            sub_results = solve_all(x_hat)
+            cost = master_cost[0] + sum(a * x_hat[j] for a, j in master_cost[1])
+            cost += sum(r["cost"] for r in sub_results)
+            if cost < upper_bound:
+                upper_bound = cost
+                best = (x_hat, sub_results)
+            gap = (upper_bound - lower_bound) / max(1.0, abs(upper_bound))
+            m.logger.info(
+                f"Benders iteration {iteration}: lower bound {lower_bound:,.2f}, "
+                f"upper bound {upper_bound:,.2f}, gap {gap:.4%}"
+            )
+            if gap <= m.options.benders_tolerance:
+                converged = True
+                break
+            for k, r in enumerate(sub_results):
+                # theta[k] >= cost[k] + sum(duals[k] * (x - x_hat))
+                xs = blocks[k]["x"]
+                master.Cuts.add(
+                    master.Theta[k]
+                    - sum(d * master.X[j] for d, j in zip(r["duals"], xs))
+                    >= r["cost"] - sum(d * x_hat[j] for d, j in zip(r["duals"], xs))
+                )
+    finally:
+        for pool in pools:
+            pool.shutdown()
+
+    # load the best solution into the model
+    x_hat, sub_results = best
+    slack = sum(r["slack"] for r in sub_results)
+    if slack > 1e-6:
+        raise RuntimeError(
+            "Benders subproblems were infeasible with the best capacity "
+            f"decisions (total slack {slack}). The model may be infeasible, or "
+            "--benders-penalty may need to be increased."
+        )
+    for v, x in zip(x_vars, x_hat):
+        v.set_value(round(x) if v.is_integer() else x, skip_validation=True)
+    has_duals = hasattr(m, "dual")
+    for b, r in zip(blocks, sub_results):
+        for v, y in zip(b["y_vars"], r["y"]):
+            v.set_value(y, skip_validation=True)
+        if has_duals:
+            for (lower, upper, y_terms, x_terms, con), d in zip(
+                b["constraints"], r["constraint_duals"]
+            ):
+                if d is not None:
+                    m.dual[con] = d
+
+    results = SolverResults()
+    results.solver.status = SolverStatus.ok if converged else SolverStatus.warning
+    results.solver.termination_condition = (
+        TerminationCondition.optimal
+        if converged
+        else TerminationCondition.maxIterations
+    )
+    results.solver.message = (
+        f"Benders decomposition {'converged' if converged else 'stopped'} after "
+        f"{iteration} iterations with a gap of {gap:.4%}"
+    )
+    if not converged:
+        m.logger.warning(
+            "WARNING: Benders decomposition did not converge within "
+            f"{m.options.benders_max_iter} iterations; using the best solution "
+            "found so far."
+        )
+    return results
+
+
+def decompose(m):
+    """
+    Split the active constraints and objective of m into a master problem and
+    independent subproblems. Returns x_vars (list of first-stage variables),
+    master_cons (list of (lower, upper, [(coef, x index), ...]) tuples),
+    master_cost ((constant, [(coef, x index), ...])) and blocks (a list of
+    dicts describing each subproblem, with local indices for its own
+    variables).
+    """
+    x_vars = [
+        v
+        for name in first_stage_components
+        if hasattr(m, name)
+        for v in getattr(m, name).values()
+        if not v.fixed
+    ]
+    x_index = {id(v): j for j, v in enumerate(x_vars)}
+    y_vars = []
+    y_index = {}
+    parent = []
+
+    def y_pos(v):
+        i = y_index.get(id(v))
+        if i is None:
+            if v.is_integer():
+                raise ValueError(
+                    f"Integer variable {v.name} cannot be used in Benders "
+                    "subproblems; only capacity decisions (see "
+                    "switch_model.benders.first_stage_components) can be "
+                    "integer."
+                )
+            i = y_index[id(v)] = len(y_vars)
+            y_vars.append(v)
+            parent.append(i)
+        return i
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def linear_terms(expr, name):
+        repn = generate_standard_repn(expr, quadratic=False)
+        if repn.nonlinear_vars:
+            raise ValueError(
+                f"{name} is nonlinear; Benders decomposition requires a linear model."
+            )
+        x_terms, y_terms = [], []
+        for v, a in zip(repn.linear_vars, repn.linear_coefs):
+            if a != 0:
+                if id(v) in x_index:
+                    x_terms.append((a, x_index[id(v)]))
+                else:
+                    y_terms.append((a, y_pos(v)))
+        return value(repn.constant), x_terms, y_terms
+
+    master_cons = []
+    rows = []
+    for con in m.component_data_objects(Constraint, active=True):
+        constant, x_terms, y_terms = linear_terms(con.body, con.name)
+        lower = None if con.lb is None else con.lb - constant
+        upper = None if con.ub is None else con.ub - constant
+        if y_terms:
+            root = find(y_terms[0][1])
+            for a, i in y_terms[1:]:
+                parent[find(i)] = root
+            rows.append((lower, upper, y_terms, x_terms, con))
+        elif x_terms:
+            master_cons.append((lower, upper, x_terms))
+
+    objectives = list(m.component_data_objects(Objective, active=True))
+    if len(objectives) != 1 or objectives[0].sense != minimize:
+        raise ValueError(
+            "Benders decomposition requires a single objective to minimize."
+        )
+    constant, x_cost, y_cost = linear_terms(objectives[0].expr, objectives[0].name)
+    master_cost = (constant, x_cost)
+
+    # gather the variables, constraints and costs for each block, renumbering
+    # variables within the block; groups that don't refer to any capacity
+    # decisions (e.g., unused fuel supply tiers) are combined into one block,
+    # since they only add a constant to the cost
+    linked = {find(row[2][0][1]) for row in rows if row[3]}
+
+    def block_id(i):
+        root = find(i)
+        return root if root in linked else None
+
+    blocks = {}
+    local = {}
+    for i, v in enumerate(y_vars):
+        b = blocks.setdefault(
+            block_id(i),
+            dict(y_vars=[], y_bounds=[], x=[], x_bounds=[], cost=[], constraints=[]),
+        )
+        local[i] = len(b["y_vars"])
+        b["y_vars"].append(v)
+        b["y_bounds"].append((v.lb, v.ub))
+    x_local = {}
+    for lower, upper, y_terms, x_terms, con in rows:
+        b = blocks[block_id(y_terms[0][1])]
+        xl = x_local.setdefault(id(b), {})
+        for a, j in x_terms:
+            if j not in xl:
+                xl[j] = len(b["x"])
+                b["x"].append(j)
+                b["x_bounds"].append((x_vars[j].lb, x_vars[j].ub))
+        b["constraints"].append(
+            (
+                lower,
+                upper,
+                [(a, local[i]) for a, i in y_terms],
+                [(a, xl[j]) for a, j in x_terms],
+                con,
+            )
+        )
+    for a, i in y_cost:
+        blocks[block_id(i)]["cost"].append((a, local[i]))
+
+    return x_vars, master_cons, master_cost, list(blocks.values())
+
+
+def build_master(x_vars, master_cons, master_cost, lower_bounds):
+    master = ConcreteModel()
+    master.X = Var(
+        range(len(x_vars)),
+        within=lambda mm, j: x_vars[j].domain,
+        bounds=lambda mm, j: (x_vars[j].lb, x_vars[j].ub),
+    )
+    master.Theta = Var(
+        range(len(lower_bounds)), bounds=lambda mm, k: (lower_bounds[k], None)
+    )
+    master.Master_Constraint = Constraint(
+        range(len(master_cons)),
+        rule=lambda mm, i: (
+            master_cons[i][0],
+            sum(a * mm.X[j] for a, j in master_cons[i][2]),
+            master_cons[i][1],
+        ),
+    )
+    master.Cuts = ConstraintList()
+    master.Cost = Objective(
+        expr=master_cost[0]
+        + sum(a * master.X[j] for a, j in master_cost[1])
+        + sum(master.Theta[k] for k in master.Theta),
+        sense=minimize,
+    )
+    return master
+
+
+def partition_blocks(blocks, n):
+    """
+    Divide the subproblems into n groups with similar numbers of constraints
+    (largest first, each to the smallest group so far). Returns a list of
+    lists of subproblem numbers.
+    """
+    partitions = [[] for i in range(n)]
+    sizes = [0] * n
+    for k in sorted(range(len(blocks)), key=lambda k: -len(blocks[k]["constraints"])):
+        i = sizes.index(min(sizes))
+        partitions[i].append(k)
+        sizes[i] += len(blocks[k]["constraints"]) + 1
+    return [sorted(part) for part in partitions if part]
+
+
+def subproblem_args(k, x_hat):
+    return (k, None if x_hat is None else [x_hat[j] for j in _blocks[k]["x"]])
+
+
+def solve_subproblems(args):
+    """Solve the subproblems for a list of (k, x_hat) tuples."""
+    return [solve_subproblem(k, x_hat) for k, x_hat in args]
+
+
+def solve_model(model):
+    """
+    Solve a master problem or subproblem with _solver, or with HiGHS via
+    scipy if _solver is None, and return the termination condition.
+    """
+    if _solver is not None:
+        return _solver.solve(model, **_solver_args).solver.termination_condition
+
+    from switch_model.matrix import build_matrix, load_lp_solution, solve_lp
+
+    lp = build_matrix(model)
+    res, row_duals = solve_lp(lp)
+    if res.status == 2:
+        return TerminationCondition.infeasible
+    if res.status != 0:
+        return TerminationCondition.other
+    load_lp_solution(model, lp, res.x, row_duals)
+    return TerminationCondition.optimal
+
+
+def build_subproblem(b):
+    s = ConcreteModel()
+    s.Y = Var(range(len(b["y_vars"])), bounds=lambda s, i: b["y_bounds"][i])
+    # local copies of the capacity decisions, fixed to x_hat by Fix_X, whose
+    # duals show the marginal value of each capacity decision
+    s.X = Var(range(len(b["x"])), bounds=lambda s, j: b["x_bounds"][j])
+    s.x_hat = Param(range(len(b["x"])), initialize=0.0, mutable=True)
+    s.Fix_X = Constraint(range(len(b["x"])), rule=lambda s, j: s.X[j] == s.x_hat[j])
+
+    # slack variables for constraints that refer to capacity decisions
+    linking = [i for i, c in enumerate(b["constraints"]) if c[3]]
+    s.Slack_Up = Var(
+        [i for i in linking if b["constraints"][i][0] is not None],
+        within=NonNegativeReals,
+    )
+    s.Slack_Down = Var(
+        [i for i in linking if b["constraints"][i][1] is not None],
+        within=NonNegativeReals,
+    )
+
+    def rule(s, i):
+        lower, upper, y_terms, x_terms, con = b["constraints"][i]
+        body = sum(a * s.Y[j] for a, j in y_terms) + sum(a * s.X[j] for a, j in x_terms)
+        if i in s.Slack_Up:
+            body += s.Slack_Up[i]
+        if i in s.Slack_Down:
+            body -= s.Slack_Down[i]
+        return (lower, body, upper)
+
+    s.Dispatch_Constraint = Constraint(range(len(b["constraints"])), rule=rule)
+    s.Cost = Objective(
+        expr=sum(a * s.Y[i] for a, i in b["cost"])
+        + _penalty * (sum(s.Slack_Up.values()) + sum(s.Slack_Down.values())),
+        sense=minimize,
+    )
+    s.dual = Suffix(direction=Suffix.IMPORT)
+    return s
+
+
+def solve_subproblem(k, x_hat):
+    """
+    Solve subproblem k with the capacity decisions fixed at x_hat (or free
+    within their bounds if x_hat is None). Returns a dict with the cost, the
+    marginal cost of each capacity decision, the values of the subproblem's
+    variables, the duals of its constraints and the total slack used.
+    """
+    b = _blocks[k]
+    s = _subproblems.get(k)
+    if s is None:
+        s = _subproblems[k] = build_subproblem(b)
+    if x_hat is None:
+        s.Fix_X.deactivate()
+    else:
+        s.Fix_X.activate()
+        for j, x in enumerate(x_hat):
+            s.x_hat[j] = x
+    termination = solve_model(s)
+    if termination != TerminationCondition.optimal:
+        raise RuntimeError(
+            f"Benders subproblem {k} could not be solved (termination "
+            f"condition {termination})."
+        )
+    return dict(
+        cost=value(s.Cost),
+        duals=None if x_hat is None else [s.dual.get(c, 0.0) for c in s.Fix_X.values()],
+        y=[v.value for v in s.Y.values()],
+        constraint_duals=[s.dual.get(c) for c in s.Dispatch_Constraint.values()],
+        slack=sum(v.value or 0.0 for v in s.Slack_Up.values())
+        + sum(v.value or 0.0 for v in s.Slack_Down.values()),
+    )
@@ -9,7 +9,7 @@ in the model. Each province can choose a mixed of these three battery deploymenn
 
 
 from pyomo.environ import *
-import os, collections
+import os
 
 dependencies = 'switch_model.generators.extensions.storage'
 
@@ -22,36 +22,26 @@ def define_components(mod):
     mod.gen_is_re_connect = Param(mod.GENERATION_PROJECTS, within=Boolean, default=False)
     # Summarize battery storage charging
     def battery_rule(m, z, t):
-        # Construct and cache a set for summation as needed
-        if not hasattr(m, 'Battery_Storage_Central_Charge_Summation_dict'):
-            m.Battery_Storage_Central_Charge_Summation_dict = collections.defaultdict(set)
-            for g, t2 in m.STORAGE_GEN_TPS:
-                # must be re-connect
-                if m.gen_tech[g] == "Battery_Storage" and not m.gen_is_distributed[g] and m.gen_is_re_connect[g]:
-                    # only add battery in central
-                    z2 = m.gen_load_zone[g]
-                    m.Battery_Storage_Central_Charge_Summation_dict[z2, t2].add(g)
-        # Use pop to free memory
-        relevant_projects = m.Battery_Storage_Central_Charge_Summation_dict.pop((z, t), {})
-        return sum(m.ChargeStorage[g, t] for g in relevant_projects)
-    mod.REBatteryCentralCharge = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=battery_rule)   
-
-    mod.Renewable_GEN_TPS = Set(
-        dimen=2,
-        initialize=lambda m: (
-            (g, tp)
-                for g in m.VARIABLE_GENS
-                    for tp in m.TPS_FOR_GEN[g]))
+        # use the shared index of active projects in each zone and timepoint
+        return sum(
+            m.ChargeStorage[g, t]
+            for g in m.GENS_IN_ZONE_TP[z, t]
+            # must be re-connect; only add battery in central
+            if g in m.STORAGE_GENS
+            and m.gen_tech[g] == "Battery_Storage"
+            and not m.gen_is_distributed[g]
+            and m.gen_is_re_connect[g]
+        )
+
+    mod.REBatteryCentralCharge = Expression(
+        mod.LOAD_ZONES, mod.TIMEPOINTS, rule=battery_rule
+    )
 
     def rule(m, z, t):
-        if not hasattr(m, 'Renewable_Gen_Summation_dict'):
-            m.Renewable_Gen_Summation_dict = collections.defaultdict(set)
-            for g, t2 in m.Renewable_GEN_TPS:
-                z2 = m.gen_load_zone[g]
-                m.Renewable_Gen_Summation_dict[z2, t2].add(g)
-        # Use pop to free memory
-        relevant_projects = m.Renewable_Gen_Summation_dict.pop((z, t), {})
-        return sum(m.DispatchGen[g, t] for g in relevant_projects)
+        return sum(
+            m.DispatchGen[g, t] for g in m.GENS_IN_ZONE_TP[z, t] if m.gen_is_variable[g]
+        )
+
     mod.RenewableDispatchZone = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=rule)
 
     mod.Charge_Storage_Upper_Limit_Zone = Constraint(
@@ -0,0 +1,627 @@
+"""
+Select representative days or weeks from the timeseries in an inputs
+directory, to reduce the size of the model.
+
+This is used by "switch solve --cluster-timeseries K". The timepoints of
+each timeseries are split into blocks of --cluster-hours hours (24 for days,
+168 for weeks), and the blocks in each period are clustered into K groups
+based on their zonal loads (from loads.csv) and variable capacity factors
+(from variable_capacity_factors.csv, averaged by load zone and energy
+source). One block is chosen to represent each cluster: the medoid with
+--cluster-method kmedoids (default) or the block nearest the cluster mean
+with --cluster-method kmeans. Blocks named with --cluster-extreme-days are
+kept as separate, additional timeseries.
+
+Since the representatives are real days or weeks, every input file indexed
+by timepoint is rewritten by keeping only the rows for the representative
+timepoints, so all inputs stay consistent. Files indexed by timeseries
+(e.g., hydro_timeseries.csv) use the original timeseries' values for each
+representative block taken from it. Each representative becomes a
+timeseries whose ts_scale_to_period is the total of the ts_scale_to_period
+values of the blocks it represents, so the total weight of each period is
+unchanged.
+
+The clustered inputs are written to a new directory (by default
+clustered_inputs in the outputs directory), which is then used as the
+inputs directory for the model. The directory also gets a
+cluster_assignments.csv file showing the representative for each original
+block and the root-mean-square difference between them.
+"""
+import csv
+import os
+import shutil
+
+# names of columns that identify timepoints or timeseries in input files
+timepoint_columns = {"timepoint", "timepoints", "timepoint_id"}
+timeseries_columns = {"timeseries"}
+period_columns = {"period", "investment_period"}
+
+extreme_day_criteria = {
+    "peak_load": "block with the highest system-wide hourly load",
+    "min_load": "block with the lowest total load",
+    "min_renewable": "block with the lowest average variable capacity factor",
+}
+
+
+def add_clustering_args(parser):
+    parser.add_argument(
+        "--cluster-timeseries",
+        type=int,
+        default=None,
+        metavar="K",
+        help="""
+            Replace the timeseries in each period with K representative
+            days or weeks, chosen by clustering the loads and variable
+            capacity factors (see switch_model.clustering). The clustered
+            inputs are written to --clustered-inputs-dir and used instead of
+            --inputs-dir.
+        """,
+    )
+    parser.add_argument(
+        "--cluster-hours",
+        type=float,
+        default=24,
+        help="""
+            Length of the blocks used for --cluster-timeseries, in hours
+            (default is 24, use 168 for weeks). Every timeseries must span a
+            whole number of blocks.
+        """,
+    )
+    parser.add_argument(
+        "--cluster-method",
+        default="kmedoids",
+        choices=["kmedoids", "kmeans"],
+        help="""
+            Clustering method for --cluster-timeseries. "kmedoids" (default)
+            uses the medoid of each cluster as its representative; "kmeans"
+            uses the block nearest the cluster mean.
+        """,
+    )
+    parser.add_argument(
+        "--cluster-extreme-days",
+        nargs="+",
+        default=[],
+        action="extend",
+        help="""
+            Blocks to keep as separate timeseries in addition to the
+            representative blocks when using --cluster-timeseries. Each
+            entry can be {}, or the timestamp or ID of a timepoint in the
+            block. Criteria are applied separately in each period.
+        """.format(
+            ", ".join(f'"{k}" ({v})' for k, v in extreme_day_criteria.items())
+        ),
+    )
+    parser.add_argument(
+        "--clustered-inputs-dir",
+        default=None,
+        help="""
+            Directory to write the inputs produced by --cluster-timeseries
+            (default is clustered_inputs in the outputs directory).
+        """,
+    )
+
+
+def cluster_inputs(options, logger):
+    """
+    Write a clustered copy of options.inputs_dir based on the
+    --cluster-timeseries options and return the name of the new directory.
+    """
+    global np, pd
+    import numpy as np
+    import pandas as pd
+
+    inputs_dir = options.inputs_dir
+    out_dir = options.clustered_inputs_dir
+    if out_dir is None:
+        out_dir = os.path.join(options.outputs_dir, "clustered_inputs")
+    if os.path.abspath(out_dir) == os.path.abspath(inputs_dir):
+        raise ValueError("--clustered-inputs-dir must be different from --inputs-dir.")
+
+    blocks = get_blocks(inputs_dir, options.cluster_hours)
+    features, load_cols = get_features(inputs_dir, blocks)
+
+    assignments = []
+    for period, period_blocks in blocks.groupby("period", sort=False):
+        idx = period_blocks.index.to_numpy()
+        x = features[idx]
+        weights = period_blocks["scale"].to_numpy()
+        extremes = find_extreme_blocks(
+            period_blocks, x, load_cols, options.cluster_extreme_days
+        )
+        labels, reps = choose_representatives(
+            x,
+            weights,
+            options.cluster_timeseries,
+            options.cluster_method,
+            extremes,
+        )
+        for i, b in enumerate(idx):
+            assignments.append((b, idx[reps[labels[i]]]))
+    assignments = pd.DataFrame(assignments, columns=["block", "representative"])
+
+    write_clustered_inputs(inputs_dir, out_dir, blocks, assignments)
+    report_errors(out_dir, blocks, features, load_cols, assignments, logger)
+    return out_dir
+
+
+def get_blocks(inputs_dir, hours):
+    """
+    Return a DataFrame with one row for each block of timepoints, showing
+    the period, timeseries, block number within the timeseries, weight
+    (ts_scale_to_period), and list of timepoint IDs. Timepoint IDs are kept
+    as strings, matching the way they are written in the other input files.
+    """
+    ts = pd.read_csv(
+        os.path.join(inputs_dir, "timeseries.csv"), dtype={"TIMESERIES": str}
+    )
+    tp = pd.read_csv(
+        os.path.join(inputs_dir, "timepoints.csv"),
+        dtype={"timepoint_id": str, "timeseries": str},
+    )
+    tps_in_ts = tp.groupby("timeseries", sort=False)["timepoint_id"].apply(list)
+
+    rows = []
+    for r in ts.itertuples(index=False):
+        tps = tps_in_ts.get(r.TIMESERIES, [])
+        tps_per_block = hours / r.ts_duration_of_tp
+        if tps_per_block != int(tps_per_block) or len(tps) % int(tps_per_block) != 0:
+            raise ValueError(
+                f"Timeseries {r.TIMESERIES} has {len(tps)} timepoints of "
+                f"{r.ts_duration_of_tp} hours, which cannot be divided into "
+                f"blocks of {hours} hours for --cluster-timeseries."
+            )
+        n = int(tps_per_block)
+        for i in range(len(tps) // n):
+            rows.append(
+                (
+                    r.ts_period,
+                    r.TIMESERIES,
+                    i,
+                    r.ts_duration_of_tp,
+                    r.ts_scale_to_period,
+                    len(tps) == n,
+                    tps[i * n : (i + 1) * n],
+                )
+            )
+    blocks = pd.DataFrame(
+        rows,
+        columns=[
+            "period",
+            "timeseries",
+            "block",
+            "duration",
+            "scale",
+            "whole_ts",
+            "timepoints",
+        ],
+    )
+    for period, durations in blocks.groupby("period")["duration"]:
+        if durations.nunique() > 1:
+            raise ValueError(
+                f"All timeseries in period {period} must use the same "
+                "ts_duration_of_tp for --cluster-timeseries."
+            )
+    # timestamps are used to identify extreme days
+    timestamps = dict(zip(tp["timepoint_id"], tp["timestamp"].astype(str)))
+    blocks["timestamps"] = [[timestamps[t] for t in b] for b in blocks["timepoints"]]
+    return blocks
+
+
+def get_features(inputs_dir, blocks):
+    """
+    Return an array with one row for each block and one column for each
+    hour of each load or capacity factor profile, and a boolean vector
+    showing which columns hold loads. Loads are normalized by the peak load
+    in each zone so all profiles have similar scale. Blocks in different
+    periods may have different numbers of timepoints, so rows are padded with
+    zeros as needed.
+    """
+    tp_block = {
+        t: (b, h)
+        for b, tps in enumerate(blocks["timepoints"])
+        for h, t in enumerate(tps)
+    }
+    n_hours = blocks["timepoints"].map(len).max()
+
+    profiles = []
+    loads = pd.read_csv(
+        os.path.join(inputs_dir, "loads.csv"),
+        dtype={"TIMEPOINT": str},
+        na_values=".",
+    )
+    loads = loads.rename(
+        columns={"LOAD_ZONE": "profile", "TIMEPOINT": "tp", "zone_demand_mw": "value"}
+    )
+    peak = loads.groupby("profile")["value"].transform(lambda v: v.abs().max())
+    loads["value"] = loads["value"] / peak.where(peak > 0, 1)
+    loads["is_load"] = True
+    profiles.append(loads)
+
+    cf_file = os.path.join(inputs_dir, "variable_capacity_factors.csv")
+    if os.path.exists(cf_file):
+        cf = pd.read_csv(cf_file, dtype={"timepoint": str}, na_values=".")
+        cf = cf.rename(columns={"timepoint": "tp", "gen_max_capacity_factor": "value"})
+        gen_info = pd.read_csv(
+            os.path.join(inputs_dir, "gen_info.csv"),
+            usecols=lambda c: c
+            in {"GENERATION_PROJECT", "gen_load_zone", "gen_energy_source"},
+        )
+        if {"gen_load_zone", "gen_energy_source"} <= set(gen_info.columns):
+            # average the profiles for each type of resource in each zone
+            cf = cf.merge(gen_info, on="GENERATION_PROJECT")
+            cf["profile"] = cf["gen_load_zone"] + "/" + cf["gen_energy_source"]
+            cf = cf.groupby(["profile", "tp"], sort=False, as_index=False)[
+                "value"
+            ].mean()
+        else:
+            cf = cf.rename(columns={"GENERATION_PROJECT": "profile"})
+        cf["is_load"] = False
+        profiles.append(cf)
+
+    data = pd.concat(profiles, ignore_index=True)
+    data = data[data["tp"].isin(tp_block)]
+    profile_names = data["profile"].unique()
+    profile_num = {p: i for i, p in enumerate(profile_names)}
+    bh = np.array([tp_block[t] for t in data["tp"]]).reshape(-1, 2)
+
+    features = np.zeros((len(blocks), len(profile_names), n_hours))
+    features[bh[:, 0], data["profile"].map(profile_num).to_numpy(), bh[:, 1]] = (
+        data["value"].fillna(0).to_numpy()
+    )
+    is_load = (data.drop_duplicates("profile").set_index("profile")["is_load"]).reindex(
+        profile_names
+    )
+    load_cols = np.repeat(is_load.to_numpy(bool), n_hours)
+    return features.reshape(len(blocks), -1), load_cols
+
+
+def find_extreme_blocks(period_blocks, x, load_cols, extreme_days):
+    """
+    Return a sorted list of the positions within period_blocks of the blocks
+    selected by extreme_days (see --cluster-extreme-days).
+    """
+    extremes = set()
+    loads = x[:, load_cols]
+    cfs = x[:, ~load_cols]
+    for e in extreme_days:
+        if e == "peak_load":
+            n_hours = len(period_blocks["timepoints"].iloc[0])
+            hourly = loads.reshape(len(x), -1, n_hours).sum(axis=1)
+            extremes.add(int(np.argmax(hourly.max(axis=1))))
+        elif e == "min_load":
+            extremes.add(int(np.argmin(loads.sum(axis=1))))
+        elif e == "min_renewable":
+            if cfs.shape[1] > 0:
+                extremes.add(int(np.argmin(cfs.mean(axis=1))))
+        else:
+            # look for a timepoint with a matching ID or timestamp
+            for i, (tps, stamps) in enumerate(
+                zip(period_blocks["timepoints"], period_blocks["timestamps"])
+            ):
+                if e in tps or e in stamps:
+                    extremes.add(i)
+    return sorted(extremes)
+
+
+def choose_representatives(x, weights, k, method, extremes=[], seed=0):
+    """
+    Cluster the rows of x (with the specified weights) into k groups, plus
+    one group for each row listed in extremes. Return a vector giving the
+    cluster number for each row and a vector giving the row that represents
+    each cluster.
+    """
+    n = len(x)
+    extremes = list(extremes)
+    others = np.setdiff1d(np.arange(n), extremes)
+    if len(others) <= k:
+        # nothing to cluster; every block represents itself
+        return np.arange(n), np.arange(n)
+
+    xo, wo = x[others], weights[others]
+    rng = np.random.default_rng(seed)
+    if method == "kmeans":
+        # kmeans() drops empty clusters, so there may be fewer than k
+        labels, centers = kmeans(xo, wo, k, rng)
+        reps = np.array(
+            [
+                np.flatnonzero(labels == c)[
+                    np.argmin(
+                        squared_distances(xo[labels == c], centers[c : c + 1])[:, 0]
+                    )
+                ]
+                for c in range(len(centers))
+            ],
+            dtype=int,
+        )
+    elif method == "kmedoids":
+        labels, reps = kmedoids(xo, wo, k, rng)
+    else:
+        raise ValueError(f"Unknown clustering method {method}.")
+
+    # merge the results for the extreme and clustered rows
+    all_labels = np.empty(n, dtype=int)
+    all_labels[others] = labels
+    all_labels[extremes] = np.arange(len(reps), len(reps) + len(extremes))
+    all_reps = np.concatenate([others[reps], np.array(extremes, dtype=int)])
+    return all_labels, all_reps
+
+
+def squared_distances(a, b):
+    """Return a matrix of squared Euclidean distances between rows of a and b."""
+    d = (
+        np.sum(a**2, axis=1)[:, np.newaxis]
+        - 2 * a @ b.T
+        + np.sum(b**2, axis=1)[np.newaxis, :]
+    )
+    return np.maximum(d, 0)
+
+
+def initial_centers(d, weights, k, rng):
+    """
+    Choose k starting rows with the k-means++ rule, given a function d that
+    returns the squared distances from all rows to a specified row.
+    """
+    chosen = [int(rng.choice(len(weights), p=weights / weights.sum()))]
+    dist = d(chosen[0])
+    for _ in range(1, k):
+        p = weights * dist
+        if p.sum() <= 0:
+            # all remaining rows duplicate chosen ones
+            p = np.where(np.isin(np.arange(len(weights)), chosen), 0.0, 1.0)
+        chosen.append(int(rng.choice(len(weights), p=p / p.sum())))
+        dist = np.minimum(dist, d(chosen[-1]))
+    return np.array(chosen)
+
+
+def kmeans(x, weights, k, rng, n_init=10, max_iter=300):
+    """
+    Weighted k-means clustering of the rows of x, keeping the best of n_init
+    runs. Returns the cluster number for each row and the cluster centers.
+    """
+    best = None
+    for _ in range(n_init):
+        centers = x[
+            initial_centers(
+                lambda i: squared_distances(x, x[i : i + 1])[:, 0], weights, k, rng
+            )
+        ]
+        labels = None
+        for _ in range(max_iter):
+            new_labels = np.argmin(squared_distances(x, centers), axis=1)
+            if labels is not None and np.array_equal(labels, new_labels):
+                break
+            labels = new_labels
+            # weighted mean of the members of each cluster
+            onehot = np.zeros((len(x), k))
+            onehot[np.arange(len(x)), labels] = weights
+            totals = onehot.sum(axis=0)
+            # keep the old center for any cluster that became empty
+            filled = totals > 0
+            centers[filled] = (onehot.T @ x)[filled] / totals[filled, np.newaxis]
+        dist = squared_distances(x, centers)[np.arange(len(x)), labels]
+        cost = np.sum(weights * dist)
+        if best is None or cost < best[0]:
+            best = (cost, labels, centers)
+    # make sure every cluster has at least one member
+    labels, centers = best[1], best[2]
+    used = np.unique(labels)
+    return np.searchsorted(used, labels), centers[used]
+
+
+def kmedoids(x, weights, k, rng, n_init=10, max_iter=300):
+    """
+    Weighted k-medoids clustering of the rows of x (alternating method),
+    keeping the best of n_init runs. Returns the cluster number for each row
+    and the row number of the medoid of each cluster.
+    """
+    d = np.sqrt(squared_distances(x, x))
+    best = None
+    for _ in range(n_init):
+        medoids = initial_centers(lambda i: d[:, i] ** 2, weights, k, rng)
+        for _ in range(max_iter):
+            labels = medoid_labels(d, medoids)
+            # weighted cost of using each row as the medoid for each cluster;
+            # only members of a cluster can be its medoid
+            onehot = np.zeros((len(x), k))
+            onehot[np.arange(len(x)), labels] = weights
+            cost = np.where(onehot > 0, d @ onehot, np.inf)
+            new_medoids = np.argmin(cost, axis=0)
+            # keep the old medoid if it is at least as good
+            keep = cost[medoids, np.arange(k)] <= cost[new_medoids, np.arange(k)]
+            new_medoids[keep] = medoids[keep]
+            if np.array_equal(new_medoids, medoids):
+                break
+            medoids = new_medoids
+        labels = medoid_labels(d, medoids)
+        total = np.sum(weights * d[np.arange(len(x)), medoids[labels]])
+        if best is None or total < best[0]:
+            best = (total, labels, medoids)
+    return best[1], best[2]
+
+
+def medoid_labels(d, medoids):
+    """
+    Assign each row to the nearest medoid, given the distance matrix d. Each
+    medoid is assigned to its own cluster, even if it duplicates another one.
+    """
+    labels = np.argmin(d[:, medoids], axis=1)
+    labels[medoids] = np.arange(len(medoids))
+    return labels
+
+
+def representative_timeseries(blocks, assignments):
+    """
+    Return a DataFrame with one row for each representative block, showing
+    its new timeseries ID and weight, in the original order of the blocks.
+    """
+    reps = blocks.loc[np.unique(assignments["representative"])].copy()
+    reps["new_timeseries"] = [
+        ts if whole else f"{ts}_{b}"
+        for ts, b, whole in zip(reps["timeseries"], reps["block"], reps["whole_ts"])
+    ]
+    scale = blocks.loc[assignments["block"], "scale"].groupby(
+        assignments["representative"].to_numpy()
+    )
+    reps["new_scale"] = scale.sum()
+    return reps
+
+
+def write_clustered_inputs(inputs_dir, out_dir, blocks, assignments):
+    """
+    Copy all files from inputs_dir to out_dir, replacing the timeseries and
+    timepoints with the representative blocks.
+    """
+    write_timeseries_subset(
+        inputs_dir, out_dir, representative_timeseries(blocks, assignments)
+    )
+
+
+def write_timeseries_subset(inputs_dir, out_dir, timeseries):
+    """
+    Copy all files from inputs_dir to out_dir, keeping only the timepoints
+    shown in the timeseries DataFrame. This has one row for each timeseries
+    to write, with columns for the new timeseries ID ("new_timeseries"), the
+    original timeseries ("timeseries"), its period ("period"), the list of
+    timepoint IDs to include ("timepoints") and the new ts_scale_to_period
+    ("new_scale").
+
+    Files indexed by timepoint keep only the rows for these timepoints.
+    Files indexed by timeseries get a copy of the original timeseries' rows
+    for each new timeseries made from it. If some periods have no
+    timeseries, they are dropped from all files indexed by period.
+    """
+    import pandas as pd
+
+    tp_ts = {
+        t: ts
+        for tps, ts in zip(timeseries["timepoints"], timeseries["new_timeseries"])
+        for t in tps
+    }
+    new_ts = timeseries.groupby("timeseries", sort=False)["new_timeseries"].apply(list)
+    periods = pd.read_csv(os.path.join(inputs_dir, "periods.csv"))
+    if set(periods["INVESTMENT_PERIOD"]) <= set(timeseries["period"]):
+        kept_periods = None
+    else:
+        kept_periods = {float(p) for p in timeseries["period"]}
+        # build costs for dropped periods would not match any build year,
+        # unless the capacity is predetermined
+        dropped_builds = {
+            (g, float(y))
+            for g in pd.read_csv(os.path.join(inputs_dir, "gen_info.csv"), dtype=str)[
+                "GENERATION_PROJECT"
+            ]
+            for y in periods["INVESTMENT_PERIOD"]
+            if float(y) not in kept_periods
+        }
+        predetermined = os.path.join(inputs_dir, "gen_build_predetermined.csv")
+        if os.path.exists(predetermined):
+            pre = pd.read_csv(predetermined, dtype={"GENERATION_PROJECT": str})
+            dropped_builds -= set(
+                zip(pre["GENERATION_PROJECT"], pre["build_year"].astype(float))
+            )
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name in os.listdir(inputs_dir):
+        src = os.path.join(inputs_dir, name)
+        dest = os.path.join(out_dir, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, dest, dirs_exist_ok=True)
+        elif name == "timeseries.csv":
+            ts = pd.read_csv(src, dtype=str, keep_default_na=False)
+            ts = ts.set_index("TIMESERIES").loc[timeseries["timeseries"]].reset_index()
+            ts["TIMESERIES"] = timeseries["new_timeseries"].to_numpy()
+            ts["ts_num_tps"] = timeseries["timepoints"].map(len).to_numpy()
+            ts["ts_scale_to_period"] = timeseries["new_scale"].to_numpy()
+            ts.to_csv(dest, index=False)
+        elif name == "timepoints.csv":
+            tp = pd.read_csv(src, dtype=str, keep_default_na=False)
+            tp = tp.set_index("timepoint_id").loc[list(tp_ts)].reset_index()
+            tp["timeseries"] = tp["timepoint_id"].map(tp_ts)
+            tp.to_csv(dest, index=False)
+        elif name.endswith(".csv"):
+            with open(src, newline="") as f:
+                rows = list(csv.reader(f))
+            headers = [h.lower() for h in rows[0]] if rows else []
+            tp_col = next(
+                (i for i, h in enumerate(headers) if h in timepoint_columns), None
+            )
+            ts_col = next(
+                (i for i, h in enumerate(headers) if h in timeseries_columns), None
+            )
+            p_col = next(
+                (i for i, h in enumerate(headers) if h in period_columns), None
+            )
+            if tp_col is not None:
+                rows = rows[:1] + [r for r in rows[1:] if r[tp_col] in tp_ts]
+            elif ts_col is not None:
+                rows = rows[:1] + [
+                    r[:ts_col] + [ts] + r[ts_col + 1 :]
+                    for r in rows[1:]
+                    for ts in new_ts.get(r[ts_col], [])
+                ]
+            if p_col is not None and kept_periods is not None:
+                rows = rows[:1] + [
+                    r for r in rows[1:] if float(r[p_col]) in kept_periods
+                ]
+            if name == "gen_build_costs.csv" and kept_periods is not None:
+                g_col, y_col = (
+                    headers.index("generation_project"),
+                    headers.index("build_year"),
+                )
+                rows = rows[:1] + [
+                    r
+                    for r in rows[1:]
+                    if (r[g_col], float(r[y_col])) not in dropped_builds
+                ]
+            with open(dest, "w", newline="") as f:
+                csv.writer(f, lineterminator="\n").writerows(rows)
+        else:
+            shutil.copy2(src, dest)
+
+
+def report_errors(out_dir, blocks, features, load_cols, assignments, logger):
+    """
+    Write cluster_assignments.csv in out_dir, showing the representative
+    timeseries and root-mean-square error for each original block, and
+    report the average errors for each period.
+    """
+    reps = representative_timeseries(blocks, assignments)
+    b = assignments["block"].to_numpy()
+    r = assignments["representative"].to_numpy()
+    sq_err = (features[b] - features[r]) ** 2
+    # only count the hours actually used in each period
+    n_hours = blocks["timepoints"].map(len).to_numpy()[b]
+    hour = np.arange(features.shape[1]) % blocks["timepoints"].map(len).max()
+    used = hour[np.newaxis, :] < n_hours[:, np.newaxis]
+
+    def rmse(cols):
+        mask = used & cols[np.newaxis, :]
+        count = mask.sum(axis=1)
+        return np.sqrt(np.where(mask, sq_err, 0).sum(axis=1) / np.maximum(count, 1))
+
+    result = pd.DataFrame(
+        {
+            "period": blocks["period"].to_numpy()[b],
+            "original_timeseries": blocks["timeseries"].to_numpy()[b],
+            "original_block": blocks["block"].to_numpy()[b],
+            "first_timestamp": [s[0] for s in blocks["timestamps"].to_numpy()[b]],
+            "representative_timeseries": reps["new_timeseries"].loc[r].to_numpy(),
+            "load_rmse": rmse(load_cols),
+            "capacity_factor_rmse": rmse(~load_cols),
+            "weight": blocks["scale"].to_numpy()[b],
+        }
+    )
+    result.to_csv(os.path.join(out_dir, "cluster_assignments.csv"), index=False)
+
+    logger.info(
+        f"Clustered {len(blocks)} blocks into {len(reps)} representative "
+        f"timeseries in {out_dir}. Reconstruction error (RMSE of loads as a "
+        "share of zonal peak and of capacity factors), weighted by "
+        "ts_scale_to_period:"
+    )
+    for period, df in result.groupby("period", sort=False):
+        w = df["weight"]
+        load = np.sqrt(np.average(df["load_rmse"] ** 2, weights=w))
+        cf = np.sqrt(np.average(df["capacity_factor_rmse"] ** 2, weights=w))
+        logger.info(f"    period {period}: loads {load:.4f}, capacity factors {cf:.4f}")
+    return result
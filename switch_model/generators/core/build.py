@@ -9,7 +9,7 @@ import os
 from pyomo.environ import *
 from switch_model.financials import capital_recovery_factor as crf
 from switch_model.reporting import write_table
-from switch_model.utilities import unique_list
+from switch_model.utilities import pop_construction_index, unique_list
 
 dependencies = (
     "switch_model.timescales",
@@ -383,28 +383,21 @@ def define_components(mod):
     )
     mod.min_data_check("build_gen_predetermined")
 
-    def gen_build_can_operate_in_period(m, g, build_year, period):
-        if build_year in m.PERIODS:
-            online = m.period_start[build_year]
-        else:
-            online = build_year
-        retirement = online + m.gen_max_age[g]
-        return online <= m.period_start[period] < retirement
-        # This is probably more correct, but is a different behavior
-        # mid_period = m.period_start[period] + 0.5 * m.period_length_years[period]
-        # return online <= m.period_start[period] and mid_period <= retirement
-
     # The set of periods when a project built in a certain year will be online
+    # (this and the next few sets are constructed together from a single pass
+    # through GEN_BLD_YRS; see gen_build_period_index())
     mod.PERIODS_FOR_GEN_BLD_YR = Set(
         mod.GEN_BLD_YRS,
         dimen=1,
         within=mod.PERIODS,
         ordered=True,
-        initialize=lambda m, g, bld_yr: [
-            period
-            for period in m.PERIODS
-            if gen_build_can_operate_in_period(m, g, bld_yr, period)
-        ],
+        initialize=lambda m, g, bld_yr: pop_construction_index(
+            m,
+            "gen_build_period_index",
+            gen_build_period_index,
+            "PERIODS_FOR_GEN_BLD_YR",
+            (g, bld_yr),
+        ),
     )
     # The set of build years that could be online in the given period
     # for the given project.
@@ -412,19 +405,21 @@ def define_components(mod):
         mod.GENERATION_PROJECTS,
         mod.PERIODS,
         dimen=1,
-        initialize=lambda m, g, period: unique_list(
-            bld_yr
-            for (gen, bld_yr) in m.GEN_BLD_YRS
-            if gen == g and gen_build_can_operate_in_period(m, g, bld_yr, period)
+        initialize=lambda m, g, period: pop_construction_index(
+            m,
+            "gen_build_period_index",
+            gen_build_period_index,
+            "BLD_YRS_FOR_GEN_PERIOD",
+            (g, period),
         ),
     )
     # The set of periods when a generator is available to run
     mod.PERIODS_FOR_GEN = Set(
         mod.GENERATION_PROJECTS,
         dimen=1,
-        initialize=lambda m, g: [
-            p for p in m.PERIODS if len(m.BLD_YRS_FOR_GEN_PERIOD[g, p]) > 0
-        ],
+        initialize=lambda m, g: pop_construction_index(
+            m, "gen_build_period_index", gen_build_period_index, "PERIODS_FOR_GEN", g
+        ),
     )
 
     def bounds_BuildGen(model, g, bld_yr):
@@ -467,9 +462,9 @@ def define_components(mod):
     # and 'C-Coal_ST' in m.GENS_IN_PERIOD[2020] and 'C-Coal_ST' not in m.GENS_IN_PERIOD[2030]
     mod.GEN_PERIODS = Set(
         dimen=2,
-        initialize=lambda m: [
-            (g, p) for g in m.GENERATION_PROJECTS for p in m.PERIODS_FOR_GEN[g]
-        ],
+        initialize=lambda m: pop_construction_index(
+            m, "gen_build_period_index", gen_build_period_index, "GEN_PERIODS"
+        ),
     )
 
     mod.GenCapacity = Expression(
@@ -570,6 +565,48 @@ def define_components(mod):
     mod.Cost_Components_Per_Period.append("TotalGenFixedCosts")
 
 
+def gen_build_can_operate_in_period(m, g, build_year, period):
+    if build_year in m.PERIODS:
+        online = m.period_start[build_year]
+    else:
+        online = build_year
+    retirement = online + m.gen_max_age[g]
+    return online <= m.period_start[period] < retirement
+    # This is probably more correct, but is a different behavior
+    # mid_period = m.period_start[period] + 0.5 * m.period_length_years[period]
+    # return online <= m.period_start[period] and mid_period <= retirement
+
+
+def gen_build_period_index(m):
+    """
+    Construct PERIODS_FOR_GEN_BLD_YR, BLD_YRS_FOR_GEN_PERIOD, PERIODS_FOR_GEN
+    and GEN_PERIODS with a single pass through GEN_BLD_YRS, for use with
+    pop_construction_index(). This takes time proportional to the number of
+    projects, instead of scanning all of GEN_BLD_YRS for each project and
+    period.
+    """
+    periods_for_gen_bld_yr = {gb: [] for gb in m.GEN_BLD_YRS}
+    bld_yrs_for_gen_period = {
+        (g, p): [] for g in m.GENERATION_PROJECTS for p in m.PERIODS
+    }
+    for (g, bld_yr) in m.GEN_BLD_YRS:
+        for p in m.PERIODS:
+            if gen_build_can_operate_in_period(m, g, bld_yr, p):
+                periods_for_gen_bld_yr[g, bld_yr].append(p)
+                bld_yrs_for_gen_period[g, p].append(bld_yr)
+    periods_for_gen = {
+        g: [p for p in m.PERIODS if bld_yrs_for_gen_period[g, p]]
+        for g in m.GENERATION_PROJECTS
+    }
+    gen_periods = [(g, p) for g in m.GENERATION_PROJECTS for p in periods_for_gen[g]]
+    return {
+        "PERIODS_FOR_GEN_BLD_YR": periods_for_gen_bld_yr,
+        "BLD_YRS_FOR_GEN_PERIOD": bld_yrs_for_gen_period,
+        "PERIODS_FOR_GEN": periods_for_gen,
+        "GEN_PERIODS": {None: gen_periods},
+    }
+
+
 def load_inputs(mod, switch_data, inputs_dir):
     """
 
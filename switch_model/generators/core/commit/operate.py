@@ -12,7 +12,9 @@ need to include the module operations.unitcommit.fuel_use.
 from __future__ import division
 
 import os, itertools
+from collections import deque
 from pyomo.environ import *
+from switch_model.utilities import add_construction_helper, pop_construction_index
 
 dependencies = (
     "switch_model.timescales",
@@ -24,6 +26,24 @@ dependencies = (
 )
 
 
+def define_arguments(argparser):
+    group = argparser.add_argument_group(__name__)
+    group.add_argument(
+        "--min-up-down-formulation",
+        choices=["window", "cumulative"],
+        default="window",
+        help=(
+            "Formulation for the minimum uptime and downtime constraints. "
+            "'window' (default) adds up the startups or shutdowns in each "
+            "lookback window directly; 'cumulative' adds variables for the "
+            "running total of startups and shutdowns in each timeseries and "
+            "uses the difference between two of them for each window. This "
+            "gives the same solution with fewer nonzeros in the constraint "
+            "matrix when windows span many timepoints."
+        ),
+    )
+
+
 def define_components(mod):
     """
 
@@ -164,6 +184,23 @@ def define_components(mod):
     at some point in the lookback window can be startup now, possibly
     replacing other units that were shutdown recently.
 
+    gen_max_commit_fraction_in_downtime_window[(g, t) in
+    DOWNTIME_CONSTRAINED_GEN_TPS] is the largest value of
+    gen_max_commit_fraction[g, t_prior] in the downtime lookback window for
+    timepoint t (plus one step), used to find the band of capacity that is
+    forced off for the whole window.
+
+    If --min-up-down-formulation cumulative is specified,
+    CumulativeStartupGenCapacity[(g, t) in UPTIME_CONSTRAINED_GEN_TPS] and
+    CumulativeShutdownGenCapacity[(g, t) in DOWNTIME_CONSTRAINED_GEN_TPS]
+    are the total capacity started up or shut down from the start of the
+    timeseries through timepoint t, defined by the
+    Track_Cumulative_Startup and Track_Cumulative_Shutdown constraints.
+    Then Enforce_Min_Uptime and Enforce_Min_Downtime use the difference
+    between two of these totals instead of summing StartupGenCapacity or
+    ShutdownGenCapacity over each lookback window, so each one has at most
+    four terms, regardless of the length of the window.
+
     -- Dispatch limits based on committed capacity --
 
     gen_min_load_fraction[g] describes the minimum loading level of a
@@ -305,8 +342,26 @@ def define_components(mod):
         n = hrs_to_num_tps(m, hrs, t)
         if add_one:
             n += 1
-        window = [m.TPS_IN_TS[m.tp_ts[t]].prevw(t, i) for i in range(n)]
-        return window
+        tps, pos = ts_window_index(m, t)
+        return [tps[(pos - i) % len(tps)] for i in range(n)]
+
+    def window_total(m, g, t, hrs, cumulative):
+        """Return the sum of the quantities tracked by the cumulative variable
+        over the time_window() for t, using at most three of its values"""
+        tps, pos = ts_window_index(m, t)
+        last = len(tps) - 1
+        # full trips around the timeseries, then the remaining timepoints
+        loops, n = divmod(hrs_to_num_tps(m, hrs, t), len(tps))
+        total = loops * cumulative[g, tps[last]] if loops else 0
+        if n > 0:
+            total += cumulative[g, t]
+            if n <= pos:
+                total -= cumulative[g, tps[pos - n]]
+            elif n > pos + 1:
+                # window wraps around to the end of the timeseries
+                total += cumulative[g, tps[last]]
+                total -= cumulative[g, tps[last + pos + 1 - n]]
+        return total
 
     mod.UPTIME_CONSTRAINED_GEN_TPS = Set(
         dimen=2,
@@ -328,16 +383,75 @@ def define_components(mod):
             if hrs_to_num_tps(m, m.gen_min_downtime[g], t) > 0
         ],
     )
-    mod.Enforce_Min_Uptime = Constraint(
-        mod.UPTIME_CONSTRAINED_GEN_TPS,
-        doc="All capacity turned on in the last x hours must still be on now",
-        rule=lambda m, g, t: (
-            m.CommitGen[g, t]
-            >= sum(
+    mod.gen_max_commit_fraction_in_downtime_window = Param(
+        mod.DOWNTIME_CONSTRAINED_GEN_TPS,
+        within=PercentFraction,
+        initialize=lambda m, g, t: pop_construction_index(
+            m,
+            "downtime_window_max_index",
+            downtime_window_max_index,
+            "gen_max_commit_fraction_in_downtime_window",
+            (g, t),
+        ),
+    )
+
+    if mod.options.min_up_down_formulation == "cumulative":
+        mod.CumulativeStartupGenCapacity = Var(
+            mod.UPTIME_CONSTRAINED_GEN_TPS, within=NonNegativeReals
+        )
+        mod.CumulativeShutdownGenCapacity = Var(
+            mod.DOWNTIME_CONSTRAINED_GEN_TPS, within=NonNegativeReals
+        )
+
+        def track_cumulative_rule(cumulative, change):
+            def rule(m, g, t):
+                tps, pos = ts_window_index(m, t)
+                prior = getattr(m, cumulative)[g, tps[pos - 1]] if pos > 0 else 0
+                return getattr(m, cumulative)[g, t] == prior + getattr(m, change)[g, t]
+
+            return rule
+
+        mod.Track_Cumulative_Startup = Constraint(
+            mod.UPTIME_CONSTRAINED_GEN_TPS,
+            rule=track_cumulative_rule(
+                "CumulativeStartupGenCapacity", "StartupGenCapacity"
+            ),
+        )
+        mod.Track_Cumulative_Shutdown = Constraint(
+            mod.DOWNTIME_CONSTRAINED_GEN_TPS,
+            rule=track_cumulative_rule(
+                "CumulativeShutdownGenCapacity", "ShutdownGenCapacity"
+            ),
+        )
+
+        def recent_startups(m, g, t):
+            return window_total(
+                m, g, t, m.gen_min_uptime[g], m.CumulativeStartupGenCapacity
+            )
+
+        def recent_shutdowns(m, g, t):
+            return window_total(
+                m, g, t, m.gen_min_downtime[g], m.CumulativeShutdownGenCapacity
+            )
+
+    else:
+
+        def recent_startups(m, g, t):
+            return sum(
                 m.StartupGenCapacity[g, t_prior]
                 for t_prior in time_window(m, t, m.gen_min_uptime[g])
             )
-        ),
+
+        def recent_shutdowns(m, g, t):
+            return sum(
+                m.ShutdownGenCapacity[g, t_prior]
+                for t_prior in time_window(m, t, m.gen_min_downtime[g])
+            )
+
+    mod.Enforce_Min_Uptime = Constraint(
+        mod.UPTIME_CONSTRAINED_GEN_TPS,
+        doc="All capacity turned on in the last x hours must still be on now",
+        rule=lambda m, g, t: (m.CommitGen[g, t] >= recent_startups(m, g, t)),
     )
     # Matthias notes on Enforce_Min_Downtime: The max(...) term finds the
     # largest fraction of capacity that could have been committed in the last
@@ -352,6 +466,8 @@ def define_components(mod):
     # due to a maintenance outage.
     # The max() term & documentation is confusing to Josiah.
     # See https://github.com/switch-model/switch/issues/123 for discussion.
+    # (The max() is now precomputed in
+    # gen_max_commit_fraction_in_downtime_window.)
     mod.Enforce_Min_Downtime = Constraint(
         mod.DOWNTIME_CONSTRAINED_GEN_TPS,
         doc=(
@@ -367,17 +483,9 @@ def define_components(mod):
             (
                 m.GenCapacityInTP[g, t]
                 * m.gen_availability[g]
-                * max(
-                    m.gen_max_commit_fraction[g, t_prior]
-                    for t_prior in time_window(
-                        m, t, m.gen_min_downtime[g], add_one=True
-                    )
-                )
-            )
-            - sum(
-                m.ShutdownGenCapacity[g, t_prior]
-                for t_prior in time_window(m, t, m.gen_min_downtime[g])
+                * m.gen_max_commit_fraction_in_downtime_window[g, t]
             )
+            - recent_shutdowns(m, g, t)
         ),
     )
 
@@ -423,6 +531,65 @@ def define_components(mod):
     )
 
 
+def ts_window_index(m, t):
+    """
+    Return the list of timepoints in the timeseries that contains t and the
+    position of t in that list. These are built in one pass over the
+    timeseries and cached on m, so circular windows of timepoints can be
+    found by list indexing instead of calling TPS_IN_TS[ts].prevw() for each
+    step.
+    """
+    index = getattr(m, "tp_window_index", None)
+    if index is None:
+        index = {}
+        for ts in m.TIMESERIES:
+            tps = list(m.TPS_IN_TS[ts])
+            index.update((tp, (tps, pos)) for pos, tp in enumerate(tps))
+        m.tp_window_index = index
+        add_construction_helper(m, "tp_window_index")
+    return index[t]
+
+
+def downtime_window_max_index(m):
+    """
+    Find the largest gen_max_commit_fraction in the downtime window (plus one
+    step) ending at each timepoint, using a sliding-window maximum over each
+    timeseries, for use with pop_construction_index().
+    """
+    result = {}
+    gens = {g for g, t in m.DOWNTIME_CONSTRAINED_GEN_TPS}
+    for g in gens:
+        for ts in m.TIMESERIES:
+            tps = list(m.TPS_IN_TS[ts])
+            if (g, tps[0]) not in m.DOWNTIME_CONSTRAINED_GEN_TPS:
+                continue
+            n = int(round(m.gen_min_downtime[g] / m.ts_duration_of_tp[ts])) + 1
+            values = [m.gen_max_commit_fraction[g, t] for t in tps]
+            result.update(zip(((g, t) for t in tps), circular_window_max(values, n)))
+    return {"gen_max_commit_fraction_in_downtime_window": result}
+
+
+def circular_window_max(values, n):
+    """
+    Return the maximum of the n values ending at each position in values,
+    wrapping around to the end of the list as needed.
+    """
+    if n >= len(values):
+        return [max(values)] * len(values)
+    result = []
+    window = deque()  # positions in extended list, with decreasing values
+    extended = values[len(values) - n + 1 :] + values
+    for i, v in enumerate(extended):
+        while window and extended[window[-1]] <= v:
+            window.pop()
+        window.append(i)
+        if window[0] <= i - n:
+            window.popleft()
+        if i >= n - 1:
+            result.append(extended[window[0]])
+    return result
+
+
 def load_inputs(mod, switch_data, inputs_dir):
     """
 
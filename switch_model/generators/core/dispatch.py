@@ -17,7 +17,7 @@ import pandas as pd
 from pyomo.environ import *
 
 from switch_model.reporting import write_table
-from switch_model.utilities import unwrap
+from switch_model.utilities import expression_values, pop_construction_index, unwrap
 
 dependencies = (
     "switch_model.timescales",
@@ -51,6 +51,12 @@ def define_components(mod):
     TPS_FOR_GEN, but broken down by period. Periods when
     the project is inactive will yield an empty set.
 
+    GENS_IN_ZONE_TP[z in LOAD_ZONES, t in TIMEPOINTS] is the same data as
+    GEN_TPS, broken down by load zone and timepoint. It lists the projects
+    in each zone that can be dispatched in each timepoint, and should be
+    used instead of scanning GENS_IN_ZONE when summing project-level
+    decisions for each zone and timepoint.
+
     GenCapacityInTP[(g, t) in GEN_TPS] is the same as
     GenCapacity but indexed by timepoint rather than period to allow
     more compact statements.
@@ -230,18 +236,26 @@ def define_components(mod):
         mod.GEN_TPS, rule=lambda m, g, t: m.GenCapacity[g, m.tp_period[t]]
     )
     mod.DispatchGen = Var(mod.GEN_TPS, within=NonNegativeReals)
+    mod.GENS_IN_ZONE_TP = Set(
+        mod.LOAD_ZONES,
+        mod.TIMEPOINTS,
+        dimen=1,
+        initialize=lambda m, z, t: pop_construction_index(
+            m, "gens_in_zone_tp_index", gens_in_zone_tp_index, "GENS_IN_ZONE_TP", (z, t)
+        ),
+    )
     mod.ZoneTotalCentralDispatch = Expression(
         mod.LOAD_ZONES,
         mod.TIMEPOINTS,
         rule=lambda m, z, t: sum(
             m.DispatchGen[p, t]
-            for p in m.GENS_IN_ZONE[z]
-            if (p, t) in m.GEN_TPS and not m.gen_is_distributed[p]
+            for p in m.GENS_IN_ZONE_TP[z, t]
+            if not m.gen_is_distributed[p]
         )
         - sum(
             m.DispatchGen[p, t] * m.gen_ccs_energy_load[p]
-            for p in m.GENS_IN_ZONE[z]
-            if (p, t) in m.GEN_TPS and p in m.CCS_EQUIPPED_GENS
+            for p in m.GENS_IN_ZONE_TP[z, t]
+            if p in m.CCS_EQUIPPED_GENS
         ),
         doc="Net power from grid-tied generation projects.",
     )
@@ -255,8 +269,8 @@ def define_components(mod):
         mod.TIMEPOINTS,
         rule=lambda m, z, t: sum(
             m.DispatchGen[g, t]
-            for g in m.GENS_IN_ZONE[z]
-            if (g, t) in m.GEN_TPS and m.gen_is_distributed[g]
+            for g in m.GENS_IN_ZONE_TP[z, t]
+            if m.gen_is_distributed[g]
         ),
         doc="Total power from distributed generation projects.",
     )
@@ -382,6 +396,19 @@ def define_components(mod):
     mod.Cost_Components_Per_TP.append("GenVariableOMCostsInTP")
 
 
+def gens_in_zone_tp_index(m):
+    """
+    Construct GENS_IN_ZONE_TP with a single pass through GEN_TPS, for use
+    with pop_construction_index(). This takes time proportional to the size
+    of GEN_TPS, instead of scanning all the projects in each zone for every
+    timepoint.
+    """
+    index = {(z, t): [] for z in m.LOAD_ZONES for t in m.TIMEPOINTS}
+    for g, t in m.GEN_TPS:
+        index[m.gen_load_zone[g], t].append(g)
+    return {"GENS_IN_ZONE_TP": index}
+
+
 def load_inputs(mod, switch_data, inputs_dir):
     """
 
@@ -436,6 +463,20 @@ def post_solve(instance, outdir):
         + tuple(m.DispatchGen[p, t] if (p, t) in m.GEN_TPS else 0.0 for p in gen_proj),
     )
 
+    def expression_dict(e):
+        return dict(zip(e.keys(), expression_values(instance, e).tolist()))
+
+    # evaluate these all at once; they are used many times below
+    gen_capacity = expression_dict(instance.GenCapacity)
+    gen_capital_costs = expression_dict(instance.GenCapitalCosts)
+    gen_fixed_om_costs = expression_dict(instance.GenFixedOMCosts)
+    dispatch_emissions = collections.defaultdict(float)
+    for (g, t, f), e in zip(
+        instance.DispatchEmissions.keys(),
+        expression_values(instance, instance.DispatchEmissions).tolist(),
+    ):
+        dispatch_emissions[g, t] += e * instance.tp_weight_in_year[t]
+
     dispatch_normalized_dat = []
     for g, t in instance.GEN_TPS:
         p = instance.tp_period[t]
@@ -457,17 +498,12 @@ def post_solve(instance, outdir):
                 * instance.gen_variable_om[g]
                 * instance.tp_weight_in_year[t]
             ),
-            "DispatchEmissions_tCO2_per_typical_yr": value(
-                sum(
-                    instance.DispatchEmissions[g, t, f] * instance.tp_weight_in_year[t]
-                    for f in instance.FUELS_FOR_GEN[g]
-                )
-            )
+            "DispatchEmissions_tCO2_per_typical_yr": dispatch_emissions[g, t]
             if instance.gen_uses_fuel[g]
             else 0,
-            "GenCapacity_MW": value(instance.GenCapacity[g, p]),
-            "GenCapitalCosts": value(instance.GenCapitalCosts[g, p]),
-            "GenFixedOMCosts": value(instance.GenFixedOMCosts[g, p]),
+            "GenCapacity_MW": gen_capacity[g, p],
+            "GenCapitalCosts": gen_capital_costs[g, p],
+            "GenFixedOMCosts": gen_fixed_om_costs[g, p],
         }
         try:
             try:
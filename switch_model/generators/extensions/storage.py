@@ -8,7 +8,7 @@ storage, when to charge, energy accounting, etc.
 """
 
 from pyomo.environ import *
-import os, collections
+import os
 from switch_model.financials import capital_recovery_factor as crf
 
 dependencies = (
@@ -207,15 +207,13 @@ def define_components(mod):
     # TODO: rename this StorageTotalCharging or similar (to indicate it's a
     # sum for a zone, not a net quantity for a project)
     def rule(m, z, t):
-        # Construct and cache a set for summation as needed
-        if not hasattr(m, "Storage_Charge_Summation_dict"):
-            m.Storage_Charge_Summation_dict = collections.defaultdict(set)
-            for g, t2 in m.STORAGE_GEN_TPS:
-                z2 = m.gen_load_zone[g]
-                m.Storage_Charge_Summation_dict[z2, t2].add(g)
-        # Use pop to free memory
-        relevant_projects = m.Storage_Charge_Summation_dict.pop((z, t), {})
-        return sum(m.ChargeStorage[g, t] for g in relevant_projects)
+        # use the shared index of active projects (see GENS_IN_ZONE_TP in
+        # switch_model.generators.core.dispatch)
+        return sum(
+            m.ChargeStorage[g, t]
+            for g in m.GENS_IN_ZONE_TP[z, t]
+            if g in m.STORAGE_GENS
+        )
 
     mod.StorageNetCharge = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=rule)
     # Register net charging with zonal energy balance. Discharging is already
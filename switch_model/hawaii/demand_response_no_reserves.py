@@ -18,6 +18,7 @@ import os, sys, time
 from pprint import pprint
 from pyomo.environ import *
 import switch_model.utilities as utilities
+from switch_model.utilities import rebuild_components
 
 demand_module = None  # will be set via command-line options
 
@@ -510,7 +511,9 @@ def total_direct_costs_per_year(m, period):
 
 def electricity_marginal_cost(m, z, tp):
     """Return marginal cost of production per MWh in load_zone z during timepoint tp."""
-    return m.dual[m.Energy_Balance[z, tp]] / m.bring_timepoint_costs_to_base_year[tp]
+    return (
+        m.dual[m.Zone_Energy_Balance[z, tp]] / m.bring_timepoint_costs_to_base_year[tp]
+    )
 
 
 def electricity_demand(m, z, tp):
@@ -726,33 +729,33 @@ def add_bids(m, bids):
     print("len(m.DR_BID_LIST): {l}".format(l=len(m.DR_BID_LIST)))
     print("m.DR_BID_LIST: {b}".format(b=[x for x in m.DR_BID_LIST]))
 
-    # reconstruct the components that depend on m.DR_BID_LIST, m.dr_bid_benefit and m.dr_bid
-    m.DRBidWeight.reconstruct()
-    m.DR_Convex_Bid_Weight.reconstruct()
-    m.FlexibleDemand.reconstruct()
-    m.DR_Welfare_Cost.reconstruct()
-    # it seems like we have to reconstruct the higher-level components that depend on these
+    # rebuild the components that depend on m.DR_BID_LIST, m.dr_bid_benefit and m.dr_bid
+    # (if using --persistent-solver, only these parts of the model are sent
+    # to the solver again)
+    rebuild_components(
+        m, m.DRBidWeight, m.DR_Convex_Bid_Weight, m.FlexibleDemand, m.DR_Welfare_Cost
+    )
+    # it seems like we have to rebuild the higher-level components that depend on these
     # ones (even though these are Expressions), because otherwise they refer to objects that
     # used to be returned by the Expression but aren't any more (e.g., versions of DRBidWeight
     # that no longer exist in the model).
-    # (i.e., Energy_Balance refers to the items returned by FlexibleDemand instead of referring
-    # to FlexibleDemand itself)
+    # (i.e., Zone_Energy_Balance refers to the items returned by FlexibleDemand
+    # instead of referring to FlexibleDemand itself)
     reconstruct_energy_balance(m)
-    m.SystemCostPerPeriod.reconstruct()
-    m.SystemCost.reconstruct()
+    rebuild_components(m, m.SystemCostPerPeriod, m.SystemCost)
 
 
 def reconstruct_energy_balance(m):
-    """Reconstruct Energy_Balance constraint, preserving dual values (if present)."""
-    # copy the existing Energy_Balance object
-    old_Energy_Balance = dict(m.Energy_Balance)
-    m.Energy_Balance.reconstruct()
+    """Rebuild Zone_Energy_Balance constraint, preserving dual values (if present)."""
+    # copy the existing Zone_Energy_Balance object
+    old_Energy_Balance = dict(m.Zone_Energy_Balance)
+    rebuild_components(m, m.Zone_Energy_Balance)
     # TODO: now that this happens just before a solve, there may be no need to
     # preserve duals across the reconstruct().
     if m.iteration_number > 0:
         for k in old_Energy_Balance:
-            # change dual entries to match new Energy_Balance objects
-            m.dual[m.Energy_Balance[k]] = m.dual.pop(old_Energy_Balance[k])
+            # change dual entries to match new Zone_Energy_Balance objects
+            m.dual[m.Zone_Energy_Balance[k]] = m.dual.pop(old_Energy_Balance[k])
 
 
 def write_batch_results(m):
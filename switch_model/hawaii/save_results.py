@@ -20,10 +20,11 @@ from __future__ import division
 # These definitions should be stored in model.config, so maybe the reporting functions should be
 # added as methods (possibly by util rather than a separate reporting module).
 
-import os
+import math, os
 from collections import defaultdict
 from pyomo.environ import *
 import switch_model.hawaii.util as util
+from switch_model.utilities import constraint_duals, expression_values
 import switch_model.financials as financials
 
 
@@ -71,9 +72,12 @@ def summary_values(m):
     # with the number of timepoints, so it gets very slow for big models and we don't
     # want to repeat it if possible (e.g., without caching, this function takes up
     # to an hour for an 8760 Oahu model)
-    SystemCostPerPeriod = dict()
-    for p in m.PERIODS:
-        SystemCostPerPeriod[p] = value(m.SystemCostPerPeriod[p])
+    SystemCostPerPeriod = dict(
+        zip(
+            m.SystemCostPerPeriod.keys(),
+            expression_values(m, m.SystemCostPerPeriod).tolist(),
+        )
+    )
     SystemCost = sum(SystemCostPerPeriod[p] for p in m.PERIODS)
 
     # scenario name and looping variables
@@ -180,6 +184,17 @@ def DispatchGenByFuel(m, g, tp, fuel):
     return result
 
 
+def marginal_costs(m, constraint):
+    """
+    Return a dict of the undiscounted marginal cost for each index of
+    constraint, or "" if no dual is available (e.g., with the glpk solver).
+    """
+    duals = constraint_duals(m, constraint).tolist()
+    return {
+        k: "" if math.isnan(v) else v for k, v in zip(constraint.index_set(), duals)
+    }
+
+
 def write_results(m, outputs_dir):
     tag = "_" + m.options.scenario_name if m.options.scenario_name else ""
 
@@ -230,6 +245,8 @@ def write_results(m, outputs_dir):
     avg_ts_scale = float(sum(m.ts_scale_to_year[ts] for ts in m.TIMESERIES)) / len(
         m.TIMESERIES
     )
+    # marginal cost of energy, or "" if no dual is available (e.g., with glpk)
+    energy_cost = marginal_costs(m, m.Zone_Energy_Balance)
     util.write_table(
         m,
         m.LOAD_ZONES,
@@ -289,14 +306,7 @@ def write_results(m, outputs_dir):
             else (0.0, 0.0)
         )
         + (
-            (
-                (
-                    m.dual[m.Zone_Energy_Balance[z, t]]
-                    / m.bring_timepoint_costs_to_base_year[t]
-                )
-                if m.Zone_Energy_Balance[z, t] in m.dual
-                else ""  # no dual available, e.g., with glpk solver
-            ),
+            energy_cost[z, t],
             "peak" if m.ts_scale_to_year[m.tp_ts[t]] < avg_ts_scale else "typical",
         ),
     )
@@ -304,6 +314,7 @@ def write_results(m, outputs_dir):
     if hasattr(m, "Spinning_Reserve_Up_Requirements") and hasattr(
         m, "GEN_SPINNING_RESERVE_TYPES"
     ):  # advanced module
+        up_reserve_cost = marginal_costs(m, m.Satisfy_Spinning_Reserve_Up_Requirement)
         # write the reserve values
         util.write_table(
             m,
@@ -365,21 +376,8 @@ def write_results(m, outputs_dir):
                 for component in m.Spinning_Reserve_Up_Requirements
             )
             + tuple(
-                (
-                    ""
-                    if val is None  # no dual available, i.e., with glpk solver
-                    else val / m.bring_timepoint_costs_to_base_year[t]
-                )
-                for val in [
-                    util.get(
-                        m.dual,
-                        util.get(
-                            m.Satisfy_Spinning_Reserve_Up_Requirement, (rt, ba, t), None
-                        ),
-                        None,
-                    )
-                    for rt in sorted(m.SPINNING_RESERVE_TYPES_FROM_GENS)
-                ]
+                up_reserve_cost.get((rt, ba, t), "")
+                for rt in sorted(m.SPINNING_RESERVE_TYPES_FROM_GENS)
             )
             + (
                 (
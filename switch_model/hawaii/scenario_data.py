@@ -1,6 +1,7 @@
 from __future__ import print_function
 
 import time, sys, collections, os, itertools
+import concurrent.futures, hashlib, shutil, tempfile, threading
 from textwrap import dedent
 from switch_model import __version__ as switch_version
 from switch_model.utilities import iteritems
@@ -98,6 +99,12 @@ def write_tables_implementation(args, alt_args={}, scenarios=[]):
     '--input-alias[es]' and the file substitutions corresponding to the
     specified data tags. A warning is issued if two tags cause conflicting file
     substitutions.
+
+    Queries are run on up to `args["query_jobs"]` database connections at once
+    (default is 4). Each distinct query is only run once, and the result is
+    stored in `args["query_cache_dir"]`, if specified, so later calls can reuse
+    it without contacting the database (delete this directory to fetch fresh
+    data).
     """
     # Note: this works by comparing the final queries used to generate each
     # table, so it will reuse tables from the base model if they are identical
@@ -109,21 +116,26 @@ def write_tables_implementation(args, alt_args={}, scenarios=[]):
     # query or to control which tables are defined or add or remove clauses from
     # the query.
 
-    # The code below could be streamlined a little by retrieving the query list
-    # from write_base_tables and then passing it to write_alternative_tables,
-    # but it works pretty well as is.
+    # All the tables are written at the end by write_queries(), which runs
+    # distinct queries on several database connections at once and copies the
+    # result to every file that uses the same query (e.g., if an alternative
+    # scenario only changes some of the tables).
 
     # write version marker file
     with open(make_file_path("switch_inputs_version.txt", args), "w") as f:
         f.write(switch_version)
 
-    # write base tables
-    write_base_tables(args)
+    # gather queries for base tables
+    base_queries = get_queries(args)
+    file_queries = [(make_file_path(t, args), q) for t, q in base_queries]
 
-    # write alternative tables
+    # gather queries for alternative tables
     data_aliases = {}
     for a in alt_args:
-        data_aliases[a["tag"]] = write_alternative_tables(args, a)
+        data_aliases[a["tag"]], alt_queries = alternative_queries(args, a, base_queries)
+        file_queries.extend(alt_queries)
+
+    write_queries(file_queries, args)
 
     # write scenarios.txt
     scenario_args = []
@@ -153,22 +165,34 @@ def write_tables_implementation(args, alt_args={}, scenarios=[]):
 
 def write_base_tables(args):
     queries = get_queries(args)
-    for table, query in queries:
-        write_table(make_file_path(table, args), query)
+    write_queries([(make_file_path(t, args), q) for t, q in queries], args)
 
 
 def write_alternative_tables(base_args, alt_args):
-    # add alt_args to base_args, then check for queries that are
-    # added, modified or dropped
-    base_queries = dict(get_queries(base_args))
+    aliases, file_queries = alternative_queries(base_args, alt_args)
+    write_queries(file_queries, base_args)
+    return aliases
+
+
+def alternative_queries(base_args, alt_args, base_queries=None):
+    """
+    Return a list of (table, alias) pairs and a list of (output file, query)
+    for the tables that are added, modified or dropped when `alt_args` are
+    added to `base_args`. `base_queries` can be the result of
+    `get_queries(base_args)`, if it is already available.
+    """
+    if base_queries is None:
+        base_queries = get_queries(base_args)
+    base_queries = dict(base_queries)
     full_alt_args = dict(itertools.chain(base_args.items(), alt_args.items()))
     alt_queries = dict(get_queries(full_alt_args))
     # get location for files created by alt_args, relative to files created by base_args
     alt_relative_path = os.path.relpath(
         make_file_path(".", full_alt_args), start=make_file_path(".", base_args)
     )
-    # find differences and run alt queries
+    # find differences and queue alt queries
     aliases = []
+    file_queries = []
     for table, query in alt_queries.items():
         if table not in base_queries or query != base_queries[table]:
             # new or altered table
@@ -179,7 +203,7 @@ def write_alternative_tables(base_args, alt_args):
                 new_table = table_base + "." + full_alt_args["tag"] + table_ext
             else:
                 new_table = os.path.join(alt_relative_path, table)
-            write_table(make_file_path(new_table, base_args), query)
+            file_queries.append((make_file_path(new_table, base_args), query))
             # note: if regular files are in inputs and alternative files are in
             # inputs_alt, then this will set file.csv=../inputs_alt/file.csv,
             # and then --input-alias will just do a simple translation of
@@ -187,7 +211,7 @@ def write_alternative_tables(base_args, alt_args):
             aliases.append((table, new_table))
     # exclude tables that are omitted in the alternative case
     aliases.extend((t, "none") for t, q in base_queries.items() if t not in alt_queries)
-    return aliases
+    return aliases, file_queries
 
 
 def get_queries(args):
@@ -1325,64 +1349,106 @@ def make_file_path(file, args):
     return path
 
 
+# function that returns a new DB-API connection; if None, connect() opens a
+# read-only psycopg2 connection using the settings above. This can be replaced
+# by a function that connects to a local stand-in database (e.g., sqlite3) for
+# testing.
+connection_factory = None
+
 con = None
+# connections for worker threads in write_queries()
+thread_data = threading.local()
+all_connections = []
+connection_lock = threading.Lock()
 
 
-def db_cursor():
-    global con
-    if con is None:
-        try:
-            # note: we don't import until here to avoid interfering with unit tests on systems that don't have
-            # (or need) psycopg2
-            global psycopg2, sql
-            import psycopg2, psycopg2.sql as sql
-        except ImportError:
-            print(
-                dedent(
-                    """
-                ############################################################################################
-                Unable to import psycopg2 module to access database server.
-                Please install this module via 'conda install psycopg2' or 'pip install psycopg2'.
-                ############################################################################################
+def connect():
+    if connection_factory is not None:
+        return connection_factory()
+    try:
+        # note: we don't import until here to avoid interfering with unit tests on systems that don't have
+        # (or need) psycopg2
+        global psycopg2, sql
+        import psycopg2, psycopg2.sql as sql
+    except ImportError:
+        print(
+            dedent(
                 """
-                )
+            ############################################################################################
+            Unable to import psycopg2 module to access database server.
+            Please install this module via 'conda install psycopg2' or 'pip install psycopg2'.
+            ############################################################################################
+            """
             )
-            raise
-        try:
-            # note: the connection gets created when the module loads and never gets closed (until presumably python exits)
-            con = psycopg2.connect(database=pgdatabase, host=pghost, user=pguser)
-            # use read-only session, because that's enough for this script and it's possible something
-            # weird could come through in the configuration info that gets passed to postgresql
-            con.set_session(readonly=True, autocommit=True)
-            print(
-                "Reading data from database {} on server {}".format(pgdatabase, pghost)
+        )
+        raise
+    try:
+        new_con = psycopg2.connect(database=pgdatabase, host=pghost, user=pguser)
+        # use read-only session, because that's enough for this script and it's possible something
+        # weird could come through in the configuration info that gets passed to postgresql
+        new_con.set_session(readonly=True, autocommit=True)
+    except psycopg2.OperationalError:
+        print(
+            dedent(
+                """
+            ############################################################################################
+            Error while connecting to database '{db}' on postgres server '{server}' as user '{user}'.
+            Please ensure that the following environment variables are set:
+            PGUSER = your postgres username
+            PGHOST = hostname or IP address of postgres server
+            PGDATABASE = name of switch database on this server.
+            There should also be a line like "*:*:*:<user>:<password>" in ~/.pgpass (which should be chmod 0600)
+            or in %APPDATA%\\postgresql\\pgpass.conf (Windows).
+            See http://www.postgresql.org/docs/9.1/static/libpq-pgpass.html for more details.
+            ############################################################################################
+            """.format(
+                    server=pghost, db=pgdatabase, user=pguser
+                )
             )
+        )
+        raise
+    return new_con
 
-        except psycopg2.OperationalError:
+
+def db_cursor():
+    global con
+    if con is None:
+        # note: the connection gets created when the first query is prepared
+        # and never gets closed (until presumably python exits)
+        con = connect()
+        if connection_factory is None:
             print(
-                dedent(
-                    """
-                ############################################################################################
-                Error while connecting to database '{db}' on postgres server '{server}' as user '{user}'.
-                Please ensure that the following environment variables are set:
-                PGUSER = your postgres username
-                PGHOST = hostname or IP address of postgres server
-                PGDATABASE = name of switch database on this server.
-                There should also be a line like "*:*:*:<user>:<password>" in ~/.pgpass (which should be chmod 0600)
-                or in %APPDATA%\postgresql\pgpass.conf (Windows).
-                See http://www.postgresql.org/docs/9.1/static/libpq-pgpass.html for more details.
-                ############################################################################################
-                """.format(
-                        server=pghost, db=pgdatabase, user=pguser
-                    )
-                )
+                "Reading data from database {} on server {}".format(pgdatabase, pghost)
             )
-            raise
     return con.cursor()
 
 
+def thread_cursor():
+    # return a cursor for a connection that is only used by the current thread
+    # (psycopg2 serializes queries on each connection and sqlite3 connections
+    # can't be shared between threads)
+    if getattr(thread_data, "con", None) is None:
+        thread_data.con = connect()
+        with connection_lock:
+            all_connections.append(thread_data.con)
+    return thread_data.con.cursor()
+
+
+def close_thread_connections():
+    with connection_lock:
+        while all_connections:
+            all_connections.pop().close()
+
+
 def prepare_query(query, arguments):
-    return db_cursor().mogrify(query, arguments)
+    cur = db_cursor()
+    if hasattr(cur, "mogrify"):
+        # psycopg2: get the final query text, with the arguments filled in
+        return cur.mogrify(query, arguments)
+    else:
+        # other drivers (e.g., sqlite3 for testing) use named placeholders
+        # (:name); keep the arguments that the query uses
+        return (query, {k: v for k, v in arguments.items() if ":" + k in query})
 
 
 def add_query(queries, file, query, arguments):
@@ -1411,21 +1477,105 @@ def add_one_row_literal(queries, table, arg_names, args):
     )
 
 
+def query_text(query):
+    # return the text of a prepared query, for messages and cache keys
+    if isinstance(query, tuple):
+        return "{} {!r}".format(query[0], sorted(query[1].items()))
+    elif isinstance(query, bytes):
+        return query.decode()
+    else:
+        return str(query)
+
+
 def write_table(output_file, query):
     print("Writing {file} ...".format(file=output_file), end=" ")
     sys.stdout.flush()  # display the part line to the user
 
     start = time.time()
-    cur = db_cursor()
+    with open(output_file, "w") as f:
+        fetch_table(db_cursor(), query, f)
+    print("time taken: {dur:.2f}s".format(dur=time.time() - start))
+
+
+def fetch_table(cur, query, f, batch_size=10000):
+    """
+    Run `query` on cursor `cur` and write the result to open file `f`,
+    fetching and formatting `batch_size` rows at a time. Returns the number of
+    rows written.
+    """
     try:
-        cur.execute(query)
+        if isinstance(query, tuple):
+            cur.execute(*query)
+        else:
+            cur.execute(query)
     except:
-        print("\nError running the following query:\n{}\n".format(query.decode()))
+        print("\nError running the following query:\n{}\n".format(query_text(query)))
         raise
-    with open(output_file, "w") as f:
-        writerow(f, [d[0] for d in cur.description])  # header
-        writerows(f, cur)  # data
-    print("time taken: {dur:.2f}s".format(dur=time.time() - start))
+    writerow(f, [d[0] for d in cur.description])  # header
+    n_rows = 0
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        f.write(format_rows(rows))
+        n_rows += len(rows)
+    return n_rows
+
+
+def write_queries(file_queries, args={}):
+    """
+    Run the queries in `file_queries` (a list of (output file, query) tuples)
+    and save the results in the corresponding files. Distinct queries are run
+    on up to `args["query_jobs"]` connections at once (default is 4) and
+    tables that use the same query are only fetched once. Results are cached
+    in `args["query_cache_dir"]` if specified; otherwise they are only reused
+    within this call.
+    """
+    files_for_query = collections.OrderedDict()
+    for output_file, query in file_queries:
+        files_for_query.setdefault(query_text(query), []).append((output_file, query))
+
+    cache_dir = args.get("query_cache_dir")
+    if cache_dir is None:
+        cache_dir = temp_cache_dir = tempfile.mkdtemp(prefix="switch_queries_")
+    else:
+        temp_cache_dir = None
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def run(text):
+        files = files_for_query[text]
+        cache_file = os.path.join(
+            cache_dir, hashlib.sha1(text.encode()).hexdigest() + ".csv"
+        )
+        start = time.time()
+        if os.path.exists(cache_file):
+            source = "cached"
+        else:
+            # write to a temporary name first, so an interrupted query
+            # doesn't leave a partial file in the cache
+            with open(cache_file + ".part", "w") as f:
+                n_rows = fetch_table(thread_cursor(), files[0][1], f)
+            os.replace(cache_file + ".part", cache_file)
+            source = "{} rows".format(n_rows)
+        for output_file, query in files:
+            shutil.copyfile(cache_file, output_file)
+        return files, source, time.time() - start
+
+    jobs = max(1, args.get("query_jobs", 4))
+    try:
+        with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+            for files, source, dur in executor.map(run, files_for_query):
+                for output_file, query in files:
+                    print(
+                        "Wrote {file} ({source}, time taken: {dur:.2f}s)".format(
+                            file=output_file, source=source, dur=dur
+                        )
+                    )
+    finally:
+        close_thread_connections()
+        if temp_cache_dir is not None:
+            shutil.rmtree(temp_cache_dir, ignore_errors=True)
 
 
 def stringify(val):
@@ -1440,6 +1590,20 @@ def stringify(val):
     return out
 
 
+def format_column(values):
+    # values that are not strings or null can be converted directly
+    if any(v is None or type(v) is str for v in values):
+        return list(map(stringify, values))
+    else:
+        return list(map(str, values))
+
+
+def format_rows(rows):
+    """Return a block of text for a list of rows, formatting a column at a time."""
+    columns = [format_column(col) for col in zip(*rows)]
+    return "".join(",".join(row) + "\n" for row in zip(*columns))
+
+
 def writerow(f, row):
     f.write(",".join(stringify(c) for c in row) + "\n")
 
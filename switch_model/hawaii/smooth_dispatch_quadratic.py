@@ -4,6 +4,7 @@ from __future__ import print_function
 
 from pyomo.environ import *
 import switch_model.solve
+from switch_model.utilities import update_persistent_vars
 
 
 def define_components(m):
@@ -168,6 +169,11 @@ def post_iterate(m):
     return done
 
 
+# post_solve re-solves the model, so it can't run alongside other modules'
+# post_solve functions (see switch_model.utilities.run_post_solve)
+post_solve_modifies_model = True
+
+
 def post_solve(m, outputs_dir):
     """Smooth dispatch if it wasn't already done during an iterative solution."""
     if m.options.smooth_dispatch and not getattr(m, "iterated_smooth_dispatch", False):
@@ -182,6 +188,7 @@ def pre_smooth_solve(m):
     """store model state and prepare for smoothing"""
     save_duals(m)
     fix_obj_expression(m.Minimize_System_Cost)
+    update_persistent_vars(m, m.Minimize_System_Cost.expr)
     m.Minimize_System_Cost.deactivate()
     m.Smooth_Free_Variables.activate()
     print("smoothing free variables...")
@@ -194,6 +201,7 @@ def post_smooth_solve(m):
     m.Minimize_System_Cost.activate()
     # unfix the variables
     fix_obj_expression(m.Minimize_System_Cost, False)
+    update_persistent_vars(m, m.Minimize_System_Cost.expr)
     # restore any duals from the original solution
     restore_duals(m)
 
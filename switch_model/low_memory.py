@@ -0,0 +1,111 @@
+"""
+Reduce the memory used by a model instance between construction and solving.
+
+"switch solve --low-memory" discards data that are only needed while the
+model is being constructed, as soon as construction is finished: the
+DataPortal holding all the input data (normally kept on the instance as
+instance.DataPortal) and any construction indexes or caches that modules
+registered with switch_model.utilities.add_construction_helper() and did not
+free themselves. It also reports the peak memory (resident set size) used
+so far at the end of each phase of the run, to show which phase sets the
+peak. Without the DataPortal, "switch solve-scenarios --reuse-model" cannot
+update the instance in place, so each scenario is loaded from scratch.
+
+"switch solve --free-constraint-bodies" also discards the expression for the
+body of each constraint once the model has been passed to the solver (after
+the problem file is written, or after the matrices are assembled with
+--matrix-backend). The bounds of each constraint and any duals returned by
+the solver are kept, but the body is replaced by nan and the constraint is
+deactivated, so the model cannot be solved again. This is not done for
+iterated models, Benders decomposition, persistent solvers,
+--diagnose-infeasibility or models with modules that re-solve the model
+during post-solve (post_solve_modifies_model), which need the constraints
+after the first solve.
+"""
+import gc
+
+from pyomo.environ import *
+from pyomo.core.expr.numvalue import NumericConstant
+
+from switch_model.utilities import delete_construction_helpers, max_rss_mb
+
+
+def add_low_memory_args(parser):
+    parser.add_argument(
+        "--low-memory",
+        default=False,
+        action="store_true",
+        help="""
+            Discard the input data and other construction-only data after
+            the model instance is constructed, and report peak memory use at
+            the end of each phase (see switch_model.low_memory).
+        """,
+    )
+    parser.add_argument(
+        "--free-constraint-bodies",
+        default=False,
+        action="store_true",
+        help="""
+            Discard the body of each constraint after the model is passed to
+            the solver, keeping only the bounds and duals for post-solve
+            reporting (see switch_model.low_memory).
+        """,
+    )
+
+
+def release_construction_data(m):
+    """
+    Delete the DataPortal and registered construction helpers from model
+    instance m, and return the number of objects deleted.
+    """
+    released = delete_construction_helpers(m)
+    if hasattr(m, "DataPortal"):
+        del m.DataPortal
+        released += 1
+    gc.collect()
+    return released
+
+
+def can_free_constraint_bodies(m):
+    """
+    Return True if constraint bodies can be freed when m is solved, i.e.,
+    --free-constraint-bodies was specified and m will only be solved once.
+    """
+    options = m.options
+    return (
+        options.free_constraint_bodies
+        and not m.iterate_modules
+        and not options.benders
+        and not options.persistent_solver
+        and not options.diagnose_infeasibility
+        and not any(
+            getattr(module, "post_solve_modifies_model", False)
+            for module in m.get_modules()
+        )
+    )
+
+
+def free_constraint_bodies(m):
+    """
+    Replace the body of each active constraint in m with nan and deactivate
+    it, keeping its bounds, and return the number of constraints freed.
+    """
+    nan = NumericConstant(float("nan"))
+    inf = float("inf")
+    constraints = list(m.component_data_objects(Constraint, active=True))
+    for con in constraints:
+        # Pyomo misreads one-sided constraints with constant bodies, so we
+        # give infinite bounds (stored as None) instead of None.
+        lb, ub = con.lb, con.ub
+        con.set_value((-inf if lb is None else lb, nan, inf if ub is None else ub))
+        con.deactivate()
+    gc.collect()
+    return len(constraints)
+
+
+def log_peak_memory(m, phase):
+    """Report peak memory use after `phase` if --low-memory was specified."""
+    if m.options.low_memory:
+        rss = max_rss_mb()
+        if rss is not None:
+            m.logger.info(f"Peak memory use after {phase}: {rss:,.0f} MB.")
@@ -0,0 +1,999 @@
+"""
+Pass a model instance to HiGHS as sparse arrays instead of a problem file,
+or write the arrays as an MPS file.
+
+"switch solve --matrix-backend" bypasses the solver files: the coefficients
+of the model are stored in sparse arrays (one row per constraint and one
+column per variable) and passed directly to the HiGHS solver included with
+scipy (scipy.optimize.linprog for linear programs or scipy.optimize.milp if
+there are integer variables). This avoids writing and parsing a problem
+file and the solver's solution file, which take a large share of the time
+for big linear models. The solution (and duals for linear programs, if the
+model has a dual suffix) is then loaded back into the model, so the
+standard outputs are written as usual.
+
+If the model only uses the modules in core_modules (timescales, financials,
+load zones, generator build and dispatch without unit commitment, simple
+fuel costs, storage and transport-style transmission), the constraints are
+not constructed at all. Instead, build_core_matrix() assembles their rows
+directly from the input data, as vectorized scipy.sparse operations that
+follow the formulation in each module (see core_constraints, balance_terms,
+tp_cost_terms and period_cost_terms). Expressions and the objective are
+still constructed for reporting. This avoids building and walking a Pyomo
+expression for every constraint, which usually takes most of the time
+spent constructing the model. Rows that this module cannot assemble
+directly (other modules, iterated models, Benders decomposition, rolling
+horizons, infeasibility diagnosis or models with suffixes) are constructed
+as usual and converted with Pyomo's generate_standard_repn(), just as
+Pyomo's problem-file writers do; this avoids the files, but not the time
+spent constructing the model or walking its expressions.
+
+"switch solve --write-mps FILE" writes the same arrays to a free-format MPS
+file, which can be given to any solver or used for benchmarking. Rows are
+named r<row number> and columns are named c<column number>, in the order of
+the constraints and variables returned by build_matrix().
+"""
+from pyomo.environ import *
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn import generate_standard_repn
+
+from switch_model.low_memory import can_free_constraint_bodies, free_constraint_bodies
+from switch_model.utilities import StepTimer, clear_solution_cache, record_phase
+
+
+def add_matrix_args(parser):
+    parser.add_argument(
+        "--matrix-backend",
+        default=False,
+        action="store_true",
+        help="""
+            Assemble the model as sparse arrays and solve it with the HiGHS
+            solver included with scipy, instead of writing a problem file
+            for --solver (see switch_model.matrix). Requires scipy 1.9 or
+            later.
+        """,
+    )
+    parser.add_argument(
+        "--write-mps",
+        default=None,
+        metavar="FILE",
+        help="""
+            Write the model to FILE in free-format MPS, using sparse arrays
+            assembled from the model (see switch_model.matrix).
+        """,
+    )
+
+
+# modules whose constraints and cost terms build_core_matrix() can assemble
+# directly from the input data
+core_modules = [
+    "switch_model",
+    "switch_model.timescales",
+    "switch_model.financials",
+    "switch_model.balancing.load_zones",
+    "switch_model.energy_sources.properties",
+    "switch_model.generators.core.build",
+    "switch_model.generators.core.dispatch",
+    "switch_model.generators.core.no_commit",
+    "switch_model.energy_sources.fuel_costs.simple",
+    "switch_model.generators.extensions.storage",
+    "switch_model.transmission.transport.build",
+    "switch_model.transmission.transport.dispatch",
+    "switch_model.reporting",
+    "switch_model.solve",
+]
+
+
+def can_assemble_directly(m):
+    """
+    Return True if m will be solved with --matrix-backend and all of its
+    constraints and cost terms can be assembled by build_core_matrix(), so
+    the constraints don't need to be constructed. This is checked when the
+    first constraint is constructed (see
+    switch_model.utilities.SwitchAbstractModel._initialize_component()).
+    """
+    options = m.options
+    return bool(
+        getattr(options, "matrix_backend", False)
+        and not getattr(m, "iterate_modules", [])
+        and not getattr(options, "benders", False)
+        and not getattr(options, "diagnose_infeasibility", False)
+        and not getattr(options, "rolling_horizon", None)
+        and set(m.module_list) <= set(core_modules)
+        and not list(m.component_objects(Suffix))
+        and all(c.name in core_constraints for c in m.component_objects(Constraint))
+        and [o.name for o in m.component_objects(Objective)] == ["Minimize_System_Cost"]
+        and set(m.Zone_Power_Injections + m.Zone_Power_Withdrawals)
+        <= set(balance_terms)
+        and set(m.Cost_Components_Per_TP) <= set(tp_cost_terms)
+        and set(m.Cost_Components_Per_Period) <= set(period_cost_terms)
+    )
+
+
+def build_matrix(m):
+    """
+    Return a dict describing the linear model m as sparse arrays, built from
+    the standard (linear) representation of each active constraint and the
+    objective of the constructed model:
+
+    variables, constraints: lists of the variables (columns) and constraints
+        (rows) in the model
+    A: scipy.sparse.csr_matrix of constraint coefficients
+    row_lb, row_ub, col_lb, col_ub: numpy arrays of lower and upper bounds for
+        each row and column (-inf or inf if unbounded)
+    c, c0: numpy array of objective coefficients for each column and the
+        constant term of the objective (negated if m is maximized, so the
+        arrays always describe a minimization problem)
+    sense: sense of the original objective (minimize or maximize)
+    integrality: numpy array showing which columns are integer (1) or
+        continuous (0)
+
+    If the constraints of m were not constructed because they can be
+    assembled directly from the input data (see can_assemble_directly()),
+    this returns build_core_matrix(m) instead.
+    """
+    if getattr(m, "constraints_assembled_directly", False):
+        return build_core_matrix(m)
+
+    # we delay importing numpy and scipy until here, because they are
+    # optional dependencies
+    global np
+    import numpy as np
+    import scipy.sparse
+
+    col_index = {}
+    variables = []
+
+    def cols(repn, name):
+        if repn.nonlinear_vars or repn.quadratic_vars:
+            raise ValueError(
+                f"{name} is nonlinear; the matrix backend only supports linear "
+                "models."
+            )
+        idx = []
+        for v in repn.linear_vars:
+            j = col_index.get(id(v))
+            if j is None:
+                j = col_index[id(v)] = len(variables)
+                variables.append(v)
+            idx.append(j)
+        return idx
+
+    objectives = list(m.component_data_objects(Objective, active=True))
+    if len(objectives) != 1:
+        raise ValueError("The matrix backend requires exactly one active objective.")
+    obj = objectives[0]
+    repn = generate_standard_repn(obj.expr, quadratic=False)
+    obj_cols = cols(repn, obj.name)
+    obj_coefs = [value(a) for a in repn.linear_coefs]
+    c0 = value(repn.constant)
+
+    constraints = []
+    row_lb, row_ub = [], []
+    rows, columns, coefs = [], [], []
+    for con in m.component_data_objects(Constraint, active=True):
+        repn = generate_standard_repn(con.body, quadratic=False)
+        idx = cols(repn, con.name)
+        if not idx:
+            continue  # trivial constraint (all variables fixed)
+        constant = value(repn.constant)
+        i = len(constraints)
+        constraints.append(con)
+        row_lb.append(-np.inf if con.lb is None else con.lb - constant)
+        row_ub.append(np.inf if con.ub is None else con.ub - constant)
+        rows.extend([i] * len(idx))
+        columns.extend(idx)
+        coefs.extend(value(a) for a in repn.linear_coefs)
+
+    n = len(variables)
+    c = np.zeros(n)
+    np.add.at(c, obj_cols, obj_coefs)
+    if obj.sense == maximize:
+        c, c0 = -c, -c0
+    A = scipy.sparse.csr_matrix(
+        (coefs, (rows, columns)), shape=(len(constraints), n), dtype=float
+    )
+    return dict(
+        variables=variables,
+        constraints=constraints,
+        A=A,
+        row_lb=np.array(row_lb, dtype=float),
+        row_ub=np.array(row_ub, dtype=float),
+        col_lb=np.array(
+            [-np.inf if v.lb is None else v.lb for v in variables], dtype=float
+        ),
+        col_ub=np.array(
+            [np.inf if v.ub is None else v.ub for v in variables], dtype=float
+        ),
+        c=c,
+        c0=c0,
+        sense=obj.sense,
+        integrality=np.array([v.is_integer() for v in variables], dtype=int),
+    )
+
+
+class CoreAssembly(object):
+    """
+    Columns for all the variables of model m, with helpers to build vectors
+    of linear expressions over them as scipy.sparse matrices (one row per
+    expression and one column per variable), for build_core_matrix(). The
+    expressions that are shared by several constraints are built once and
+    cached.
+    """
+
+    def __init__(self, m):
+        self.m = m
+        self.variables = []
+        self.columns = {}
+        for var in m.component_objects(Var, active=True):
+            keys = list(var.keys())
+            start = len(self.variables)
+            self.variables.extend(var[k] for k in keys)
+            self.columns[var.name] = dict(zip(keys, range(start, start + len(keys))))
+        self.n = len(self.variables)
+        self.cache = {}
+
+    def keys(self, set_name):
+        """Return a list of the members of set_name."""
+        if set_name not in self.cache:
+            self.cache[set_name] = list(getattr(self.m, set_name))
+        return self.cache[set_name]
+
+    def index(self, set_name):
+        """Return a dict showing the position of each member of set_name."""
+        name = set_name + "_index"
+        if name not in self.cache:
+            keys = self.keys(set_name)
+            self.cache[name] = dict(zip(keys, range(len(keys))))
+        return self.cache[name]
+
+    def param(self, name, keys):
+        """Return a numpy array of the values of param name for keys."""
+        p = getattr(self.m, name)
+        # look up each distinct key only once
+        values = {k: value(p[k]) for k in dict.fromkeys(keys)}
+        return np.array([values[k] for k in keys], dtype=float)
+
+    def product_rows(self, set_name, pairs):
+        """
+        Return the position of each (member of set_name, period) pair in the
+        cross product of set_name and PERIODS.
+        """
+        idx = self.index(set_name)
+        p_idx = self.index("PERIODS")
+        n_periods = len(p_idx)
+        return np.array([idx[x] * n_periods + p_idx[p] for x, p in pairs], dtype=int)
+
+    def period_rows(self, tps):
+        """Return the position in PERIODS of the period of each timepoint."""
+        idx = self.index("PERIODS")
+        return np.array([idx[self.m.tp_period[t]] for t in tps], dtype=int)
+
+    def empty(self, n_rows):
+        """Return a matrix with n_rows rows and no terms."""
+        return scipy.sparse.csr_matrix((n_rows, self.n))
+
+    def terms(self, n_rows, rows, var_name, keys, coefs=1.0):
+        """
+        Return a matrix with n_rows rows, holding coefs[i] times
+        var_name[keys[i]] in row rows[i] (coefs may also be a scalar).
+        Repeated entries are added together.
+        """
+        col = self.columns[var_name]
+        cols = np.fromiter((col[k] for k in keys), dtype=int, count=len(keys))
+        coefs = np.broadcast_to(np.asarray(coefs, dtype=float), cols.shape)
+        return scipy.sparse.csr_matrix(
+            (coefs, (np.asarray(rows, dtype=int), cols)), shape=(n_rows, self.n)
+        )
+
+    def each(self, var_name, keys, coefs=1.0):
+        """
+        Return a matrix with one row for each key in keys, holding coefs
+        times var_name[key].
+        """
+        return self.terms(len(keys), np.arange(len(keys)), var_name, keys, coefs)
+
+    def sums(self, keys, var_name, members, coef=None):
+        """
+        Return a matrix with one row for each key in keys, holding the sum of
+        var_name[j] (times coef(j), if given) for j in members(key).
+        """
+        rows, var_keys = [], []
+        for i, k in enumerate(keys):
+            for j in members(k):
+                rows.append(i)
+                var_keys.append(j)
+        coefs = 1.0 if coef is None else [coef(j) for j in var_keys]
+        return self.terms(len(keys), rows, var_name, var_keys, coefs)
+
+    def scale(self, factors, A):
+        """Multiply each row of A by the matching element of factors."""
+        return scipy.sparse.diags(factors) @ A
+
+    def total(self, n_groups, groups, A):
+        """Add up the rows of A into n_groups rows, as shown by groups."""
+        S = scipy.sparse.csr_matrix(
+            (np.ones(len(groups)), (groups, np.arange(len(groups)))),
+            shape=(n_groups, len(groups)),
+        )
+        return S @ A
+
+    def cached(self, name, build):
+        """Return build(m, self), calculated only once for each name."""
+        if name not in self.cache:
+            self.cache[name] = build(self.m, self)
+        return self.cache[name]
+
+
+# Expressions shared by several constraints. Each function returns a matrix
+# with one row for each element of the Pyomo expression with the same name,
+# in the order of its index set, and a vector of constant terms if needed.
+
+
+def gen_capacity(m, a):
+    """GenCapacity, indexed by GENERATION_PROJECTS * PERIODS."""
+    keys = [(g, p) for g in a.keys("GENERATION_PROJECTS") for p in a.keys("PERIODS")]
+    return a.sums(
+        keys,
+        "BuildGen",
+        lambda k: [(k[0], b) for b in m.BLD_YRS_FOR_GEN_PERIOD[k]],
+    )
+
+
+def dispatch_upper_limit(m, a):
+    """DispatchUpperLimit, indexed by GEN_TPS."""
+    gen_tps = a.keys("GEN_TPS")
+    variable = set(m.VARIABLE_GENS)
+    factor = a.param("gen_availability", [g for g, t in gen_tps]) * np.array(
+        [
+            value(m.gen_max_capacity_factor[g, t]) if g in variable else 1.0
+            for g, t in gen_tps
+        ]
+    )
+    capacity = a.cached("GenCapacity", gen_capacity)
+    rows = a.product_rows(
+        "GENERATION_PROJECTS", [(g, m.tp_period[t]) for g, t in gen_tps]
+    )
+    return a.scale(factor, capacity[rows])
+
+
+def storage_energy_capacity(m, a):
+    """StorageEnergyCapacity, indexed by STORAGE_GENS * PERIODS."""
+    keys = [(g, p) for g in a.keys("STORAGE_GENS") for p in a.keys("PERIODS")]
+    return a.sums(
+        keys,
+        "BuildStorageEnergy",
+        lambda k: [(k[0], b) for b in m.BLD_YRS_FOR_GEN_PERIOD[k]],
+    )
+
+
+def tx_capacity_nameplate(m, a):
+    """TxCapacityNameplate, indexed by TRANSMISSION_LINES * PERIODS."""
+    keys = [(tx, p) for tx in a.keys("TRANSMISSION_LINES") for p in a.keys("PERIODS")]
+    built = {}
+    for tx, b in m.TRANS_BLD_YRS:
+        built.setdefault(tx, []).append(b)
+    periods = set(m.PERIODS)
+    A = a.sums(
+        keys,
+        "BuildTx",
+        lambda k: [
+            (k[0], b) for b in built.get(k[0], []) if b in periods and b <= k[1]
+        ],
+    )
+    return A, a.param("existing_trans_cap", [tx for tx, p in keys])
+
+
+# Terms for the zonal energy balance, named like the components listed in
+# Zone_Power_Injections and Zone_Power_Withdrawals. Each returns a matrix
+# with one row per member of ZONE_TIMEPOINTS and a vector of constants.
+
+
+def zone_tp_rows(m, a, gens, tps):
+    idx = a.index("ZONE_TIMEPOINTS")
+    zone = {g: m.gen_load_zone[g] for g in dict.fromkeys(gens)}
+    return [idx[zone[g], t] for g, t in zip(gens, tps)]
+
+
+def zone_dispatch(m, a, coefs):
+    gen_tps = a.keys("GEN_TPS")
+    gens = [g for g, t in gen_tps]
+    tps = [t for g, t in gen_tps]
+    return a.terms(
+        len(a.keys("ZONE_TIMEPOINTS")),
+        zone_tp_rows(m, a, gens, tps),
+        "DispatchGen",
+        gen_tps,
+        coefs(gens),
+    )
+
+
+def zone_total_central_dispatch(m, a):
+    ccs = set(m.CCS_EQUIPPED_GENS)
+    return (
+        zone_dispatch(
+            m,
+            a,
+            lambda gens: 1.0
+            - a.param("gen_is_distributed", gens)
+            - np.array(
+                [value(m.gen_ccs_energy_load[g]) if g in ccs else 0.0 for g in gens]
+            ),
+        ),
+        0.0,
+    )
+
+
+def zone_total_distributed_dispatch(m, a):
+    return (
+        zone_dispatch(m, a, lambda gens: a.param("gen_is_distributed", gens)),
+        0.0,
+    )
+
+
+def tx_power_net(m, a):
+    trans_tps = a.keys("TRANS_TIMEPOINTS")
+    idx = a.index("ZONE_TIMEPOINTS")
+    n_rows = len(a.keys("ZONE_TIMEPOINTS"))
+    efficiency = a.param(
+        "trans_efficiency", [m.trans_d_line[z1, z2] for z1, z2, t in trans_tps]
+    )
+    received = a.terms(
+        n_rows,
+        [idx[z2, t] for z1, z2, t in trans_tps],
+        "DispatchTx",
+        trans_tps,
+        efficiency,
+    )
+    sent = a.terms(
+        n_rows, [idx[z1, t] for z1, z2, t in trans_tps], "DispatchTx", trans_tps
+    )
+    return received - sent, 0.0
+
+
+def zone_demand_mw(m, a):
+    keys = a.keys("ZONE_TIMEPOINTS")
+    return a.empty(len(keys)), a.param("zone_demand_mw", keys)
+
+
+def storage_net_charge(m, a):
+    gen_tps = a.keys("STORAGE_GEN_TPS")
+    gens = [g for g, t in gen_tps]
+    tps = [t for g, t in gen_tps]
+    return (
+        a.terms(
+            len(a.keys("ZONE_TIMEPOINTS")),
+            zone_tp_rows(m, a, gens, tps),
+            "ChargeStorage",
+            gen_tps,
+        ),
+        0.0,
+    )
+
+
+balance_terms = {
+    "ZoneTotalCentralDispatch": zone_total_central_dispatch,
+    "ZoneTotalDistributedDispatch": zone_total_distributed_dispatch,
+    "TXPowerNet": tx_power_net,
+    "zone_demand_mw": zone_demand_mw,
+    "StorageNetCharge": storage_net_charge,
+}
+
+
+# Cost terms named like the components listed in Cost_Components_Per_TP
+# (one row per timepoint) and Cost_Components_Per_Period (one row per
+# period). Each returns a matrix and a vector of constants.
+
+
+def gen_variable_om_costs_in_tp(m, a):
+    gen_tps = a.keys("GEN_TPS")
+    tp_idx = a.index("TIMEPOINTS")
+    return (
+        a.terms(
+            len(tp_idx),
+            [tp_idx[t] for g, t in gen_tps],
+            "DispatchGen",
+            gen_tps,
+            a.param("gen_variable_om", [g for g, t in gen_tps]),
+        ),
+        0.0,
+    )
+
+
+def fuel_costs_per_tp(m, a):
+    unavailable = set(m.GEN_TP_FUELS_UNAVAILABLE)
+    keys = [k for k in m.GEN_TP_FUELS if k not in unavailable]
+    tp_idx = a.index("TIMEPOINTS")
+    return (
+        a.terms(
+            len(tp_idx),
+            [tp_idx[t] for g, t, f in keys],
+            "GenFuelUseRate",
+            keys,
+            a.param(
+                "fuel_cost",
+                [(m.gen_load_zone[g], f, m.tp_period[t]) for g, t, f in keys],
+            ),
+        ),
+        0.0,
+    )
+
+
+def total_gen_fixed_costs(m, a):
+    keys = [(g, p) for g in a.keys("GENERATION_PROJECTS") for p in a.keys("PERIODS")]
+    A = a.sums(
+        keys,
+        "BuildGen",
+        lambda k: [(k[0], b) for b in m.BLD_YRS_FOR_GEN_PERIOD[k]],
+        coef=lambda j: value(m.gen_capital_cost_annual[j] + m.gen_fixed_om[j]),
+    )
+    p_idx = a.index("PERIODS")
+    return a.total(len(p_idx), [p_idx[p] for g, p in keys], A), 0.0
+
+
+def storage_energy_fixed_cost(m, a):
+    from switch_model.financials import capital_recovery_factor as crf
+
+    keys = [(g, p) for g in a.keys("STORAGE_GENS") for p in a.keys("PERIODS")]
+    A = a.sums(
+        keys,
+        "BuildStorageEnergy",
+        lambda k: [(k[0], b) for b in m.BLD_YRS_FOR_GEN_PERIOD[k]],
+        coef=lambda j: value(
+            m.gen_storage_energy_overnight_cost[j]
+            * crf(m.interest_rate, m.gen_max_age[j[0]])
+        ),
+    )
+    p_idx = a.index("PERIODS")
+    return a.total(len(p_idx), [p_idx[p] for g, p in keys], A), 0.0
+
+
+def tx_fixed_costs(m, a):
+    A, const = a.cached("TxCapacityNameplate", tx_capacity_nameplate)
+    keys = [(tx, p) for tx in a.keys("TRANSMISSION_LINES") for p in a.keys("PERIODS")]
+    cost = a.param("trans_cost_annual", [tx for tx, p in keys])
+    p_idx = a.index("PERIODS")
+    groups = [p_idx[p] for tx, p in keys]
+    const = np.bincount(groups, weights=cost * const, minlength=len(p_idx))
+    return a.total(len(p_idx), groups, a.scale(cost, A)), const
+
+
+tp_cost_terms = {
+    "GenVariableOMCostsInTP": gen_variable_om_costs_in_tp,
+    "FuelCostsPerTP": fuel_costs_per_tp,
+}
+period_cost_terms = {
+    "TotalGenFixedCosts": total_gen_fixed_costs,
+    "StorageEnergyFixedCost": storage_energy_fixed_cost,
+    "TxFixedCosts": tx_fixed_costs,
+}
+
+
+# Constraints, named like the Pyomo components they replace. Each returns a
+# list of keys (the members of the index set that have a row), a matrix with
+# one row per key and vectors (or scalars) with the lower and upper bounds
+# for each row, following the rule for that constraint.
+
+
+def zone_energy_balance(m, a):
+    keys = a.keys("ZONE_TIMEPOINTS")
+    A, const = a.empty(len(keys)), np.zeros(len(keys))
+    for sign, names in [(1, m.Zone_Power_Injections), (-1, m.Zone_Power_Withdrawals)]:
+        for name in names:
+            A_term, const_term = balance_terms[name](m, a)
+            A = A + sign * A_term
+            const = const + sign * const_term
+    return keys, A, -const, -const
+
+
+def max_build_potential(m, a):
+    keys = [(g, p) for g in m.CAPACITY_LIMITED_GENS for p in a.keys("PERIODS")]
+    capacity = a.cached("GenCapacity", gen_capacity)
+    A = capacity[a.product_rows("GENERATION_PROJECTS", keys)]
+    return keys, A, -np.inf, a.param("gen_capacity_limit_mw", [g for g, p in keys])
+
+
+def enforce_min_build_lower(m, a):
+    keys = list(m.NEW_GEN_WITH_MIN_BUILD_YEARS)
+    min_build = a.param("gen_min_build_capacity", [g for g, p in keys])
+    A = a.each("BuildMinGenCap", keys, min_build) - a.each("BuildGen", keys)
+    return keys, A, -np.inf, 0.0
+
+
+def enforce_min_build_upper(m, a):
+    keys = list(m.NEW_GEN_WITH_MIN_BUILD_YEARS)
+    A = a.each("BuildGen", keys) - a.each(
+        "BuildMinGenCap", keys, m._gen_max_cap_for_binary_constraints
+    )
+    return keys, A, -np.inf, 0.0
+
+
+def enforce_dispatch_baseload_flat(m, a):
+    keys = list(m.BASELOAD_GEN_TPS)
+    A = a.each("DispatchGen", keys) - a.each(
+        "DispatchBaseloadByPeriod", [(g, m.tp_period[t]) for g, t in keys]
+    )
+    return keys, A, 0.0, 0.0
+
+
+def enforce_dispatch_upper_limit(m, a):
+    keys = a.keys("GEN_TPS")
+    A = a.each("DispatchGen", keys) - a.cached(
+        "DispatchUpperLimit", dispatch_upper_limit
+    )
+    return keys, A, -np.inf, 0.0
+
+
+def gen_fuel_use_rate_calculate(m, a):
+    keys = list(m.FUEL_BASED_GEN_TPS)
+    A = a.sums(
+        keys,
+        "GenFuelUseRate",
+        lambda k: [(k[0], k[1], f) for f in m.FUELS_FOR_GEN[k[0]]],
+    ) - a.each(
+        "DispatchGen", keys, a.param("gen_full_load_heat_rate", [g for g, t in keys])
+    )
+    return keys, A, 0.0, 0.0
+
+
+def enforce_fuel_unavailability(m, a):
+    keys = list(m.GEN_TP_FUELS_UNAVAILABLE)
+    return keys, a.each("GenFuelUseRate", keys), 0.0, 0.0
+
+
+def enforce_fixed_energy_storage_ratio(m, a):
+    keys = [
+        (g, y)
+        for g, y in m.STORAGE_GEN_BLD_YRS
+        if m.gen_storage_energy_to_power_ratio[g] != float("inf")
+    ]
+    ratio = a.param("gen_storage_energy_to_power_ratio", [g for g, y in keys])
+    A = a.each("BuildStorageEnergy", keys) - a.each("BuildGen", keys, ratio)
+    return keys, A, 0.0, 0.0
+
+
+def charge_storage_upper_limit(m, a):
+    keys = a.keys("STORAGE_GEN_TPS")
+    gen_tps = a.index("GEN_TPS")
+    limit = a.cached("DispatchUpperLimit", dispatch_upper_limit)
+    A = a.each("ChargeStorage", keys) - a.scale(
+        a.param("gen_store_to_release_ratio", [g for g, t in keys]),
+        limit[[gen_tps[k] for k in keys]],
+    )
+    return keys, A, -np.inf, 0.0
+
+
+def track_state_of_charge(m, a):
+    keys = a.keys("STORAGE_GEN_TPS")
+    hours = a.param("tp_duration_hrs", [t for g, t in keys])
+    efficiency = a.param("gen_storage_efficiency", [g for g, t in keys])
+    A = (
+        a.each("StateOfCharge", keys)
+        - a.each("StateOfCharge", [(g, m.tp_previous[t]) for g, t in keys])
+        - a.each("ChargeStorage", keys, efficiency * hours)
+        + a.each("DispatchGen", keys, hours)
+    )
+    return keys, A, 0.0, 0.0
+
+
+def state_of_charge_upper_limit(m, a):
+    keys = a.keys("STORAGE_GEN_TPS")
+    capacity = a.cached("StorageEnergyCapacity", storage_energy_capacity)
+    A = (
+        a.each("StateOfCharge", keys)
+        - capacity[
+            a.product_rows("STORAGE_GENS", [(g, m.tp_period[t]) for g, t in keys])
+        ]
+    )
+    return keys, A, -np.inf, 0.0
+
+
+def battery_cycle_limit(m, a):
+    keys = [
+        (g, p)
+        for g, p in m.STORAGE_GEN_PERIODS
+        if m.gen_storage_max_cycles_per_year[g] != float("inf")
+    ]
+    capacity = a.cached("StorageEnergyCapacity", storage_energy_capacity)
+    A = a.sums(
+        keys,
+        "DispatchGen",
+        lambda k: [(k[0], t) for t in m.TPS_IN_PERIOD[k[1]]],
+        coef=lambda j: value(m.tp_duration_hrs[j[1]]),
+    ) - a.scale(
+        a.param("gen_storage_max_cycles_per_year", [g for g, p in keys])
+        * a.param("period_length_years", [p for g, p in keys]),
+        capacity[a.product_rows("STORAGE_GENS", keys)],
+    )
+    return keys, A, -np.inf, 0.0
+
+
+def maximum_dispatch_tx(m, a):
+    keys = a.keys("TRANS_TIMEPOINTS")
+    nameplate, existing = a.cached("TxCapacityNameplate", tx_capacity_nameplate)
+    lines = [m.trans_d_line[z1, z2] for z1, z2, t in keys]
+    rows = a.product_rows(
+        "TRANSMISSION_LINES",
+        [(tx, m.tp_period[t]) for tx, (z1, z2, t) in zip(lines, keys)],
+    )
+    derating = a.param("trans_derating_factor", lines)
+    A = a.each("DispatchTx", keys) - a.scale(derating, nameplate[rows])
+    return keys, A, -np.inf, derating * existing[rows]
+
+
+core_constraints = {
+    "Max_Build_Potential": max_build_potential,
+    "Enforce_Min_Build_Lower": enforce_min_build_lower,
+    "Enforce_Min_Build_Upper": enforce_min_build_upper,
+    "Enforce_Dispatch_Baseload_Flat": enforce_dispatch_baseload_flat,
+    "Enforce_Dispatch_Upper_Limit": enforce_dispatch_upper_limit,
+    "GenFuelUseRate_Calculate": gen_fuel_use_rate_calculate,
+    "Enforce_Fuel_Unavailability": enforce_fuel_unavailability,
+    "Enforce_Fixed_Energy_Storage_Ratio": enforce_fixed_energy_storage_ratio,
+    "Charge_Storage_Upper_Limit": charge_storage_upper_limit,
+    "Track_State_Of_Charge": track_state_of_charge,
+    "State_Of_Charge_Upper_Limit": state_of_charge_upper_limit,
+    "Battery_Cycle_Limit": battery_cycle_limit,
+    "Maximum_DispatchTx": maximum_dispatch_tx,
+    "Zone_Energy_Balance": zone_energy_balance,
+}
+
+
+def build_core_matrix(m):
+    """
+    Return a dict describing model m as sparse arrays, like build_matrix(),
+    but assembled directly from the input data with the functions in
+    core_constraints, instead of from constructed constraints. Rows are
+    identified by (constraint name, index) tuples instead of constraint
+    objects, the columns include every variable in the model, and fixed
+    variables have equal lower and upper bounds.
+    """
+    # we delay importing numpy and scipy until here, because they are
+    # optional dependencies
+    global np, scipy
+    import numpy as np
+    import scipy.sparse
+
+    a = CoreAssembly(m)
+    constraints, blocks, row_lb, row_ub = [], [], [], []
+    for con in m.component_objects(Constraint, active=True):
+        keys, A, lb, ub = core_constraints[con.name](m, a)
+        A = A.tocsr()
+        A.eliminate_zeros()
+        # skip trivial rows (no variables), as build_matrix() does
+        used = np.flatnonzero(np.diff(A.indptr))
+        name = con.name
+        constraints.extend((name, keys[i]) for i in used.tolist())
+        blocks.append(A[used])
+        row_lb.append(np.broadcast_to(np.asarray(lb, dtype=float), (len(keys),))[used])
+        row_ub.append(np.broadcast_to(np.asarray(ub, dtype=float), (len(keys),))[used])
+
+    # SystemCost: costs per period, plus costs per timepoint weighted by
+    # tp_weight_in_year, converted to the base year
+    periods = a.keys("PERIODS")
+    tps = a.keys("TIMEPOINTS")
+    to_base_year = a.param("bring_annual_costs_to_base_year", periods)
+    tp_weight = a.param("tp_weight_in_year", tps) * to_base_year[a.period_rows(tps)]
+    c, c0 = np.zeros(a.n), 0.0
+    for weights, names, terms in [
+        (to_base_year, m.Cost_Components_Per_Period, period_cost_terms),
+        (tp_weight, m.Cost_Components_Per_TP, tp_cost_terms),
+    ]:
+        for name in names:
+            A, const = terms[name](m, a)
+            c += A.T @ weights
+            c0 += float(np.sum(weights * const))
+
+    variables = a.variables
+    return dict(
+        variables=variables,
+        constraints=constraints,
+        A=scipy.sparse.vstack(blocks, format="csr") if blocks else a.empty(0),
+        row_lb=np.concatenate(row_lb) if row_lb else np.zeros(0),
+        row_ub=np.concatenate(row_ub) if row_ub else np.zeros(0),
+        col_lb=np.array(
+            [
+                v.value if v.fixed else -np.inf if v.lb is None else v.lb
+                for v in variables
+            ],
+            dtype=float,
+        ),
+        col_ub=np.array(
+            [
+                v.value if v.fixed else np.inf if v.ub is None else v.ub
+                for v in variables
+            ],
+            dtype=float,
+        ),
+        c=c,
+        c0=c0,
+        sense=minimize,
+        integrality=np.array([v.is_integer() for v in variables], dtype=int),
+    )
+
+
+def write_mps(lp, path):
+    """
+    Write the problem described by lp (from build_matrix()) to path as a
+    free-format MPS file.
+    """
+    A = lp["A"].tocsc()
+    row_lb, row_ub = lp["row_lb"], lp["row_ub"]
+    col_lb, col_ub = lp["col_lb"], lp["col_ub"]
+    integer = lp["integrality"].astype(bool).tolist()
+    c = lp["c"].tolist()
+
+    row_type = np.where(row_lb == row_ub, "E", np.where(np.isfinite(row_ub), "L", "G"))
+    with open(path, "w") as f:
+        f.write("NAME switch\nROWS\n N  COST\n")
+        f.writelines(f" {t}  r{i}\n" for i, t in enumerate(row_type.tolist()))
+
+        f.write("COLUMNS\n")
+        in_int = False
+        for j in range(A.shape[1]):
+            if integer[j] != in_int:
+                in_int = integer[j]
+                f.write(f"    MARKER  'MARKER'  '{'INTORG' if in_int else 'INTEND'}'\n")
+            start, end = A.indptr[j], A.indptr[j + 1]
+            if c[j] != 0:
+                f.write(f"    c{j}  COST  {c[j]!r}\n")
+            f.writelines(
+                f"    c{j}  r{i}  {a!r}\n"
+                for i, a in zip(
+                    A.indices[start:end].tolist(), A.data[start:end].tolist()
+                )
+            )
+        if in_int:
+            f.write("    MARKER  'MARKER'  'INTEND'\n")
+
+        f.write("RHS\n")
+        if lp["c0"] != 0:
+            f.write(f"    RHS  COST  {-float(lp['c0'])!r}\n")
+        rhs = np.where(row_type == "G", row_lb, row_ub)
+        f.writelines(
+            f"    RHS  r{i}  {b!r}\n" for i, b in enumerate(rhs.tolist()) if b != 0
+        )
+        ranged = np.isfinite(row_lb) & np.isfinite(row_ub) & (row_lb != row_ub)
+        if ranged.any():
+            f.write("RANGES\n")
+            f.writelines(
+                f"    RNG  r{i}  {float(row_ub[i] - row_lb[i])!r}\n"
+                for i in np.flatnonzero(ranged).tolist()
+            )
+
+        f.write("BOUNDS\n")
+        for j, (lb, ub) in enumerate(zip(col_lb.tolist(), col_ub.tolist())):
+            if lb == ub:
+                f.write(f" FX BND  c{j}  {lb!r}\n")
+                continue
+            if lb == -np.inf and ub == np.inf:
+                f.write(f" FR BND  c{j}\n")
+                continue
+            if lb == -np.inf:
+                f.write(f" MI BND  c{j}\n")
+            elif lb != 0 or integer[j]:
+                f.write(f" LO BND  c{j}  {lb!r}\n")
+            if ub != np.inf:
+                f.write(f" UP BND  c{j}  {ub!r}\n")
+            elif integer[j]:
+                # some solvers give integer columns an upper bound of 1
+                f.write(f" PL BND  c{j}\n")
+        f.write("ENDATA\n")
+
+
+def solve_matrix(m):
+    """
+    Solve model instance m with HiGHS via scipy, load the solution into it and
+    return a SolverResults object showing the outcome.
+    """
+    clear_solution_cache(m)
+    timer = StepTimer()
+    lp = build_matrix(m)
+    m.logger.info(
+        f"Assembled {lp['A'].shape[0]} x {lp['A'].shape[1]} constraint matrix "
+        f"with {lp['A'].nnz} nonzeros in {timer.step_time():.2f} s."
+    )
+    record_phase(m, "assemble_matrix", timer.last_step, timer.last_cpu_step)
+    if m.options.write_mps:
+        write_mps(lp, m.options.write_mps)
+    if can_free_constraint_bodies(m):
+        m.logger.info(f"Freed {free_constraint_bodies(m)} constraint bodies.")
+
+    m.logger.info("\nSolving model with HiGHS...")
+    A = lp["A"]
+    res, row_duals = solve_lp(lp, tee=m.options.tee)
+    m.logger.info(
+        f"Solved model. Total time spent in solver: {timer.step_time():.2f} s."
+    )
+    record_phase(m, "solver", timer.last_step, timer.last_cpu_step)
+
+    results = SolverResults()
+    results.solver.message = res.message
+    results.problem.number_of_constraints = A.shape[0]
+    results.problem.number_of_variables = A.shape[1]
+    results.problem.number_of_nonzeros = A.nnz
+    if res.status == 2:
+        m.logger.error("Model was infeasible.")
+        if m.options.diagnose_infeasibility:
+            from switch_model.balancing.diagnose_infeasibility import report_conflict
+
+            report_conflict(m)
+        raise RuntimeError("Infeasible model")
+    if res.x is None:
+        m.logger.error(f"Solver terminated without a solution: {res.message}")
+        raise RuntimeError("Solver failed to find an optimal solution.")
+    if res.status == 0:
+        results.solver.status = SolverStatus.ok
+        results.solver.termination_condition = TerminationCondition.optimal
+    else:
+        # e.g., time or iteration limit reached with a feasible solution
+        results.solver.status = SolverStatus.warning
+        results.solver.termination_condition = TerminationCondition.other
+        m.logger.warning(f"Solver terminated with warning: {res.message}")
+
+    load_lp_solution(m, lp, res.x, row_duals)
+    timer.step_time()
+    record_phase(m, "load_solution", timer.last_step, timer.last_cpu_step)
+    return results
+
+
+def solve_lp(lp, tee=False):
+    """
+    Solve the problem described by lp (from build_matrix()) with HiGHS via
+    scipy. Returns the scipy result object and a numpy array of duals for
+    each row, or None if the problem has integer variables or was not
+    solved to optimality.
+    """
+    import scipy.sparse
+    from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+    A, row_lb, row_ub = lp["A"], lp["row_lb"], lp["row_ub"]
+    if lp["integrality"].any():
+        res = milp(
+            lp["c"],
+            integrality=lp["integrality"],
+            bounds=Bounds(lp["col_lb"], lp["col_ub"]),
+            constraints=LinearConstraint(A, row_lb, row_ub),
+            options={"disp": bool(tee)},
+        )
+        return res, None
+
+    # linprog needs separate equality and <= constraints
+    eq = row_lb == row_ub
+    ub = ~eq & np.isfinite(row_ub)
+    lb = ~eq & np.isfinite(row_lb)
+    res = linprog(
+        lp["c"],
+        A_ub=scipy.sparse.vstack([A[ub], -A[lb]], format="csr"),
+        b_ub=np.concatenate([row_ub[ub], -row_lb[lb]]),
+        A_eq=A[eq],
+        b_eq=row_lb[eq],
+        bounds=list(zip(lp["col_lb"].tolist(), lp["col_ub"].tolist())),
+        method="highs",
+        options={"disp": bool(tee)},
+    )
+    row_duals = None
+    if res.status == 0:
+        # duals are d(objective)/d(bound), as reported by other solvers
+        row_duals = np.zeros(A.shape[0])
+        row_duals[eq] = res.eqlin.marginals
+        n_ub = ub.sum()
+        row_duals[ub] += res.ineqlin.marginals[:n_ub]
+        row_duals[lb] -= res.ineqlin.marginals[n_ub:]
+        if lp["sense"] == maximize:
+            row_duals = -row_duals
+    return res, row_duals
+
+
+def load_lp_solution(m, lp, x, row_duals=None):
+    """
+    Assign the values in x to the variables of model m listed in lp (from
+    build_matrix()), and store row_duals (if given) in m.dual if m has a dual
+    suffix.
+    """
+    integer = lp["integrality"].tolist()
+    for v, val, is_int in zip(lp["variables"], x.tolist(), integer):
+        v.set_value(round(val) if is_int else val, skip_validation=True)
+    if row_duals is not None and hasattr(m, "dual"):
+        for con, d in zip(lp["constraints"], row_duals.tolist()):
+            m.dual[con] = d
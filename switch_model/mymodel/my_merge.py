@@ -4,7 +4,9 @@ import logging
 from pyomo.environ import *
 from switch_model.financials import capital_recovery_factor as crf
 from switch_model.reporting import write_table
-from switch_model.utilities import unique_list
+from switch_model.utilities import pop_construction_index
+from switch_model.generators.core.build import gen_build_period_index
+from switch_model.generators.core.dispatch import gens_in_zone_tp_index
 from switch_model.utilities import unwrap
 
 dependencies = (
@@ -49,13 +51,22 @@ def define_components(mod):
     
     mod.gen_max_age = Param(mod.GENERATION_PROJECTS, within=PositiveIntegers)
     # 这是确定一个在哪个投资period里能用的规则，如果在这个period里上线，上线时间就算这个周期的开始时间
-    def gen_build_can_operate_in_period(m, g, build_year, period):
-        if build_year in m.PERIODS:
-            online = m.period_start[build_year]
-        else:
-            online = build_year
-        retirement = online + m.gen_max_age[g]
-        return online <= m.period_start[period] < retirement
+    # (see gen_build_can_operate_in_period() in switch_model.generators.core.build;
+    # the sets below are constructed together from a single pass through
+    # GEN_BLD_YRS by gen_build_period_index())
+    mod.PERIODS_FOR_GEN_BLD_YR = Set(
+        mod.GEN_BLD_YRS,
+        dimen=1,
+        within=mod.PERIODS,
+        ordered=True,
+        initialize=lambda m, g, bld_yr: pop_construction_index(
+            m,
+            "gen_build_period_index",
+            gen_build_period_index,
+            "PERIODS_FOR_GEN_BLD_YR",
+            (g, bld_yr),
+        ),
+    )
     
     #  输入对每一对g和period判断其中能够在这个period里有效的bld yr，且这个bld yr不重复
     # 一个g可能对应很多个bld yr，对于目前还没有建立的，对每一个投资周期的起始都有一个bld yr。
@@ -68,10 +79,12 @@ def define_components(mod):
         mod.GENERATION_PROJECTS,
         mod.PERIODS,
         dimen=1,
-        initialize=lambda m, g, period: unique_list(
-            bld_yr
-            for (gen, bld_yr) in m.GEN_BLD_YRS
-            if gen == g and gen_build_can_operate_in_period(m, g, bld_yr, period)
+        initialize=lambda m, g, period: pop_construction_index(
+            m,
+            "gen_build_period_index",
+            gen_build_period_index,
+            "BLD_YRS_FOR_GEN_PERIOD",
+            (g, period),
         ),
     )
     # The set of periods when a generator is available to run
@@ -82,16 +95,16 @@ def define_components(mod):
     mod.PERIODS_FOR_GEN = Set(
         mod.GENERATION_PROJECTS,
         dimen=1,
-        initialize=lambda m, g: [
-            p for p in m.PERIODS if len(m.BLD_YRS_FOR_GEN_PERIOD[g, p]) > 0
-        ],
+        initialize=lambda m, g: pop_construction_index(
+            m, "gen_build_period_index", gen_build_period_index, "PERIODS_FOR_GEN", g
+        ),
     )
     # gen和period，这个主要是用在后面dispatch里了
     mod.GEN_PERIODS = Set(
         dimen=2,
-        initialize=lambda m: [
-            (g, p) for g in m.GENERATION_PROJECTS for p in m.PERIODS_FOR_GEN[g]
-        ],
+        initialize=lambda m: pop_construction_index(
+            m, "gen_build_period_index", gen_build_period_index, "GEN_PERIODS"
+        ),
     )
 
     def bounds_BuildGen(model, g, bld_yr):
@@ -534,14 +547,24 @@ def define_components(mod):
         return result
 
     mod.GENS_IN_ZONE = Set(mod.LOAD_ZONES, dimen=1, initialize=GENS_IN_ZONE_init)
+    # 每个区域和时间点上可以调度的g (see GENS_IN_ZONE_TP in
+    # switch_model.generators.core.dispatch)
+    mod.GENS_IN_ZONE_TP = Set(
+        mod.LOAD_ZONES,
+        mod.TIMEPOINTS,
+        dimen=1,
+        initialize=lambda m, z, t: pop_construction_index(
+            m, "gens_in_zone_tp_index", gens_in_zone_tp_index, "GENS_IN_ZONE_TP", (z, t)
+        ),
+    )
     
     mod.ZoneTotalCentralDispatch = Expression(
         mod.LOAD_ZONES,
         mod.TIMEPOINTS,
         rule=lambda m, z, t: sum(
             m.DispatchGen[g, t]
-            for g in m.GENS_IN_ZONE[z]
-            if (g, t) in m.GEN_TPS and not m.gen_is_distributed[g]
+            for g in m.GENS_IN_ZONE_TP[z, t]
+            if not m.gen_is_distributed[g]
         )
     )
     mod.Zone_Power_Injections.append("ZoneTotalCentralDispatch")
@@ -554,8 +577,8 @@ def define_components(mod):
         mod.TIMEPOINTS,
         rule=lambda m, z, t: sum(
             m.DispatchGen[g, t]
-            for g in m.GENS_IN_ZONE[z]
-            if (g, t) in m.GEN_TPS and m.gen_is_distributed[g]
+            for g in m.GENS_IN_ZONE_TP[z, t]
+            if m.gen_is_distributed[g]
         ),
         doc="Total power from distributed generation projects.",
     )
@@ -147,8 +147,8 @@ def define_components(model):
         GENS = [
             g
             for z in ZONES
-            for g in m.GENS_IN_ZONE[z]
-            if (g, t) in m.GEN_TPS and m.gen_can_provide_cap_reserves[g]
+            for g in m.GENS_IN_ZONE_TP[z, t]
+            if m.gen_can_provide_cap_reserves[g]
         ]
 # 针对存储项目，只能计算它当前输出，分布式项目就不考虑了，这里可能要改一下，
 # 要不要把电动汽车和其他储能考虑进来呢
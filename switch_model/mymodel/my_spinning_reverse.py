@@ -71,7 +71,7 @@ def define_components(m):
         rule=lambda m, b, t: sum(
             m.CommitGenSpinningReservesUp[g, t]
             for z in m.ZONES_IN_BALANCING_AREA[b]
-            for g in m.GENS_IN_ZONE[z]
+            for g in m.GENS_IN_ZONE_TP[z, t]
             if (g, t) in m.SPINNING_RESERVE_GEN_TPS
         ) + sum(
             m.DischargeStorage[g,t]
@@ -86,7 +86,7 @@ def define_components(m):
         rule=lambda m, b, t: sum(
             m.CommitGenSpinningReservesDown[g, t]
             for z in m.ZONES_IN_BALANCING_AREA[b]
-            for g in m.GENS_IN_ZONE[z]
+            for g in m.GENS_IN_ZONE_TP[z, t]
             if (g, t) in m.SPINNING_RESERVE_GEN_TPS
         ) + sum(
             m.ChargeStorage[g,t]
@@ -1,7 +1,7 @@
 from pyomo.environ import *
-import os, collections
+import os
 from switch_model.financials import capital_recovery_factor as crf
-from switch_model.utilities import unique_list
+from switch_model.utilities import pop_construction_index, unique_list
 
 dependencies = (
     "switch_model.timescales",
@@ -220,6 +220,16 @@ def define_components(mod):
         return result
 
     mod.STR_IN_ZONE = Set(mod.LOAD_ZONES, dimen=1, initialize=STR_IN_ZONE_init)
+    # 每个区域和时间点上可以调度的储能 (see GENS_IN_ZONE_TP in
+    # switch_model.generators.core.dispatch)
+    mod.STR_IN_ZONE_TP = Set(
+        mod.LOAD_ZONES,
+        mod.TIMEPOINTS,
+        dimen=1,
+        initialize=lambda m, z, t: pop_construction_index(
+            m, "str_in_zone_tp_index", str_in_zone_tp_index, "STR_IN_ZONE_TP", (z, t)
+        ),
+    )
     
     mod.RESTORAGE = Set(
         mod.STORAGE_GENS,
@@ -233,34 +243,22 @@ def define_components(mod):
     )
     mod.str_tech = Param(mod.STORAGE_GENS, within=Any)
     def battery_rule(m, z, t):
-        # Construct and cache a set for summation as needed
-        if not hasattr(m, 'Battery_Storage_Central_Charge_Summation_dict'):
-            m.Battery_Storage_Central_Charge_Summation_dict = collections.defaultdict(set)
-            for g, t2 in m.STR_TPS:
-                if m.str_tech[g] == "Battery_Storage" and m.str_is_reconnected[g]:
-                    z2 = m.str_load_zone[g]
-                    m.Battery_Storage_Central_Charge_Summation_dict[z2, t2].add(g)
-        # Use pop to free memory
-        relevant_projects = m.Battery_Storage_Central_Charge_Summation_dict.pop((z, t), {})
-        return sum(m.ChargeStorage[g, t] for g in relevant_projects)
-    mod.REBatteryCentralCharge = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=battery_rule)   
-
-    mod.Renewable_GEN_TPS = Set(
-        dimen=2,
-        initialize=lambda m: (
-            (g, tp)
-                for g in m.VARIABLE_GENS
-                    for tp in m.TPS_FOR_GEN[g]))
+        # use the shared index of active storage in each zone and timepoint
+        return sum(
+            m.ChargeStorage[g, t]
+            for g in m.STR_IN_ZONE_TP[z, t]
+            if m.str_tech[g] == "Battery_Storage" and m.str_is_reconnected[g]
+        )
+
+    mod.REBatteryCentralCharge = Expression(
+        mod.LOAD_ZONES, mod.TIMEPOINTS, rule=battery_rule
+    )
 
     def rule(m, z, t):
-        if not hasattr(m, 'Renewable_Gen_Summation_dict'):
-            m.Renewable_Gen_Summation_dict = collections.defaultdict(set)
-            for g, t2 in m.Renewable_GEN_TPS:
-                z2 = m.gen_load_zone[g]
-                m.Renewable_Gen_Summation_dict[z2, t2].add(g)
-        # Use pop to free memory
-        relevant_projects = m.Renewable_Gen_Summation_dict.pop((z, t), {})
-        return sum(m.DispatchGen[g, t] for g in relevant_projects)
+        return sum(
+            m.DispatchGen[g, t] for g in m.GENS_IN_ZONE_TP[z, t] if m.gen_is_variable[g]
+        )
+
     mod.RenewableDispatchZone = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=rule)
 
     mod.Charge_Storage_Upper_Limit_Zone = Constraint(
@@ -284,15 +282,11 @@ def define_components(mod):
     ##########平衡约束
     # 区域z和时间点t上的储能净充电量，添加到区域平衡约束中，添加到中心节点的提取
     def rule1(m, z, t):
-        # Construct and cache a set for summation as needed
-        if not hasattr(m, "Storage_Charge_Summation_dict"):
-            m.Storage_Charge_Summation_dict = collections.defaultdict(set)
-            for g, t2 in m.STR_TPS:
-                z2 = m.str_load_zone[g]
-                m.Storage_Charge_Summation_dict[z2, t2].add(g)
-        # Use pop to free memory
-        relevant_projects = m.Storage_Charge_Summation_dict.pop((z, t), {})
-        return sum(m.ChargeStorage[g, t] for g in relevant_projects if not m.str_is_distributed[g])
+        return sum(
+            m.ChargeStorage[g, t]
+            for g in m.STR_IN_ZONE_TP[z, t]
+            if not m.str_is_distributed[g]
+        )
 
     mod.StorageNetCharge = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=rule1)
     # Register net charging with zonal energy balance. Discharging is already
@@ -302,14 +296,11 @@ def define_components(mod):
     ################平衡约束
     # 区域z和时间点t上的储能净放电量，添加到中心节点的注入
     def rule2(m, z, t):
-        # Construct and cache a set for summation as needed
-        if not hasattr(m, "Storage_DisCharge_Summation_dict"):
-            m.Storage_DisCharge_Summation_dict = collections.defaultdict(set)
-            for g, t2 in m.STR_TPS:
-                z2 = m.str_load_zone[g]
-                m.Storage_DisCharge_Summation_dict[z2, t2].add(g)
-        relevant_projects = m.Storage_DisCharge_Summation_dict.pop((z, t), {})
-        return sum(m.DischargeStorage[g, t] for g in relevant_projects if not m.str_is_distributed[g])
+        return sum(
+            m.DischargeStorage[g, t]
+            for g in m.STR_IN_ZONE_TP[z, t]
+            if not m.str_is_distributed[g]
+        )
 
     mod.StorageNetDisCharge = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=rule2)
     # Register net charging with zonal energy balance. Discharging is already
@@ -331,15 +322,11 @@ def define_components(mod):
 
     # 区域z和时间点t上的储能净充电量，添加到区域平衡约束中
     def rule3(m, z, t):
-        # Construct and cache a set for summation as needed
-        if not hasattr(m, "Storage_Charge_Summation_dict_1"):
-            m.Storage_Charge_Summation_dict_1 = collections.defaultdict(set)
-            for g, t2 in m.STR_TPS:
-                z2 = m.str_load_zone[g]
-                m.Storage_Charge_Summation_dict_1[z2, t2].add(g)
-        # Use pop to free memory
-        relevant_projects = m.Storage_Charge_Summation_dict_1.pop((z, t), {})
-        return sum(m.ChargeStorage[g, t] for g in relevant_projects if  m.str_is_distributed[g])
+        return sum(
+            m.ChargeStorage[g, t]
+            for g in m.STR_IN_ZONE_TP[z, t]
+            if m.str_is_distributed[g]
+        )
 
     mod.StorageNetChargeforDis = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=rule3)
     # Register net charging with zonal energy balance. Discharging is already
@@ -349,14 +336,11 @@ def define_components(mod):
     ################平衡约束
     # 区域z和时间点t上的储能净充电量，添加到区域平衡约束中
     def rule4(m, z, t):
-        # Construct and cache a set for summation as needed
-        if not hasattr(m, "Storage_DisCharge_Summation_dict_1"):
-            m.Storage_DisCharge_Summation_dict_1 = collections.defaultdict(set)
-            for g, t2 in m.STR_TPS:
-                z2 = m.str_load_zone[g]
-                m.Storage_DisCharge_Summation_dict_1[z2, t2].add(g)
-        relevant_projects = m.Storage_DisCharge_Summation_dict_1.pop((z, t), {})
-        return sum(m.DischargeStorage[g, t] for g in relevant_projects if m.str_is_distributed[g])
+        return sum(
+            m.DischargeStorage[g, t]
+            for g in m.STR_IN_ZONE_TP[z, t]
+            if m.str_is_distributed[g]
+        )
 
     mod.StorageNetDisChargeforDis = Expression(mod.LOAD_ZONES, mod.TIMEPOINTS, rule=rule4)
     # Register net charging with zonal energy balance. Discharging is already
@@ -475,4 +459,15 @@ def load_inputs(mod, switch_data, inputs_dir):
         optional=True,
         filename=os.path.join(inputs_dir, "gen_build_predetermined.csv"),
         param=(mod.build_gen_energy_predetermined,),
-    )
\ No newline at end of file
+    )
+
+
+def str_in_zone_tp_index(m):
+    """
+    Construct STR_IN_ZONE_TP with a single pass through STR_TPS, for use
+    with pop_construction_index().
+    """
+    index = {(z, t): [] for z in m.LOAD_ZONES for t in m.TIMEPOINTS}
+    for g, t in m.STR_TPS:
+        index[m.str_load_zone[g], t].append(g)
+    return {"STR_IN_ZONE_TP": index}
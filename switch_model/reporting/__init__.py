@@ -34,7 +34,7 @@ try:
 except ImportError:
     import pickle
 from pyomo.environ import value, Var, Expression
-from switch_model.utilities import make_iterable
+from switch_model.utilities import expression_values, make_iterable
 
 csv.register_dialect(
     "switch-csv",
@@ -65,6 +65,34 @@ def define_arguments(argparser):
         action="extend",
         help="List of expressions to save in addition to variables; can also be 'all' or 'none'.",
     )
+    argparser.add_argument(
+        "--output-format",
+        dest="output_format",
+        default="csv",
+        choices=["csv", "parquet", "feather"],
+        help="File format for the generic variable and expression results "
+        "(default is csv). parquet and feather files have typed columns and "
+        "require the pyarrow package.",
+    )
+
+
+def define_components(m):
+    # check for pyarrow now rather than failing after the model is solved
+    if m.options.output_format != "csv":
+        try:
+            import pyarrow
+        except ImportError:
+            print("=" * 80)
+            print(
+                "Unable to load the pyarrow package, which is needed for "
+                f"--output-format {m.options.output_format}."
+            )
+            print(
+                "Please install this via 'conda install pyarrow' or "
+                "'pip install pyarrow'."
+            )
+            print("=" * 80)
+            raise
 
 
 def write_table(instance, *indexes, **kwargs):
@@ -141,12 +169,17 @@ def post_solve(instance, outdir):
     Minimum output generation for all model runs.
     """
     if not instance.options.skip_generic_output:
-        save_generic_results(instance, outdir, instance.options.sorted_output)
+        save_generic_results(
+            instance,
+            outdir,
+            instance.options.sorted_output,
+            instance.options.output_format,
+        )
     save_total_cost_value(instance, outdir)
     save_cost_components(instance, outdir)
 
 
-def save_generic_results(instance, outdir, sorted_output):
+def save_generic_results(instance, outdir, sorted_output, output_format="csv"):
     components = list(instance.component_objects(Var))
     # add Expression objects that should be saved, if any
     if "none" in instance.options.save_expressions:
@@ -165,35 +198,32 @@ def save_generic_results(instance, outdir, sorted_output):
 
     missing_val_list = []
     for var in components:
-        output_file = os.path.join(outdir, "%s.csv" % var.name)
-        with open(output_file, "w") as fh:
-            writer = csv.writer(fh, dialect="switch-csv")
-            if var.is_indexed():
-                index_name = var.index_set().name
-                index_dimen = var.index_set().dimen
-                if index_dimen is UnknownSetDimen:
-                    # Need to specify dimen even if it's 1 in Pyomo 5.7+. We
-                    # could potentially use
-                    # pyomo.dataportal.process_data._guess_set_dimen() but it is
-                    # undocumented and not needed if all the sets have dimen
-                    # specified, which they do now.
-                    raise ValueError(
-                        f"Set {index_name} has unknown dimen; unable to infer "
-                        f"number of index columns to write to {var.name}.csv."
-                    )
-                # Write column headings
-                writer.writerow(
-                    [f"{index_name}_{i+1}" for i in range(index_dimen)] + [var.name]
+        if var.is_indexed():
+            index_name = var.index_set().name
+            index_dimen = var.index_set().dimen
+            if index_dimen is UnknownSetDimen:
+                # Need to specify dimen even if it's 1 in Pyomo 5.7+. We
+                # could potentially use
+                # pyomo.dataportal.process_data._guess_set_dimen() but it is
+                # undocumented and not needed if all the sets have dimen
+                # specified, which they do now.
+                raise ValueError(
+                    f"Set {index_name} has unknown dimen; unable to infer "
+                    f"number of index columns to write to {var.name}.csv."
                 )
-                # Results are saved in the order of the index set by default.
-                # Lexicographic sorting is available if wanted.
-                items = sorted(var.items()) if sorted_output else list(var.items())
-                for key, obj in items:
-                    writer.writerow(tuple(make_iterable(key)) + (get_value(obj),))
-            else:
-                # single-valued variable
-                writer.writerow([var.name])
-                writer.writerow([get_value(obj)])
+            headings = [f"{index_name}_{i+1}" for i in range(index_dimen)] + [var.name]
+            # Results are saved in the order of the index set by default.
+            # Lexicographic sorting is available if wanted.
+            keys = sorted(var.keys()) if sorted_output else list(var.keys())
+            values = get_values(var, keys)
+            if index_dimen == 1:
+                keys = [(k,) for k in keys]
+        else:
+            # single-valued variable
+            headings = [var.name]
+            keys = [()]
+            values = [get_value(var)]
+        write_results(outdir, var.name, headings, keys, values, output_format)
     if missing_val_list:
         msg = (
             "WARNING: {} {}. This "
@@ -242,6 +272,59 @@ def get_value(obj, missing_val_list=[]):
     return val
 
 
+def get_values(component, keys):
+    """
+    Retrieve values for the elements of an indexed Variable or Expression
+    with the specified keys, in one pass. This gives the same results as
+    calling get_value() for each element, but reads variable values
+    directly and evaluates expressions with expression_values(), which is
+    much faster for large models.
+    """
+    data = component._data
+    if component.ctype is Var:
+        # unassigned variables are reported as None, as in get_value()
+        return [data[k].value for k in keys]
+    values = expression_values(component.model(), component).tolist()
+    pos = {k: i for i, k in enumerate(component.keys())}
+    return [values[pos[k]] for k in keys]
+
+
+def write_results(outdir, name, headings, keys, values, output_format="csv"):
+    """
+    Write a table of results to <outdir>/<name> with the extension for
+    output_format ("csv", "parquet" or "feather"). keys should be a list of
+    index tuples and values a matching list of values; headings should
+    have one entry per index column plus one for the values.
+    """
+    if output_format == "csv":
+        with open(os.path.join(outdir, name + ".csv"), "w") as fh:
+            writer = csv.writer(fh, dialect="switch-csv")
+            writer.writerow(headings)
+            writer.writerows(k + (v,) for k, v in zip(keys, values))
+        return
+
+    import pandas as pd
+
+    df = pd.DataFrame(
+        {h: [k[i] for k in keys] for i, h in enumerate(headings[:-1])},
+        columns=headings[:-1],
+    )
+    # Use typed columns where possible, so files can be read back zero-copy.
+    # Results are stored as floats (None -> NaN) and index columns that mix
+    # types (e.g., numbers and strings) are stored as strings.
+    df[headings[-1]] = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+    for col in headings[:-1]:
+        if df[col].dtype == object and df[col].map(type).nunique() > 1:
+            df[col] = df[col].astype(str)
+    path = os.path.join(outdir, f"{name}.{output_format}")
+    if output_format == "parquet":
+        df.to_parquet(path, index=False)
+    elif output_format == "feather":
+        df.to_feather(path)
+    else:
+        raise ValueError(f"Unrecognized output format {output_format}.")
+
+
 def save_total_cost_value(instance, outdir):
     with open(os.path.join(outdir, "total_cost.txt"), "w") as fh:
         fh.write("{}\n".format(value(instance.SystemCost)))
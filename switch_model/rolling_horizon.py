@@ -0,0 +1,636 @@
+"""
+Solve a dispatch-only model as a series of small models, each covering a
+window of timepoints, instead of one model covering all the timepoints.
+
+This is used by "switch solve --rolling-horizon HOURS". It is intended for
+production cost models, where all generation capacity is predetermined (e.g.,
+examples/production_cost_models). Any capacity decisions that remain (e.g.,
+local T&D capacity) are set to the most capacity chosen for any window, and
+then all the windows are solved again with that capacity.
+
+Switch links the timepoints of each timeseries in a loop (the first
+timepoint follows the last one), so different timeseries only interact
+through constraints and costs that span whole periods. Timeseries that are
+no longer than the window are grouped into windows of up to HOURS hours and
+solved independently (in parallel if --rolling-horizon-jobs is more than 1).
+Longer timeseries (e.g., a single timeseries for a whole year) are split into
+a chain of windows that are solved in order. Each of these windows also
+includes the next --rolling-horizon-overlap hours (lookahead), whose results
+are discarded, and the state of charge of storage projects and the committed
+capacity of generators at the end of each window are used as the starting
+point for the next one, in place of the loop back to the end of the
+timeseries. The first window of a chain still loops back to the end of its
+own lookahead, and the state it starts from is used as an explicit target
+for the end of the last window, so the stitched timeseries forms a closed
+loop like the original one. Minimum up and down times are still enforced
+around the loop within each window.
+
+Each window is solved as a separate Switch model, reading a copy of the
+inputs directory that only contains the window's timepoints (written to
+rolling_horizon/<window>/inputs in the outputs directory, along with the
+window's outputs). The timeseries in each window are reweighted to represent
+the whole period, so constraints on totals for a whole period (e.g., carbon
+caps, RPS targets or limits on fuel supply tiers; see period_constraints)
+would be applied to each window as if it were repeated throughout the
+period. Constraints on totals for a whole timeseries (e.g., hydro budgets;
+see timeseries_constraints) would also be applied to each part of a
+timeseries that is split into several windows. An error is raised if any of
+these are active.
+
+The results are then combined into one solution for the full model, which
+is built from the original inputs. Variables indexed by timepoint take their
+values from the window that owns each timepoint. Other variables (e.g.,
+capacity, or fuel consumption in each supply tier during each period) take
+the average of their values in the windows that include them, weighted by
+each window's share of its period. All the outputs, including
+total_cost.txt and annual summaries, are then written by the usual
+post-solve functions for the full model, so they are consistent with the
+stitched schedule. (Dual values are not available for the full model, so
+any outputs based on them are only in the window directories.)
+
+When this module is included in a model (which is done automatically for
+each window), it reads the starting state for the window from
+rolling_horizon_initial_state.csv, the required state at the end of the
+window from rolling_horizon_final_state.csv and the capacity to use from
+rolling_horizon_capacity.csv, if these are present.
+"""
+import csv
+import os
+import sys
+
+from pyomo.environ import *
+
+from switch_model.clustering import write_timeseries_subset
+
+# variables that carry state from one timepoint to the next, and the
+# constraints that link each timepoint to the previous one
+state_components = [
+    ("StateOfCharge", "Track_State_Of_Charge"),
+    ("CommitGen", "Commit_StartupGenCapacity_ShutdownGenCapacity_Consistency"),
+]
+
+# capacity decisions, which must be the same in all windows; these are all
+# indexed by two-part keys
+build_components = ["BuildGen", "BuildStorageEnergy", "BuildTx", "BuildLocalTD"]
+
+# constraints on totals for a whole period, which cannot be enforced
+# separately in each window
+period_constraints = [
+    "Enforce_Carbon_Cap",
+    "RPS_Enforce_Target",
+    "Battery_Cycle_Limit",
+    "Enforce_Dispatch_Baseload_Flat",
+]
+
+# constraints on totals for a whole timeseries, which cannot be enforced
+# separately in each window of a timeseries that is split into several windows
+timeseries_constraints = ["Enforce_Hydro_Avg_Flow", "DR_Shift_Net_Zero"]
+
+
+def add_rolling_horizon_args(parser):
+    parser.add_argument(
+        "--rolling-horizon",
+        type=float,
+        default=None,
+        metavar="HOURS",
+        help="""
+            Solve the model as a series of windows of up to HOURS hours each
+            (see switch_model.rolling_horizon). Intended for models where
+            all generation capacity is predetermined.
+        """,
+    )
+    parser.add_argument(
+        "--rolling-horizon-overlap",
+        type=float,
+        default=0,
+        metavar="HOURS",
+        help="""
+            Number of hours after the end of each window to include as
+            lookahead when a timeseries is split into several windows
+            (default is 0).
+        """,
+    )
+    parser.add_argument(
+        "--rolling-horizon-jobs",
+        type=int,
+        default=1,
+        help="""
+            Number of independent windows to solve at the same time, in
+            separate processes (default is 1). Not available on Windows.
+        """,
+    )
+
+
+def define_dynamic_components(m):
+    """
+    ROLLING_HORIZON_INITIAL_STATE is a set of (variable name, project) tuples
+    showing the state variables (see state_components) that have a starting
+    value for this window, and rh_initial_state[var, g] is that value.
+
+    Rolling_Horizon_Set_Initial_State replaces the reference to the state
+    at the end of each timeseries in the constraint for its first timepoint
+    with the starting value.
+
+    ROLLING_HORIZON_FINAL_STATE is a set of (variable name, project) tuples
+    showing state variables that must equal rh_final_state[var, g] at the
+    end of each timeseries in this window, which is enforced by
+    Rolling_Horizon_Final_State.
+
+    ROLLING_HORIZON_CAPACITY is a set of (variable name, index 1, index 2)
+    tuples showing capacity decisions (see build_components) that should be
+    fixed at rh_capacity[var, i, j] in this window, which is done by
+    Rolling_Horizon_Fix_Capacity.
+    """
+    m.ROLLING_HORIZON_INITIAL_STATE = Set(dimen=2)
+    m.rh_initial_state = Param(m.ROLLING_HORIZON_INITIAL_STATE, within=Reals)
+    m.Rolling_Horizon_Set_Initial_State = BuildAction(rule=set_initial_state)
+
+    m.ROLLING_HORIZON_FINAL_STATE = Set(dimen=2)
+    m.rh_final_state = Param(m.ROLLING_HORIZON_FINAL_STATE, within=Reals)
+    m.Rolling_Horizon_Final_State = Constraint(
+        m.ROLLING_HORIZON_FINAL_STATE,
+        m.TIMESERIES,
+        rule=lambda m, var_name, g, ts: (
+            getattr(m, var_name)[g, m.TPS_IN_TS[ts].last()]
+            == m.rh_final_state[var_name, g]
+            if (g, m.TPS_IN_TS[ts].last()) in getattr(m, var_name)
+            else Constraint.Skip
+        ),
+    )
+
+    m.ROLLING_HORIZON_CAPACITY = Set(dimen=3)
+    m.rh_capacity = Param(m.ROLLING_HORIZON_CAPACITY, within=NonNegativeReals)
+    # capacity for periods that are not in this window is ignored
+    m.Rolling_Horizon_Fix_Capacity = BuildAction(
+        rule=lambda m: [
+            getattr(m, var_name)[i, j].fix(m.rh_capacity[var_name, i, j])
+            for var_name, i, j in m.ROLLING_HORIZON_CAPACITY
+            if (i, j) in getattr(m, var_name)
+        ]
+    )
+
+
+def set_initial_state(m):
+    from pyomo.core.expr.visitor import replace_expressions
+
+    links = dict(state_components)
+    for var_name, g in m.ROLLING_HORIZON_INITIAL_STATE:
+        var = getattr(m, var_name)
+        con = getattr(m, links[var_name])
+        for ts in m.TIMESERIES:
+            t = m.TPS_IN_TS[ts].first()
+            if (g, t) in con:
+                # Replace the previous state on the side of the equation that
+                # is not just the current state; in single-timepoint
+                # timeseries these are the same variable.
+                c = con[g, t]
+                sub = {id(var[g, m.tp_previous[t]]): m.rh_initial_state[var_name, g]}
+                lhs, rhs = (
+                    side if side is var[g, t] else replace_expressions(side, sub)
+                    for side in c.expr.args
+                )
+                c.set_value(lhs == rhs)
+
+
+def load_inputs(mod, switch_data, inputs_dir):
+    """
+    Import the starting state, final state and fixed capacity for this
+    window, if any. These files are written by solve_rolling_horizon(). The
+    first has one row for each state variable and project, with the value
+    to use just before the first timepoint. The second has the value each
+    state variable must have at the last timepoint. The third has one row
+    for each capacity decision that should be fixed.
+
+    rolling_horizon_initial_state.csv
+        state_variable, project, rh_initial_state
+
+    rolling_horizon_final_state.csv
+        state_variable, project, rh_final_state
+
+    rolling_horizon_capacity.csv
+        build_variable, index_1, index_2, rh_capacity
+    """
+    switch_data.load_aug(
+        optional=True,
+        filename=os.path.join(inputs_dir, "rolling_horizon_initial_state.csv"),
+        index=mod.ROLLING_HORIZON_INITIAL_STATE,
+        param=(mod.rh_initial_state,),
+    )
+    switch_data.load_aug(
+        optional=True,
+        filename=os.path.join(inputs_dir, "rolling_horizon_final_state.csv"),
+        index=mod.ROLLING_HORIZON_FINAL_STATE,
+        param=(mod.rh_final_state,),
+    )
+    switch_data.load_aug(
+        optional=True,
+        filename=os.path.join(inputs_dir, "rolling_horizon_capacity.csv"),
+        index=mod.ROLLING_HORIZON_CAPACITY,
+        param=(mod.rh_capacity,),
+    )
+
+
+def get_windows(inputs_dir, hours, overlap):
+    """
+    Return a list of jobs, each of which is a list of windows to solve in
+    order. Each window is a dict showing its name, the timeseries to write
+    for it (in the format used by write_timeseries_subset), the timepoint
+    IDs it owns ("core_tps"), the last timepoint it owns, the fraction of
+    the period these represent, and whether it starts from the state at the
+    end of the previous window.
+    """
+    import pandas as pd
+
+    ts = pd.read_csv(
+        os.path.join(inputs_dir, "timeseries.csv"), dtype={"TIMESERIES": str}
+    )
+    tp = pd.read_csv(
+        os.path.join(inputs_dir, "timepoints.csv"),
+        dtype={"timepoint_id": str, "timeseries": str},
+    )
+    tps_in_ts = tp.groupby("timeseries", sort=False)["timepoint_id"].apply(list)
+    # hours represented by each timeseries and period
+    ts_hours = {
+        r.TIMESERIES: len(tps_in_ts.get(r.TIMESERIES, []))
+        * r.ts_duration_of_tp
+        * r.ts_scale_to_period
+        for r in ts.itertuples(index=False)
+    }
+    period_hours = {}
+    for r in ts.itertuples(index=False):
+        period_hours[r.ts_period] = (
+            period_hours.get(r.ts_period, 0) + ts_hours[r.TIMESERIES]
+        )
+
+    windows = []
+
+    def add_window(rows, core, chained):
+        # reweight the window to represent the whole period
+        period = rows[0]["period"]
+        window_hours = sum(
+            len(r["timepoints"]) * r["duration"] * r["scale"] for r in rows
+        )
+        core_hours = sum(
+            r["duration"] * r["scale"]
+            for r in rows
+            for t in r["timepoints"]
+            if t in core
+        )
+        for r in rows:
+            r["new_scale"] = r["scale"] * period_hours[period] / window_hours
+        window = dict(
+            name="{:04d}_{}".format(len(windows), rows[0]["new_timeseries"]),
+            timeseries=pd.DataFrame(rows),
+            core_tps=set(core),
+            last_tp=core[-1],
+            share=core_hours / period_hours[period],
+            chained=chained,
+        )
+        windows.append(window)
+        return window
+
+    jobs = []
+    group = []
+
+    def flush_group():
+        if group:
+            core = [t for g in group for t in g["timepoints"]]
+            jobs.append([add_window(list(group), core, False)])
+            group.clear()
+
+    for r in ts.itertuples(index=False):
+        tps = tps_in_ts.get(r.TIMESERIES, [])
+        n = int(round(hours / r.ts_duration_of_tp))
+        if n < 1:
+            raise ValueError(
+                f"Timepoints in timeseries {r.TIMESERIES} are longer than "
+                f"the --rolling-horizon window of {hours} hours."
+            )
+        row = dict(
+            timeseries=r.TIMESERIES,
+            period=r.ts_period,
+            duration=r.ts_duration_of_tp,
+            scale=r.ts_scale_to_period,
+        )
+        ts_length = len(tps) * r.ts_duration_of_tp
+        if ts_length <= hours:
+            # whole timeseries; add to the current group if it fits
+            if group and (
+                group[0]["period"] != r.ts_period
+                or sum(len(g["timepoints"]) * g["duration"] for g in group) + ts_length
+                > hours
+            ):
+                flush_group()
+            group.append(dict(row, new_timeseries=r.TIMESERIES, timepoints=tps))
+        else:
+            # split into a chain of windows with lookahead
+            flush_group()
+            o = int(round(overlap / r.ts_duration_of_tp))
+            chain = []
+            for i, start in enumerate(range(0, len(tps), n)):
+                window_ts = dict(
+                    row,
+                    new_timeseries=f"{r.TIMESERIES}_{i}",
+                    timepoints=tps[start : start + n + o],
+                )
+                chain.append(add_window([window_ts], tps[start : start + n], i > 0))
+            jobs.append(chain)
+    flush_group()
+    return jobs
+
+
+def solve_rolling_horizon(model, args, logger):
+    """
+    Solve the model specified by args (already defined as model, with
+    options parsed from args) one window at a time, then combine the results
+    into one solution for the full model and write its outputs in
+    options.outputs_dir.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    options = model.options
+    if options.cluster_timeseries is not None:
+        raise ValueError("--rolling-horizon cannot be used with --cluster-timeseries.")
+    jobs = get_windows(
+        options.inputs_dir, options.rolling_horizon, options.rolling_horizon_overlap
+    )
+    # build the full model first, to check that it can be split into windows
+    instance = model.load_inputs()
+    check_constraints(instance, jobs)
+
+    work_dir = os.path.join(options.outputs_dir, "rolling_horizon")
+    n_windows = sum(len(j) for j in jobs)
+    logger.info(
+        f"Solving {n_windows} rolling-horizon windows ({len(jobs)} independent "
+        f"jobs); see {work_dir} for details."
+    )
+
+    n_procs = min(options.rolling_horizon_jobs, len(jobs))
+    if n_procs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning(
+            "WARNING: --rolling-horizon-jobs is not supported on this platform; "
+            "solving windows one at a time."
+        )
+        n_procs = 1
+
+    def solve_all(capacity):
+        job_args = [(args, options.inputs_dir, work_dir, job, capacity) for job in jobs]
+        if n_procs > 1:
+            # flush buffers so the children don't write them again
+            sys.stdout.flush()
+            sys.stderr.flush()
+            with ProcessPoolExecutor(
+                n_procs, mp_context=multiprocessing.get_context("fork")
+            ) as pool:
+                results = list(pool.map(solve_job, *zip(*job_args)))
+        else:
+            results = [solve_job(*a) for a in job_args]
+        return [r for job_results in results for r in job_results]
+
+    windows = [w for job in jobs for w in job]
+    results = solve_all(None)
+
+    # Use the same capacity in all windows. Capacity that is not fixed in
+    # advance (e.g., local T&D) is set to the most chosen for any window, which
+    # is enough to serve all of them.
+    capacity = {}
+    for r in results:
+        for k, v in r["capacity"].items():
+            capacity[k] = max(v, capacity.get(k, v))
+    if any(
+        abs(r["capacity"].get(k, 0) - v) > 1e-6 * max(1, abs(v))
+        for r in results
+        for k, v in capacity.items()
+    ):
+        logger.info(
+            "Capacity differs between windows; solving all windows again with "
+            "the most capacity chosen for any window."
+        )
+        results = solve_all(capacity)
+
+    missing = load_stitched_solution(instance, windows, results)
+    if missing:
+        logger.warning(
+            "WARNING: Some elements of the following variables were not found "
+            "in any window (e.g., because they are indexed by a timeseries that "
+            f"was split into several windows) and have no value: {', '.join(missing)}."
+        )
+    os.makedirs(options.outputs_dir, exist_ok=True)
+    if not options.no_save_solution:
+        from switch_model.solve import save_results
+
+        save_results(instance, options.outputs_dir)
+    if not options.no_post_solve:
+        instance.post_solve()
+    logger.info(f"Total cost of all windows: ${value(instance.SystemCost):,.2f}")
+
+
+def check_constraints(m, jobs):
+    """
+    Raise a ValueError if the full model m has active constraints on totals
+    for a whole period (see period_constraints), or for a whole timeseries
+    that is split into several windows in jobs (see timeseries_constraints),
+    since these would be applied to each window separately.
+    """
+    split_ts = {
+        ts for job in jobs if len(job) > 1 for ts in job[0]["timeseries"]["timeseries"]
+    }
+    names = [name for name in period_constraints if len(getattr(m, name, [])) > 0]
+    for name in timeseries_constraints:
+        con = getattr(m, name, None)
+        if con is None:
+            continue
+        positions = index_positions(con, m.TIMESERIES)
+        if any(str(k[i]) in split_ts for k in keys_of(con) for i in positions):
+            names.append(name)
+    # fuel supply tiers with a limit on consumption during each period
+    if any(v.ub is not None for v in getattr(m, "ConsumeFuelTier", {}).values()):
+        names.append("ConsumeFuelTier")
+    if names:
+        raise ValueError(
+            "--rolling-horizon cannot be used with constraints on totals for a "
+            "whole period or timeseries, because they would be applied to each "
+            f"window separately: {', '.join(names)}."
+        )
+
+
+def keys_of(component):
+    """
+    Return a list of the keys of an indexed component, as tuples.
+    """
+    return [k if isinstance(k, tuple) else (k,) for k in component.keys()]
+
+
+def index_positions(component, members):
+    """
+    Return a list of the positions in the keys of an indexed component that
+    hold a member of members (e.g., a timepoint) in every key.
+    """
+    keys = keys_of(component)
+    if not keys or keys[0] == (None,):
+        return []
+    return [i for i in range(len(keys[0])) if all(k[i] in members for k in keys)]
+
+
+def solve_job(args, inputs_dir, work_dir, windows, capacity=None):
+    """
+    Solve a list of windows in order, passing the state at the end of each
+    window to the next one if needed. The last window of a chain must end in
+    the state that the first window started from. If capacity is a dict, it
+    shows values to use for capacity decisions, identified by (variable
+    name, index 1, index 2). Returns a list of results from window_results()
+    for these windows.
+    """
+    import switch_model.solve
+
+    results = []
+    state = {}
+    start_state = {}
+    for i, window in enumerate(windows):
+        window_inputs = os.path.join(work_dir, window["name"], "inputs")
+        window_outputs = os.path.join(work_dir, window["name"], "outputs")
+        write_timeseries_subset(inputs_dir, window_inputs, window["timeseries"])
+        if window["chained"]:
+            initial_state = state
+            final_state = start_state if i == len(windows) - 1 else {}
+        else:
+            initial_state = final_state = {}
+        for file_name, param, values in [
+            ("rolling_horizon_initial_state.csv", "rh_initial_state", initial_state),
+            ("rolling_horizon_final_state.csv", "rh_final_state", final_state),
+        ]:
+            path = os.path.join(window_inputs, file_name)
+            if values:
+                with open(path, "w", newline="") as f:
+                    w = csv.writer(f, lineterminator="\n")
+                    w.writerow(["state_variable", "project", param])
+                    w.writerows((var, g, v) for (var, g), v in values.items())
+            elif os.path.exists(path):
+                os.remove(path)
+        if capacity:
+            capacity_file = os.path.join(window_inputs, "rolling_horizon_capacity.csv")
+            with open(capacity_file, "w", newline="") as f:
+                w = csv.writer(f, lineterminator="\n")
+                w.writerow(["build_variable", "index_1", "index_2", "rh_capacity"])
+                w.writerows(k + (v,) for k, v in capacity.items())
+        instance = switch_model.solve.main(
+            args=args
+            + [
+                "--inputs-dir",
+                window_inputs,
+                "--outputs-dir",
+                window_outputs,
+                "--include-module",
+                "switch_model.rolling_horizon",
+                "--rolling-horizon",
+                "0",
+            ]
+        )
+        result = window_results(instance, window)
+        state = result["state"]
+        if i == 0:
+            start_state = result["start_state"]
+        results.append(result)
+    return results
+
+
+def window_results(m, window):
+    """
+    Return a dict showing the values of the state variables just before the
+    first timepoint and at the last timepoint owned by this window, the
+    values of any capacity decisions that were not fixed in advance, and the
+    values of all variables for use in the full model ("values"). These are
+    a dict of {variable name: [(key, value), ...]} for variables indexed by
+    timepoint, which only include the timepoints owned by this window, and
+    another one for all other variables.
+    """
+    tps = [t for t in m.TIMEPOINTS if str(t) in window["core_tps"]]
+    last_tp = next(t for t in m.TIMEPOINTS if str(t) == window["last_tp"])
+    # the state before the first timepoint is the state at the end of its
+    # timeseries (lookahead included), unless it was set explicitly
+    prev_tp = m.tp_previous[tps[0]]
+    tp_values = {}
+    other_values = {}
+    for var in m.component_objects(Var):
+        positions = index_positions(var, m.TIMEPOINTS)
+        values = tp_values if positions else other_values
+        values[var.name] = [
+            (k, v.value)
+            for (k, v), key in zip(var.items(), keys_of(var))
+            if v.value is not None
+            and all(str(key[i]) in window["core_tps"] for i in positions)
+        ]
+
+    result = dict(
+        state={
+            (var_name, g): value(getattr(m, var_name)[g, t])
+            for var_name, con_name in state_components
+            if hasattr(m, var_name)
+            for g, t in getattr(m, var_name)
+            if t == last_tp
+        },
+        start_state={
+            (var_name, g): value(getattr(m, var_name)[g, t])
+            for var_name, con_name in state_components
+            if hasattr(m, var_name)
+            for g, t in getattr(m, var_name)
+            if t == prev_tp and (var_name, g) not in m.ROLLING_HORIZON_INITIAL_STATE
+        },
+        capacity={
+            (var_name,) + k: v.value
+            for var_name in build_components
+            if hasattr(m, var_name)
+            for k, v in getattr(m, var_name).items()
+            if v.value is not None
+            and not v.fixed
+            and (v.lb is None or v.ub is None or v.lb != v.ub)
+        },
+        tp_values=tp_values,
+        other_values=other_values,
+    )
+    return result
+
+
+def load_stitched_solution(m, windows, results):
+    """
+    Set the variables in the full model m to the values from the windows.
+    Variables indexed by timepoint use the values from the window that owns
+    each timepoint. Other variables use the average of the values from the
+    windows that include them, weighted by each window's share of its
+    period. Components or keys that are not in m (e.g., the ones added by
+    this module, or timeseries created by splitting a timeseries) are
+    ignored. Returns a sorted list of the names of variables that still have
+    elements with no value.
+    """
+    import pyomo.version
+
+    # skip validation, like switch_model.solve.load_solution()
+    if pyomo.version.version_info[:2] >= (6, 0):
+        no_validation = dict(skip_validation=True)
+    else:
+        no_validation = dict(valid=True)
+    totals = {}
+    for w, r in zip(windows, results):
+        for name, items in r["tp_values"].items():
+            var = getattr(m, name, None)
+            if var is not None:
+                for k, val in items:
+                    if k in var:
+                        var[k].set_value(val, **no_validation)
+        for name, items in r["other_values"].items():
+            for k, val in items:
+                total, weight = totals.get((name, k), (0.0, 0.0))
+                totals[name, k] = (total + w["share"] * val, weight + w["share"])
+    for (name, k), (total, weight) in totals.items():
+        var = getattr(m, name, None)
+        if var is not None and k in var:
+            var[k].set_value(total / weight, **no_validation)
+    return sorted(
+        {
+            var.name
+            for var in m.component_objects(Var)
+            for v in var.values()
+            if v.value is None
+        }
+    )
@@ -5,6 +5,7 @@ from __future__ import print_function
 
 import logging
 import sys, os, time, shlex, re, inspect, textwrap, types, threading, json, traceback
+import itertools
 
 try:
     import IPython
@@ -34,17 +35,48 @@ from switch_model.utilities import (
     create_model,
     _ArgumentParser,
     StepTimer,
+    clear_solution_cache,
+    cpu_time,
+    record_phase,
     make_iterable,
     LogOutput,
     warn,
     wrap,
     unwrap,
     rewrap,
+    using_persistent_solver,
 )
 from switch_model.upgrade import do_inputs_need_upgrade, upgrade_inputs
+from switch_model.balancing.diagnose_infeasibility import (
+    add_diagnosis_args,
+    report_conflict,
+)
+from switch_model.benders import add_benders_args, solve_benders
+from switch_model.clustering import add_clustering_args, cluster_inputs
+from switch_model.low_memory import (
+    add_low_memory_args,
+    can_free_constraint_bodies,
+    free_constraint_bodies,
+    log_peak_memory,
+    release_construction_data,
+)
+from switch_model.matrix import add_matrix_args, build_matrix, solve_matrix, write_mps
+from switch_model.rolling_horizon import add_rolling_horizon_args, solve_rolling_horizon
 
 
-def main(args=None, return_model=False, return_instance=False):
+def main(args=None, return_model=False, return_instance=False, model_cache=None):
+    """
+    Define, construct and solve a Switch model using the specified arguments
+    (or the command line and options.txt if args is None).
+
+    If model_cache is a dict, the model and instance are stored in it, and a
+    later call with the same dict will reuse them instead of building a new
+    instance if the modules and options are unchanged except for
+    --input-aliases, --scenario-name and --outputs-dir. In that case, only
+    the aliased files are read again and only the components that could
+    depend on them are reconstructed (see SwitchAbstractModel.reload_inputs).
+    This is used by "switch solve-scenarios --reuse-model".
+    """
 
     timer = StepTimer()
     if args is None:
@@ -167,16 +199,20 @@ def main(args=None, return_model=False, return_instance=False):
         # the current module (to register define_arguments callback)
         modules = get_module_list(args)
 
-        # Patch pyomo if needed, to allow reconstruction of expressions.
-        # This must be done before the model is constructed.
-        patch_pyomo()
-
-        # Define the model
-        model = create_model(modules, args=args, logger=logger)
-        # Add any suffixes specified on the command line (usually only iis)
-        add_extra_suffixes(model)
+        # Reuse a previous model and instance if possible, otherwise define
+        # the model.
+        prior_instance = get_reusable_instance(model_cache, modules, args, logger)
+        if prior_instance is not None:
+            model = model_cache["model"]
+            logger.info("Reusing model from previous scenario.")
+        else:
+            model = create_model(modules, args=args, logger=logger)
+            # Add any suffixes specified on the command line (usually only iis)
+            add_extra_suffixes(model)
 
-        logger.info("Model defined in {:.2f} s.".format(timer.step_time()))
+            logger.info("Model defined in {:.2f} s.".format(timer.step_time()))
+            record_phase(model, "define_model", timer.last_step, timer.last_cpu_step)
+            log_peak_memory(model, "defining model")
 
         # return the model as-is if requested
         if return_model and not return_instance:
@@ -187,22 +223,66 @@ def main(args=None, return_model=False, return_instance=False):
             # TODO: allow a directory to be specified after --reload-prior-solution,
             # otherwise use outputs_dir.
             prior_solution_file = os.path.join(
-                model.options.outputs_dir, "results.pickle"
+                model.options.outputs_dir, "solution", "index.pickle"
             )
+            if not os.path.exists(prior_solution_file):
+                # solution saved by an earlier version of Switch
+                prior_solution_file = os.path.join(
+                    model.options.outputs_dir, "results.pickle"
+                )
             if not os.path.exists(prior_solution_file):
                 raise IOError(
-                    "Prior solution {} does not exist.".format(prior_solution_file)
+                    "Prior solution {} does not exist.".format(
+                        os.path.join(model.options.outputs_dir, "solution")
+                    )
                 )
 
+        if model.options.rolling_horizon:
+            # solve one window at a time instead of solving the full instance
+            solve_rolling_horizon(model, args, logger)
+            logger.info(
+                f"\nSwitch completed successfully in {timer.total_time():0.2f} s."
+            )
+            return None
+
+        if model.options.cluster_timeseries is not None:
+            # replace the inputs with representative days or weeks
+            logger.info("\nClustering timeseries...")
+            model.options.inputs_dir = cluster_inputs(model.options, logger)
+            logger.info(f"Clustered timeseries in {timer.step_time():.2f} s.")
+
         # create an instance (also reports time spent reading data and loading into model)
         logger.info("\nLoading inputs...")
-        instance = model.load_inputs()
+        if model_cache is not None and not hasattr(model, "input_load_cache"):
+            # keep a copy of the data from each file for later scenarios
+            model.input_load_cache = {}
+        if prior_instance is not None and model.reload_inputs(prior_instance):
+            instance = prior_instance
+        else:
+            instance = model.load_inputs(
+                attach_data_portal=not model.options.low_memory
+            )
+        if model.options.low_memory:
+            n = release_construction_data(instance)
+            if n:
+                logger.info(f"Released {n} construction-only data objects.")
+        log_peak_memory(instance, "loading inputs")
+        if model_cache is not None:
+            if instance.iterate_modules:
+                # iterated models are modified as they are solved, so they
+                # can't be reused as a starting point for other scenarios
+                model_cache.clear()
+            else:
+                model_cache.update(modules=modules, model=model, instance=instance)
 
         #### Below here, we refer to instance instead of model ####
 
         logger.info("Executing pre-solve functions...")
+        timer.step_time()  # restart counter after loading inputs
         instance.pre_solve()
         logger.info(f"Completed pre-solve processing in {timer.step_time():.2f} s.")
+        record_phase(instance, "pre_solve", timer.last_step, timer.last_cpu_step)
+        log_peak_memory(instance, "pre-solve")
 
         # return the instance as-is if requested
         if return_instance:
@@ -222,17 +302,32 @@ def main(args=None, return_model=False, return_instance=False):
 
         if instance.options.reload_prior_solution:
             logger.info("Loading prior solution...")
-            reload_prior_solution_from_pickle(instance, prior_solution_file)
+            if prior_solution_file.endswith("results.pickle"):
+                reload_prior_solution_from_pickle(instance, prior_solution_file)
+            else:
+                load_solution(instance, os.path.dirname(prior_solution_file))
             logger.info(
                 f"Loaded previous results into model instance in {timer.step_time():.2f} s."
             )
+            record_phase(
+                instance, "load_prior_solution", timer.last_step, timer.last_cpu_step
+            )
         else:
             # solve the model (reports time for each step as it goes)
             if instance.iterate_modules:
                 logger.info("Iterating model...")
                 iterate(instance)
+                timer.step_time()
+                record_phase(instance, "iterate", timer.last_step, timer.last_cpu_step)
             else:
-                results = solve(instance)
+                if instance.options.benders:
+                    results = solve_benders(instance)
+                elif instance.options.matrix_backend:
+                    results = solve_matrix(instance)
+                else:
+                    if instance.options.write_mps:
+                        write_mps(build_matrix(instance), instance.options.write_mps)
+                    results = solve(instance)
                 logger.info("")
                 logger.info(
                     f"Optimization termination condition was "
@@ -241,6 +336,16 @@ def main(args=None, return_model=False, return_instance=False):
                 if str(results.solver.message) != "<undefined>":
                     logger.info(f"Solver message: {results.solver.message}")
                 timer.step_time()  # restart counter for next step
+                record_phase(
+                    instance,
+                    "solve",
+                    timer.last_step,
+                    timer.last_cpu_step,
+                    nonzeros=reported_nonzeros(results),
+                    solver_status=str(results.solver.status),
+                    termination_condition=str(results.solver.termination_condition),
+                )
+            log_peak_memory(instance, "solving model")
 
             # save model configuration for future reference
             file = os.path.join(instance.options.outputs_dir, "model_config.json")
@@ -259,6 +364,10 @@ def main(args=None, return_model=False, return_instance=False):
                 logger.info(f"\nSaving solution file...")
                 save_results(instance, instance.options.outputs_dir)
                 logger.info(f"Saved solution file in {timer.step_time():.2f} s.")
+                record_phase(
+                    instance, "save_solution", timer.last_step, timer.last_cpu_step
+                )
+                log_peak_memory(instance, "saving solution")
 
         # report results
         # (repeated if model is reloaded, to automatically run any new export code)
@@ -268,8 +377,13 @@ def main(args=None, return_model=False, return_instance=False):
             logger.info(
                 f"Completed post-solve processing in {timer.step_time():.2f} s."
             )
+            record_phase(instance, "post_solve", timer.last_step, timer.last_cpu_step)
+            log_peak_memory(instance, "post-solve")
 
         logger.info(f"\nSwitch completed successfully in {timer.total_time():0.2f} s.")
+        record_phase(
+            instance, "total", timer.total_time(), cpu_time() - timer.start_cpu
+        )
         logger.info("=" * 80 + "\n")
 
     # end of LogOutput block
@@ -311,6 +425,37 @@ def main(args=None, return_model=False, return_instance=False):
     return instance
 
 
+# options that may differ between scenarios that reuse the same model instance
+reusable_model_options = {
+    "input_aliases",
+    "scenario_name",
+    "outputs_dir",
+    "telemetry_file",
+}
+
+
+def get_reusable_instance(model_cache, modules, args, logger):
+    """
+    Return the instance stored in model_cache if it can be reused for a model
+    with the specified modules and arguments, otherwise return None. If the
+    instance can be reused, the model's options are updated to match args.
+    """
+    if not model_cache or model_cache["modules"] != modules:
+        return None
+    model = model_cache["model"]
+    model.logger = logger
+    options = model.parse_options(args)
+    old_options = vars(model.options)
+    if any(
+        v != old_options.get(k)
+        for k, v in vars(options).items()
+        if k not in reusable_model_options
+    ):
+        return None
+    model.options = options
+    return model_cache["instance"]
+
+
 # should we show a full traceback when there is an error?
 full_traceback = False
 
@@ -330,7 +475,14 @@ def report_error(exc_type, exc_value, exc_traceback):
         for frame, line in traceback.walk_tb(exc_traceback):
             # https://stackoverflow.com/q/2000861/3830997
             # error_locs.append(inspect.getmodule(frame).__spec__.name, line)
-            error_locs.append((frame.f_globals["__name__"], frame.f_code.co_name, line))
+            error_locs.append(
+                (
+                    # code compiled at runtime may not have a module name
+                    frame.f_globals.get("__name__", frame.f_code.co_filename),
+                    frame.f_code.co_name,
+                    line,
+                )
+            )
 
         # TODO: only show the traceback if --log-level info?
 
@@ -364,8 +516,15 @@ def debug(exc_type, exc_value, exc_traceback):
 
 
 def reload_prior_solution_from_pickle(instance, pickle_file):
+    """
+    Load a solution saved as a Pyomo results object (results.pickle) by
+    earlier versions of Switch.
+    """
+    # Patch pyomo if needed, to speed up loading the solution.
+    patch_pyomo()
     with open(pickle_file, "rb") as fh:
         results = pickle.load(fh)
+    clear_solution_cache(instance)
     instance.solutions.load_from(results)
     return instance
 
@@ -677,6 +836,18 @@ def define_arguments(argparser):
         default=None,
         help="Method for Pyomo to use to communicate with solver",
     )
+    argparser.add_argument(
+        "--persistent-solver",
+        default=False,
+        action="store_true",
+        help="""
+            Use Pyomo's persistent interface for the solver (e.g., gurobi,
+            cplex or xpress), which keeps a copy of the model in the solver
+            between solves. This is useful for iterated models, since only
+            the parts of the model that change need to be sent to the solver
+            again (see switch_model.utilities.rebuild_components).
+        """,
+    )
     # note: pyomo has a --solver-options option but it is not clear
     # whether that does the same thing as --solver-options-string so we don't reuse the same name.
     argparser.add_argument(
@@ -767,11 +938,80 @@ def define_arguments(argparser):
             studies with alternative inputs.
         """,
     )
+    argparser.add_argument(
+        "--input-reader",
+        default="pyomo",
+        choices=["pyomo", "pandas"],
+        help="""
+            Method to use for reading .csv input files. "pyomo" (default) uses
+            the standard Pyomo DataPortal. "pandas" reads each file in bulk
+            with pandas and stores the data directly in the DataPortal, which
+            is much faster for large input files; files it can't handle are
+            still read by the DataPortal. Use --log-level debug to see the
+            time and row count for each file.
+        """,
+    )
+    argparser.add_argument(
+        "--input-cache",
+        default=None,
+        help="""
+            Directory to store a binary copy of the data parsed from each
+            input file. Later runs read the data from this cache instead of
+            parsing the file again, as long as the file, the --input-aliases
+            and the module list are unchanged. The same directory can be
+            shared by different inputs directories and parallel runs.
+        """,
+    )
+    argparser.add_argument(
+        "--profile-construction",
+        default=False,
+        action="store_true",
+        help="""
+            Record the time, number of elements and peak memory used to
+            construct each model component, and write them to
+            construction_profile.csv (sorted by time) and
+            construction_profile.folded (stack file for flamegraph tools,
+            grouped by the module that declared each component) in the
+            outputs directory. Tracking memory makes construction slower.
+        """,
+    )
+    add_clustering_args(argparser)
+    add_rolling_horizon_args(argparser)
+    add_benders_args(argparser)
+    add_matrix_args(argparser)
+    add_diagnosis_args(argparser)
+    add_low_memory_args(argparser)
     argparser.add_argument(
         "--outputs-dir",
         default="outputs",
         help='Directory to write output files (default is "outputs")',
     )
+    argparser.add_argument(
+        "--post-solve-jobs",
+        type=int,
+        default=1,
+        help="""
+            Number of modules' post-solve (reporting) functions to run at the
+            same time, in separate processes (default is 1). Modules that
+            modify the model during post-solve or need other modules' outputs
+            declare this and are scheduled accordingly. Not available on
+            Windows.
+        """,
+    )
+    argparser.add_argument(
+        "--telemetry-file",
+        default=None,
+        metavar="FILE",
+        help="""
+            Append a record of the wall time, CPU time, peak memory, model
+            size and solver status for each phase of the run (reading
+            inputs, construction, pre-solve, each step of the solve,
+            post-solve, etc.) to FILE, as one line of JSON per phase.
+            Per-module records are also written for load_inputs and
+            post_solve. "switch solve-scenarios" combines these into one
+            table per job.
+        """,
+    )
     argparser.add_argument(
         "--no-post-solve",
         default=False,
@@ -1053,8 +1293,72 @@ def add_extra_suffixes(model):
             setattr(model, suffix, Suffix(direction=Suffix.IMPORT_EXPORT))
 
 
+# methods of Pyomo solvers called for each step of solver.solve(), and the
+# phase name used for them in telemetry records
+solver_steps = [
+    ("_presolve", "write_problem"),
+    ("_apply_solver", "solver"),
+    ("_postsolve", "read_solution"),
+]
+
+
+def timed_solver_step(model, method, step, step_times, free_bodies=False):
+    """
+    Return a wrapper for a method of model.solver that stores the wall and
+    CPU time for `step` in step_times, and frees the constraint bodies before
+    running the solver if free_bodies is True.
+    """
+
+    def wrapper(*args, **kwargs):
+        if step == "solver" and free_bodies:
+            n = free_constraint_bodies(model)
+            model.logger.info(f"Freed {n} constraint bodies.")
+        timer = StepTimer()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timer.step_time()
+            step_times[step] = (timer.last_step, timer.last_cpu_step)
+
+    return wrapper
+
+
+def reported_nonzeros(results):
+    """
+    Return the number of nonzeros in the constraint matrix reported by the
+    solver in results (possibly after the solver's presolve), or None.
+    """
+    try:
+        n = results.problem.number_of_nonzeros
+    except AttributeError:
+        return None
+    return n if isinstance(n, int) else None
+
+
 def solve(model):
-    if not hasattr(model, "solver"):
+    clear_solution_cache(model)
+    if not hasattr(model, "solver") and model.options.persistent_solver:
+        # Create a persistent solver interface and send the model to it. On
+        # later solves, only the changes are sent (see rebuild_components()).
+        solver_name = model.options.solver
+        if not solver_name.endswith("_persistent"):
+            solver_name += "_persistent"
+        model.solver = SolverFactory(solver_name)
+        if not model.solver.available(exception_flag=False):
+            raise ValueError(
+                f"Persistent solver interface {solver_name} is not available. "
+                "Pyomo provides persistent interfaces for gurobi, cplex, "
+                "xpress and mosek, and each requires the solver's Python "
+                "bindings to be installed."
+            )
+        timer = StepTimer()
+        model.solver.set_instance(
+            model, symbolic_solver_labels=model.options.symbolic_solver_labels
+        )
+        model.logger.info(
+            f"Sent model to persistent solver in {timer.step_time():.2f} s."
+        )
+    elif not hasattr(model, "solver"):
         # Create a solver object the first time in. We don't do this until a solve is
         # requested, because sometimes a different solve function may be used,
         # with its own solver object (e.g., with runph or a parallel solver server).
@@ -1120,8 +1424,33 @@ def solve(model):
         # bar above solver output
         model.logger.info("-" * 33 + " solver output " + "-" * 32)
 
+    # Pyomo's solver.solve() calls _presolve() to write the problem file,
+    # _apply_solver() to run the solver and _postsolve() to read the results;
+    # we time each of these for the telemetry records, and free the
+    # constraint bodies before the solver runs if requested.
+    free_bodies = can_free_constraint_bodies(model)
+    step_times = {}
+    for method, step in solver_steps:
+        if hasattr(model.solver, method):
+            setattr(
+                model.solver,
+                method,
+                timed_solver_step(
+                    model, getattr(model.solver, method), step, step_times, free_bodies
+                ),
+            )
+
     try:
-        results = model.solver_manager.solve(model, opt=model.solver, **solver_args)
+        if using_persistent_solver(model):
+            # the objective may have been switched or rebuilt since the last
+            # solve (e.g., by smooth_dispatch), so we always send it again
+            model.solver.set_objective(
+                next(model.component_data_objects(Objective, active=True))
+            )
+            solver_args.pop("symbolic_solver_labels", None)
+            results = model.solver.solve(**solver_args)
+        else:
+            results = model.solver_manager.solve(model, opt=model.solver, **solver_args)
     except ValueError as err:
         # show the solver status for obscure errors if possible
         model.logger.error("\n" + "=" * 80 + "\nError during solve:\n")
@@ -1130,6 +1459,10 @@ def solve(model):
         except:
             pass
         raise
+    finally:
+        # restore the solver's own methods
+        for method, step in solver_steps:
+            vars(model.solver).pop(method, None)
 
     if model.options.tee:
         # bar below solver output
@@ -1138,6 +1471,16 @@ def solve(model):
     model.logger.info(
         f"Solved model. Total time spent in solver: {timer.step_time():0.2f} s."
     )
+    for step, (wall_time, cpu) in step_times.items():
+        record_phase(model, step, wall_time, cpu)
+    if step_times:
+        # loading the solution into the model is the rest of the solve time
+        record_phase(
+            model,
+            "load_solution",
+            timer.last_step - sum(t for t, c in step_times.values()),
+            timer.last_cpu_step - sum(c for t, c in step_times.values()),
+        )
 
     # Treat infeasibility as an error, rather than trying to load and save the results
     # (note: in this case, results.solver.status may be SolverStatus.warning instead of
@@ -1145,7 +1488,8 @@ def solve(model):
     infeasibility_message = (
         "You can identify infeasible constraints by adding "
         "switch_model.balancing.diagnose_infeasibility to the module list and "
-        "solving again."
+        "solving again, or find a minimal set of conflicting constraints by "
+        "solving again with --diagnose-infeasibility."
         "\n\nAlternatively, if the solver can generate an irreducibly "
         "inconsistent set (IIS), more information may be available by setting "
         "the appropriate flags in the --solver-options-string and then calling "
@@ -1158,6 +1502,9 @@ def solve(model):
                 "Model was infeasible; irreducibly inconsistent set (IIS) returned by solver:"
             )
             model.logger.error("\n".join(sorted(c.name for c in model.iis)))
+        elif model.options.diagnose_infeasibility:
+            model.logger.error("Model was infeasible.")
+            report_conflict(model)
         else:
             model.logger.error("Model was infeasible. " + infeasibility_message)
 
@@ -1329,19 +1676,130 @@ def _options_string_to_dict(istr):
 
 def save_results(instance, outdir):
     """
-    Save model solution for later reuse.
+    Save model solution for later reuse (see save_solution()).
+    """
+    save_solution(instance, os.path.join(outdir, "solution"))
+
+
+def save_solution(instance, solution_dir):
+    """
+    Save the values of all variables and all import suffixes (e.g., dual
+    and rc) in solution_dir, so they can be reloaded with load_solution().
+
+    Values are stored as flat float arrays in .npy files (vars.npy and
+    suffix.<name>.npy, plus matching .is_int.npy files that flag integer
+    values), which load_solution() can memory-map. index.pickle
+    holds the index table: a list of (component name, keys, start, stop)
+    tuples for each array, giving the slice of the array that holds the
+    values for each component, in the order of the keys.
+
+    We save this instead of a pickled Pyomo results object because the
+    instance itself cannot be pickled (see
+    https://stackoverflow.com/questions/39941520/pyomo-ipopt-does-not-return-solution)
+    and loading a results object requires a name lookup for every element.
+    """
+    import numpy as np
+
+    def flatten(items, array_file):
+        # save [(component, key, value), ...] as an array and return the
+        # index table for it; also record which values were ints (e.g.,
+        # fixed variables), so they can be restored exactly
+        table = []
+        values = []
+        # (group by id, because == on Pyomo components creates an expression)
+        for _, group in itertools.groupby(items, key=lambda x: id(x[0])):
+            start = len(values)
+            keys = []
+            for component, key, val in group:
+                keys.append(key)
+                values.append(np.nan if val is None else val)
+            table.append((component.name, keys, start, len(values)))
+        is_int = np.array([type(v) is int for v in values], dtype=bool)
+        np.save(os.path.join(solution_dir, array_file), np.array(values, dtype=float))
+        np.save(os.path.join(solution_dir, array_file[:-4] + ".is_int.npy"), is_int)
+        return table
+
+    if not os.path.isdir(solution_dir):
+        os.makedirs(solution_dir)
+
+    index = {"vars": None, "suffixes": {}}
+    index["vars"] = flatten(
+        (
+            (var, key, v.value)
+            for var in instance.component_objects(Var)
+            for key, v in var.items()
+        ),
+        "vars.npy",
+    )
+
+    for suffix in instance.component_objects(Suffix):
+        if not suffix.import_enabled():
+            continue
+        entries = sorted(
+            ((obj.parent_component(), obj.index(), val) for obj, val in suffix.items()),
+            key=lambda x: id(x[0]),
+        )
+        index["suffixes"][suffix.name] = flatten(entries, f"suffix.{suffix.name}.npy")
+
+    # write the index last, so an interrupted save can't look complete
+    with open(os.path.join(solution_dir, "index.pickle"), "wb") as f:
+        pickle.dump(index, f, protocol=-1)
 
-    Note that this pickles a solver results object because the instance itself
-    cannot be pickled -- see
-    https://stackoverflow.com/questions/39941520/pyomo-ipopt-does-not-return-solution
+
+def load_solution(instance, solution_dir):
+    """
+    Load variable values and suffixes saved by save_solution() into
+    instance. Components are matched by name and elements by key; if a
+    component has the same keys in the same order as when it was saved
+    (the usual case when reloading a model built from the same inputs),
+    values are assigned in bulk without looking up each key.
     """
-    # First, save the full solution data to the results object, because recent
-    # versions of Pyomo only store execution metadata there by default.
-    instance.solutions.store_to(instance.last_results)
-    with open(os.path.join(outdir, "results.pickle"), "wb") as fh:
-        pickle.dump(instance.last_results, fh, protocol=-1)
-    # remove the solution from the results object, to minimize long-term memory use
-    instance.last_results.solution.clear()
+    import numpy as np
+
+    with open(os.path.join(solution_dir, "index.pickle"), "rb") as f:
+        index = pickle.load(f)
+    clear_solution_cache(instance)
+
+    def components(table, array_file):
+        # yield (component, keys, values) for each entry in the index table
+        values = np.load(os.path.join(solution_dir, array_file), mmap_mode="r")
+        is_int = np.load(
+            os.path.join(solution_dir, array_file[:-4] + ".is_int.npy"), mmap_mode="r"
+        )
+        for name, keys, start, stop in table:
+            component = instance.find_component(name)
+            if component is None:
+                raise ValueError(
+                    f"Component {name} in saved solution {solution_dir} was "
+                    "not found in the model."
+                )
+            vals = [None if v != v else v for v in values[start:stop].tolist()]
+            for i in np.flatnonzero(is_int[start:stop]):
+                vals[i] = int(vals[i])
+            yield component, keys, vals
+
+    # see Pyomo's ModelSolutions.load_from(), which also skips validation
+    if pyomo.version.version_info[:2] >= (6, 0):
+        no_validation = dict(skip_validation=True)
+    else:
+        no_validation = dict(valid=True)
+    for var, keys, vals in components(index["vars"], "vars.npy"):
+        if keys == list(var.keys()):
+            var_data = var.values()
+        else:
+            var_data = (var[k] for k in keys)
+        for v, val in zip(var_data, vals):
+            v.set_value(val, **no_validation)
+
+    for suffix_name, table in index["suffixes"].items():
+        suffix = getattr(instance, suffix_name, None)
+        if suffix is None:
+            # e.g., reloading a solution with duals without --suffixes dual
+            continue
+        suffix.clear()
+        for component, keys, vals in components(table, f"suffix.{suffix_name}.npy"):
+            for k, val in zip(keys, vals):
+                suffix[component[k]] = val
 
 
 def query_yes_no(question, default="yes"):
@@ -20,7 +20,8 @@ scenarios_to_run() in separate processes to select the next job to run.
 
 from __future__ import print_function, absolute_import
 import sys, os, time
-import argparse, shlex, socket, io, glob, multiprocessing
+import argparse, shlex, socket, io, glob, multiprocessing, csv, json
+import multiprocessing.connection
 from collections import OrderedDict
 
 from .utilities import _ArgumentParser
@@ -49,6 +50,40 @@ parser.add_argument(
 parser.add_argument("--scenario-list", default="scenarios.txt")
 parser.add_argument("--scenario-queue", default="scenario_queue")
 parser.add_argument("--job-id", default=None)
+parser.add_argument(
+    "--jobs",
+    type=int,
+    default=1,
+    help="""
+        Number of scenarios to solve at the same time within this job (default
+        is 1). Scenarios are drawn from the same queue used by other
+        solve-scenarios jobs.
+    """,
+)
+parser.add_argument(
+    "--reuse-model",
+    action="store_true",
+    default=False,
+    help="""
+        Keep each worker's model instance in memory between scenarios. If the
+        next scenario differs only in its --input-aliases (and scenario name
+        and outputs directory), only the aliased files are read again and only
+        the components that depend on them are reconstructed, instead of
+        building a new instance.
+    """,
+)
+parser.add_argument(
+    "--threads-per-job",
+    type=int,
+    default=None,
+    help="""
+        Number of processor threads each scenario may use when running with
+        --jobs > 1 (default is the number of available cores divided by
+        --jobs). This is enforced by pinning each scenario to its own set of
+        cores where the platform allows it and setting OMP_NUM_THREADS and
+        related variables for the solver.
+    """,
+)
 
 # import pdb; pdb.set_trace()
 # get a namespace object with successfully parsed scenario manager arguments
@@ -139,10 +174,36 @@ if job_id is None:
 # But this requires synchronized clocks across workers...
 
 running_scenarios_file = os.path.join(scenario_queue_dir, job_id + "_running.txt")
+# per-scenario wall-clock time and exit status for scenarios run by this job
+scenario_summary_file = os.path.join(scenario_queue_dir, job_id + "_summary.csv")
+
+# per-phase records written by each scenario (see "switch solve
+# --telemetry-file"), and a table combining them for all scenarios run by this
+# job
+telemetry_dir = os.path.join(scenario_queue_dir, job_id + "_telemetry")
+telemetry_table_file = os.path.join(scenario_queue_dir, job_id + "_telemetry.csv")
+telemetry_columns = [
+    "scenario_name",
+    "phase",
+    "module",
+    "time",
+    "wall_time_s",
+    "cpu_time_s",
+    "max_rss_mb",
+    "variables",
+    "constraints",
+    "nonzeros",
+    "solver_status",
+    "termination_condition",
+]
 
-# list of scenarios currently being run by this job (always just one with the current code)
+# list of scenarios currently being run by this job (up to --jobs at once)
 running_scenarios = []
 
+n_jobs = scenario_manager_args.jobs
+if n_jobs < 1:
+    parser.error("--jobs must be 1 or more.")
+
 # import pdb; pdb.set_trace()
 
 
@@ -158,37 +219,130 @@ def main(args=None):
     # previously being solved by this job but were interrupted
     unlock_running_scenarios()
 
-    for (scenario_name, args) in scenarios_to_run():
-        logger.warn(  # not strictly a warning, but often nice to see in the log
-            "\n\n=======================================================================\n"
-            + "running scenario {s}\n".format(s=scenario_name)
-            + "arguments: {}\n".format(args)
-            + "=======================================================================\n"
-        )
+    # Each worker slot gets its own share of the processor cores, so scenarios
+    # solved side by side don't compete for the same threads.
+    core_slots = get_core_slots(n_jobs, scenario_manager_args.threads_per_job)
+    free_slots = list(range(n_jobs))
+    # persistent worker (process, connection) for each slot if using
+    # --reuse-model, started when first needed
+    slot_workers = [None] * n_jobs
+    # object to wait on (process sentinel or worker connection) ->
+    # (process, scenario_name, slot, start time)
+    workers = {}
+
+    scenarios = scenarios_to_run()
+    scenarios_remaining = True
+    while True:
+        # start scenarios until all worker slots are busy or the queue is empty
+        while scenarios_remaining and free_slots:
+            try:
+                scenario_name, args = next(scenarios)
+            except StopIteration:
+                scenarios_remaining = False
+                break
+            slot = free_slots.pop(0)
+            logger.warn(  # not strictly a warning, but often nice to see in the log
+                "\n\n=======================================================================\n"
+                + "running scenario {s}\n".format(s=scenario_name)
+                + "arguments: {}\n".format(args)
+                + "=======================================================================\n"
+            )
+
+            # record the time and memory used for each phase of the scenario;
+            # options given for the scenario take precedence over this one
+            telemetry_file = get_telemetry_file(scenario_name)
+            if os.path.exists(telemetry_file):
+                os.remove(telemetry_file)  # from an earlier run
+            args = ["--telemetry-file", telemetry_file] + args
+
+            # call the standard solve module with the arguments for this particular scenario
+            # We run this in its own process to avoid sharing module state info between
+            # model instances (e.g., a logger created in Pyomo may grab the current sys.stdout
+            # while Switch has temporarily replaced it with a timing counter stream, then
+            # keep using that for subsequent instances)
+            if scenario_manager_args.reuse_model:
+                # send the scenario to a long-lived worker for this slot, which
+                # keeps its model in memory (accepting the risk described above)
+                if slot_workers[slot] is None:
+                    conn, worker_conn = multiprocessing.Pipe()
+                    process = multiprocessing.Process(
+                        target=run_scenarios_in_worker,
+                        args=(worker_conn, core_slots[slot]),
+                    )
+                    process.start()
+                    # close our copy of the worker's end, so we get EOFError
+                    # if the worker exits unexpectedly
+                    worker_conn.close()
+                    slot_workers[slot] = (process, conn)
+                process, conn = slot_workers[slot]
+                conn.send(args)
+                workers[conn] = (process, scenario_name, slot, time.time())
+            else:
+                process = multiprocessing.Process(
+                    target=run_scenario, args=(args, core_slots[slot])
+                )
+                process.start()
+                workers[process.sentinel] = (process, scenario_name, slot, time.time())
+
+            # other options:
+            # solve.main(args)
+            # or
+            # subprocess.call(shlex.split("python -m solve") + args) <- omit args from options.txt
+            # it should also be possible to use a solver server, but that's not really needed
+            # since this script has built-in queue management.
+
+        if not workers:
+            break
+
+        # wait for at least one scenario to finish, then record it and free
+        # its slot for the next scenario
+        for ready in multiprocessing.connection.wait(list(workers)):
+            process, scenario_name, slot, start_time = workers.pop(ready)
+            if scenario_manager_args.reuse_model:
+                try:
+                    exit_status = ready.recv()
+                except EOFError:
+                    # worker ended while solving (e.g., exited after an error)
+                    process.join()
+                    exit_status = process.exitcode
+                    slot_workers[slot] = None
+            else:
+                process.join()
+                exit_status = process.exitcode
+            wall_time = time.time() - start_time
+            mark_completed(scenario_name)
+            record_scenario_summary(scenario_name, start_time, wall_time, exit_status)
+            record_scenario_telemetry(scenario_name)
+            if exit_status != 0:
+                logger.warn(
+                    "Scenario {} ended with exit status {} after {:.2f} s.".format(
+                        scenario_name, exit_status, wall_time
+                    )
+                )
+            else:
+                logger.info(
+                    "Scenario {} completed in {:.2f} s.".format(
+                        scenario_name, wall_time
+                    )
+                )
+            free_slots.append(slot)
+            free_slots.sort()
+
+    # shut down any long-lived workers
+    for worker in slot_workers:
+        if worker is not None:
+            process, conn = worker
+            conn.send(None)
+            process.join()
 
-        # call the standard solve module with the arguments for this particular scenario
-        # We run this in its own process to avoid sharing module state info between
-        # model instances (e.g., a logger created in Pyomo may grab the current sys.stdout
-        # while Switch has temporarily replaced it with a timing counter stream, then
-        # keep using that for subsequent instances)
-        process = multiprocessing.Process(target=run_scenario, args=(args,))
-        process.start()
-        process.join()
-
-        # other options:
-        # solve.main(args)
-        # or
-        # subprocess.call(shlex.split("python -m solve") + args) <- omit args from options.txt
-        # it should also be possible to use a solver server, but that's not really needed
-        # since this script has built-in queue management.
-
-        mark_completed(scenario_name)
-
-def run_scenario(args):
+
+def run_scenario(args, cores=None):
     # reactivate stdin in subprocess
     # from https://stackoverflow.com/questions/30134297/python-multiprocessing-stdin-input
     # also see refs to stdin in https://docs.python.org/3/library/multiprocessing.html
     sys.stdin = os.fdopen(0)
+    if cores is not None:
+        limit_threads(cores)
     try:
         solve.main(args)
     except:
@@ -197,6 +351,125 @@ def run_scenario(args):
         # --debug flag. So we call the excepthook (possibly set by solve.main)
         # directly.
         sys.excepthook(*sys.exc_info())
+        # report the failure to the parent via the exit status
+        sys.exit(1)
+
+
+def run_scenarios_in_worker(conn, cores=None):
+    """
+    Solve each list of scenario arguments received via conn, reusing the
+    model from the previous scenario when possible, and send back an exit
+    status for each one. Stops when None is received.
+    """
+    sys.stdin = os.fdopen(0)
+    if cores is not None:
+        limit_threads(cores)
+    model_cache = {}
+    while True:
+        args = conn.recv()
+        if args is None:
+            break
+        # solve.main() chains to the previous excepthook, so reset it to avoid
+        # stacking up handlers from previous scenarios
+        sys.excepthook = sys.__excepthook__
+        try:
+            solve.main(args, model_cache=model_cache)
+            exit_status = 0
+        except:
+            # see note in run_scenario(); the excepthook may exit this worker
+            # and a new one will be started for the next scenario
+            model_cache.clear()
+            sys.excepthook(*sys.exc_info())
+            exit_status = 1
+        conn.send(exit_status)
+
+
+def get_core_slots(n_jobs, threads_per_job=None):
+    """
+    Divide the cores available to this job into one group per worker slot.
+    Returns a list with one entry per slot, each a list of core IDs, or a list
+    of None's if there is only one slot and no thread limit was requested (so
+    a single scenario can use the whole machine, as before).
+    """
+    if n_jobs == 1 and threads_per_job is None:
+        return [None]
+    try:
+        available = sorted(os.sched_getaffinity(0))
+    except AttributeError:  # not available on this platform (e.g., macOS)
+        available = list(range(multiprocessing.cpu_count()))
+    if threads_per_job is None:
+        threads_per_job = max(1, len(available) // n_jobs)
+    slots = []
+    for i in range(n_jobs):
+        # wrap around if more threads were requested than there are cores
+        slots.append(
+            [
+                available[(i * threads_per_job + j) % len(available)]
+                for j in range(threads_per_job)
+            ]
+        )
+    return slots
+
+
+def limit_threads(cores):
+    """
+    Restrict the current process (and the solver it launches) to the
+    specified cores.
+    """
+    n_threads = str(len(cores))
+    # common thread-count settings for numerical libraries and some solvers
+    for var in ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"]:
+        os.environ[var] = n_threads
+    try:
+        # pin this process and its children to the allotted cores; this works
+        # with any solver, even ones that ignore the environment variables
+        os.sched_setaffinity(0, set(cores))
+    except (AttributeError, OSError):
+        pass  # not available on this platform
+
+
+def record_scenario_summary(scenario_name, start_time, wall_time, exit_status):
+    # append one row per scenario to this job's summary file; the header is
+    # written when the file is first created
+    write_header = not os.path.exists(scenario_summary_file)
+    with open(scenario_summary_file, "a") as f:
+        if write_header:
+            f.write("scenario_name,start_time,wall_time_s,exit_status\n")
+        f.write(
+            "{},{},{:.2f},{}\n".format(
+                scenario_name,
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time)),
+                wall_time,
+                exit_status,
+            )
+        )
+
+
+def get_telemetry_file(scenario_name):
+    return os.path.join(telemetry_dir, scenario_name + ".jsonl")
+
+
+def record_scenario_telemetry(scenario_name):
+    # append the phase records for this scenario (if any) to this job's
+    # telemetry table, one row per phase; the header is written when the file
+    # is first created
+    telemetry_file = get_telemetry_file(scenario_name)
+    if not os.path.exists(telemetry_file):
+        return
+    with open(telemetry_file) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    write_header = not os.path.exists(telemetry_table_file)
+    with open(telemetry_table_file, "a", newline="") as f:
+        w = csv.DictWriter(
+            f, fieldnames=telemetry_columns, extrasaction="ignore", lineterminator="\n"
+        )
+        if write_header:
+            w.writeheader()
+        for r in records:
+            # use the name from the scenario list, which is also used in the
+            # summary file
+            r["scenario_name"] = scenario_name
+            w.writerow(r)
 
 
 def scenarios_to_run():
@@ -7,15 +7,23 @@ Utility functions for Switch.
 from __future__ import print_function, division
 
 import argparse
+import copy
 import datetime
+import hashlib
 import importlib
+import json
+import multiprocessing
+import multiprocessing.connection
 import os
 import re
+import shutil
 import sys
 import logging
 import time
+import tempfile
 import types
 import textwrap
+import tracemalloc
 
 from pyomo.environ import *
 import pyomo.opt, pyomo.version
@@ -32,6 +40,19 @@ try:
 except ImportError:
     UnknownSetDimen = object()  # shouldn't ever match
 
+try:
+    # base class for virtual sets (unions, products, etc.) in Pyomo 5.7+
+    from pyomo.core.base.set import SetOperator
+except ImportError:
+    SetOperator = ()  # isinstance() never matches
+
+try:
+    # token conversion rules used by DataPortal; we reuse them in
+    # load_columnar() so both readers produce identical data
+    from pyomo.dataportal.process_data import _process_token, _num_pattern
+except ImportError:
+    _process_token = None  # load_columnar() will defer to DataPortal.load()
+
 # Define string_types (same as six.string_types). This is useful for
 # distinguishing between strings and other iterables.
 try:
@@ -116,15 +137,7 @@ class SwitchAbstractModel(AbstractModel):
         self.logger = logger
 
         # Define and parse model configuration options
-        argparser = _ArgumentParser(allow_abbrev=False)
-        for module in self.get_modules():
-            if hasattr(module, "define_arguments"):
-                module.define_arguments(argparser)
-        self.options = argparser.parse_args(args)
-
-        # Apply verbose flag to support code that still uses it (newer code should
-        # use model.logger.isEnabledFor(logging.LEVEL)
-        self.options.verbose = self.logger.isEnabledFor(logging.INFO)
+        self.options = self.parse_options(args)
 
         # get a list of modules to iterate through
         self.iterate_modules = switch_model.solve.get_iteration_list(self)
@@ -147,22 +160,50 @@ class SwitchAbstractModel(AbstractModel):
             self.logger.info("\nIteration modules:" + wrap(str(self.iterate_modules)))
         self.logger.info("=" * 80 + "\n")
 
-        # Define model components
+        # Define model components, and note which module declared each one
+        # (used by --profile-construction)
+        self.component_modules = {}
         for module in self.get_modules():
             if hasattr(module, "define_dynamic_lists"):
                 module.define_dynamic_lists(self)
+                self.note_component_modules(module)
         for module in self.get_modules():
             if hasattr(module, "define_components"):
                 module.define_components(self)
+                self.note_component_modules(module)
         for module in self.get_modules():
             if hasattr(module, "define_dynamic_components"):
                 module.define_dynamic_components(self)
+                self.note_component_modules(module)
+
+    def note_component_modules(self, module):
+        """
+        Record module as the source of any components that don't have one yet.
+        """
+        for name in self.component_map():
+            self.component_modules.setdefault(name, module.__name__)
 
     def get_modules(self):
         """Return a list of loaded module objects for this model."""
         for m in self.module_list:
             yield sys.modules[m]
 
+    def parse_options(self, args):
+        """
+        Parse model configuration options from args, using the arguments
+        defined by the modules in this model, and return them as a Namespace.
+        """
+        argparser = _ArgumentParser(allow_abbrev=False)
+        for module in self.get_modules():
+            if hasattr(module, "define_arguments"):
+                module.define_arguments(argparser)
+        options = argparser.parse_args(args)
+
+        # Apply verbose flag to support code that still uses it (newer code should
+        # use model.logger.isEnabledFor(logging.LEVEL)
+        options.verbose = self.logger.isEnabledFor(logging.INFO)
+        return options
+
     def min_data_check(self, *mandatory_components):
         """
         This function checks that an instance of Pyomo abstract model has
@@ -194,12 +235,56 @@ class SwitchAbstractModel(AbstractModel):
             ),
         )
 
-    def _initialize_component(self, *args, **kwargs):
+    def _initialize_component(self, modeldata, namespaces, component_name, *args):
         """
         This method is called to initialize each Pyomo component; we hook onto
-        it to report construction progress
+        it to report construction progress, profile construction if requested
+        (see load_inputs()) and skip constraints that will be assembled
+        directly by switch_model.matrix.build_core_matrix().
         """
-        AbstractModel._initialize_component(self, *args, **kwargs)
+        profile = getattr(self, "construction_profile", None)
+        if profile is not None:
+            tracemalloc.clear_traces()
+            start = time.perf_counter()
+
+        # Constraints are not constructed if switch_model.matrix will assemble
+        # them directly from the input data (decided once for the instance).
+        if self.component(component_name).ctype is Constraint:
+            try:
+                skip = self.constraints_assembled_directly
+            except AttributeError:
+                from switch_model.matrix import can_assemble_directly
+
+                skip = self.constraints_assembled_directly = can_assemble_directly(
+                    self
+                )
+        else:
+            skip = False
+
+        if not skip:
+            AbstractModel._initialize_component(
+                self, modeldata, namespaces, component_name, *args
+            )
+
+        if profile is not None:
+            seconds = time.perf_counter() - start
+            net_memory, peak_memory = tracemalloc.get_traced_memory()
+            component = self.component(component_name)
+            try:
+                elements = len(component)
+            except TypeError:
+                elements = 1
+            profile.append(
+                (
+                    component_name,
+                    component.ctype.__name__,
+                    self.component_modules.get(component_name, "unknown"),
+                    seconds,
+                    elements,
+                    peak_memory,
+                    net_memory,
+                )
+            )
 
         try:
             self.__n_components_constructed = self.__n_components_constructed + 1
@@ -227,32 +312,186 @@ class SwitchAbstractModel(AbstractModel):
         instance. This is implemented by calling the load_inputs() function of
         each module, if the module has that function.
         """
+        timer = StepTimer()
+        data = self.read_inputs(inputs_dir)
+        self.logger.info(f"Data read in {timer.step_time():.2f} s.")
+        record_phase(self, "read_inputs", timer.last_step, timer.last_cpu_step)
+        self.logger.info(f"\nConstructing model instance from data and rules...")
+
+        instance = self.construct_instance(data)
+        if attach_data_portal:
+            instance.DataPortal = data
+
+        timer.step_time()
+        if self.options.verbose:
+            print("Model instance constructed in {:.2f} s.\n".format(timer.last_step))
+        if getattr(self.options, "telemetry_file", None) is not None:
+            instance.model_size = model_size(instance)
+        record_phase(
+            instance, "construct_instance", timer.last_step, timer.last_cpu_step
+        )
+
+        return instance
+
+    def read_inputs(self, inputs_dir=None):
+        """
+        Read input data by calling the load_inputs() function of each module
+        that has one, and return the DataPortal holding the data.
+        """
         if inputs_dir is None:
             inputs_dir = getattr(self.options, "inputs_dir", "inputs")
 
         # Load data; add a fancier load function to the data portal
-        timer = StepTimer()
         data = DataPortal(model=self)
         data.load_aug = types.MethodType(load_aug, data)
+        timer = StepTimer()
         for module in self.get_modules():
             if hasattr(module, "load_inputs"):
                 module.load_inputs(self, data, inputs_dir)
+                timer.step_time()
+                record_phase(
+                    self,
+                    "load_inputs",
+                    timer.last_step,
+                    timer.last_cpu_step,
+                    module=module.__name__,
+                )
+        return data
+
+    def construct_instance(self, data):
+        """
+        Create a model instance from the data returned by read_inputs(),
+        profiling the construction of each component if requested.
+        """
+        profile = getattr(self.options, "profile_construction", False)
+        if profile:
+            # create_instance() clones the model, so the instance gets its own
+            # copy of this list, which _initialize_component() fills in
+            self.construction_profile = []
+            tracemalloc.start()
+        try:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                instance = self.create_instance(data, report_timing=True)
+            else:
+                instance = self.create_instance(data, report_timing=False)
+        finally:
+            if profile:
+                tracemalloc.stop()
+        if profile:
+            write_construction_profile(
+                instance.construction_profile,
+                getattr(self.options, "outputs_dir", "outputs"),
+                self.logger,
+            )
+            del self.construction_profile
+            del instance.construction_profile
+        return instance
 
+    def reload_inputs(self, instance, inputs_dir=None):
+        """
+        Update an instance previously created by load_inputs() to match the
+        input aliases currently in self.options, instead of creating a new
+        instance. Only the components whose data changed, and components that
+        could depend on them, are reconstructed.
+
+        If self.input_load_cache is a dict (set before calling load_inputs()),
+        data from files that were read before and have not changed on disk are
+        taken from the cache, so only the newly aliased files are parsed.
+
+        Pyomo constructs components in the order they were declared, so a
+        component's rule can only see components declared before it. So we
+        reconstruct the components whose data changed and all components
+        declared after the first of them, and keep the rest of the instance
+        as-is. This is most effective when the aliased files feed components
+        declared late in the model (e.g., fuel costs or policies).
+
+        Returns True if the instance was updated, or False if it could not be
+        updated in place (i.e., it was created without attach_data_portal or
+        from a different inputs directory). In that case the instance is
+        unchanged and the caller should use load_inputs() instead.
+        """
+        if inputs_dir is None:
+            inputs_dir = getattr(self.options, "inputs_dir", "inputs")
+        if inputs_dir != getattr(instance.options, "inputs_dir", "inputs"):
+            return False
+        old_data = getattr(instance, "DataPortal", None)
+        if old_data is None:
+            return False
+
+        # Read data the same way as load_inputs(), so any changes the modules
+        # make to the data after reading it are repeated.
+        timer = StepTimer()
+        data = self.read_inputs(inputs_dir)
         self.logger.info(f"Data read in {timer.step_time():.2f} s.")
-        self.logger.info(f"\nConstructing model instance from data and rules...")
 
-        if self.logger.isEnabledFor(logging.DEBUG):
-            instance = self.create_instance(data, report_timing=True)
+        old_values = old_data._data.get(None, {})
+        new_values = data._data.get(None, {})
+        changed = {
+            name
+            for name in set(old_values) | set(new_values)
+            if old_values.get(name) != new_values.get(name)
+        }
+        names = [
+            name for name, c in instance.component_map().items() if c.ctype is not Model
+        ]
+        changed_idx = [names.index(n) for n in changed if n in names]
+
+        if changed_idx:
+            # Clear the changed components and everything declared after them
+            # (in reverse order, so nothing refers to a component that has
+            # already been cleared), then construct them again in order.
+            rebuild = names[min(changed_idx) :]
+            # Drop any lookup tables left behind by component rules (named
+            # <something>_dict by convention), so the rules rebuild them from
+            # the new data instead of using stale or emptied copies.
+            for attr in [a for a in vars(instance) if a.endswith("_dict")]:
+                if not isinstance(getattr(instance, attr), Component):
+                    delattr(instance, attr)
+            # Also drop all construction indexes (see add_construction_helper()).
+            # A partial rebuild builds a whole index but only uses the entries
+            # for the components it rebuilds, so the others would otherwise be
+            # left on the instance and used with stale data by a later reload.
+            delete_construction_helpers(instance)
+            for name in reversed(rebuild):
+                component = instance.component(name)
+                if isinstance(component, SetOperator):
+                    # virtual sets built from other sets (e.g., implicit
+                    # products used to index components); nothing to clear
+                    continue
+                if component.is_indexed():
+                    component.clear()
+                elif isinstance(component, Set):
+                    component.clear()
+                    # remove the scalar set's own entry too, or construct()
+                    # will think its members have already been added
+                    component._data.clear()
+                # other scalar components are reset when they are constructed
+                component._constructed = False
+            skip_constraints = getattr(
+                instance, "constraints_assembled_directly", False
+            )
+            for name in rebuild:
+                component = instance.component(name)
+                if component._constructed or (
+                    skip_constraints and component.ctype is Constraint
+                ):
+                    continue
+                Model._initialize_component(instance, data, [None], name, 0)
+            delete_construction_helpers(instance)
+            self.logger.info(
+                f"Reconstructed {len(rebuild)} of {len(names)} components in "
+                f"{timer.step_time():.2f} s."
+            )
         else:
-            instance = self.create_instance(data, report_timing=False)
-
-        if attach_data_portal:
-            instance.DataPortal = data
-
-        if self.options.verbose:
-            print("Model instance constructed in {:.2f} s.\n".format(timer.step_time()))
+            self.logger.info("No input data changed; model was not reconstructed.")
 
-        return instance
+        # use the new settings and data and forget any previous solution,
+        # which refers to components that may have been replaced
+        instance.DataPortal = data
+        instance.options = copy.deepcopy(self.options)
+        instance.logger = self.logger
+        instance.solutions.clear()
+        return True
 
     def create_instance(*args, **kwargs):
         """
@@ -313,9 +552,177 @@ class SwitchConcreteModel(ConcreteModel):
         if not os.path.exists(outputs_dir):
             os.makedirs(outputs_dir)
 
-        for module in self.get_modules():
-            if hasattr(module, "post_solve"):
-                module.post_solve(self, outputs_dir)
+        modules = [m for m in self.get_modules() if hasattr(m, "post_solve")]
+        jobs = getattr(self.options, "post_solve_jobs", 1)
+        if jobs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+            self.logger.warning(
+                "WARNING: --post-solve-jobs is not supported on this platform; "
+                "running post-solve functions one at a time."
+            )
+            jobs = 1
+        timings = run_post_solve(self, modules, outputs_dir, jobs)
+        for name, t, cpu in timings:
+            record_phase(self, "post_solve", t, cpu, module=name)
+
+        if self.logger.isEnabledFor(logging.INFO):
+            width = max([len(name) for name, t, cpu in timings], default=0)
+            self.logger.info(
+                "Post-solve time by module:\n"
+                + "\n".join(
+                    f"  {name:{width}}  {t:8.2f} s  (CPU {cpu:8.2f} s)"
+                    for name, t, cpu in timings
+                )
+            )
+
+
+def write_construction_profile(profile, outputs_dir, logger):
+    """
+    Write the construction profile gathered by
+    SwitchAbstractModel._initialize_component() to outputs_dir.
+    construction_profile.csv shows the time, number of elements and memory
+    used to construct each component, from slowest to fastest.
+    construction_profile.folded has one line per component in the form
+    "switch_model;generators;core;build;BuildGen <microseconds>", which can be
+    drawn by flamegraph.pl, speedscope, etc. The slowest modules are also
+    reported in the log.
+    """
+    if not os.path.isdir(outputs_dir):
+        os.makedirs(outputs_dir)
+    profile = sorted(profile, key=lambda r: r[3], reverse=True)
+    with open(os.path.join(outputs_dir, "construction_profile.csv"), "w") as f:
+        f.write("component,type,module,seconds,elements,peak_memory_mb,net_memory_mb\n")
+        for name, ctype, module, seconds, elements, peak, net in profile:
+            f.write(
+                f"{name},{ctype},{module},{seconds:.6f},{elements},"
+                f"{peak / 2**20:.3f},{net / 2**20:.3f}\n"
+            )
+    with open(os.path.join(outputs_dir, "construction_profile.folded"), "w") as f:
+        for name, ctype, module, seconds, elements, peak, net in profile:
+            f.write(f"{module.replace('.', ';')};{name} {round(seconds * 1e6)}\n")
+
+    module_times = {}
+    for name, ctype, module, seconds, elements, peak, net in profile:
+        module_times[module] = module_times.get(module, 0) + seconds
+    timings = sorted(module_times.items(), key=lambda x: x[1], reverse=True)
+    width = max([len(name) for name, t in timings], default=0)
+    logger.info(
+        "Construction time by module (see construction_profile.csv):\n"
+        + "\n".join(f"  {name:{width}}  {t:8.2f} s" for name, t in timings)
+    )
+
+
+def run_post_solve(model, modules, outputs_dir, jobs=1):
+    """
+    Call module.post_solve(model, outputs_dir) for each of the modules and
+    return a list of (module name, seconds, CPU seconds) tuples in order of
+    completion. CPU time includes any child processes the module runs.
+
+    If jobs > 1, up to that many post_solve functions run at the same time
+    in forked child processes, each of which gets a copy-on-write snapshot
+    of the solved model (nothing is pickled). Changes these functions make
+    to the model are not seen by the main process or by other modules.
+
+    Modules can control the order with these module-level attributes:
+
+    post_solve_dependencies: list of names of other modules whose
+    post_solve must finish before this module's post_solve starts, e.g.,
+    because it reads their output files. Modules not in the model are
+    ignored.
+
+    post_solve_modifies_model: if True, this module's post_solve changes the
+    model (e.g., re-solves it), so it runs in the main process after all
+    earlier modules' post_solve functions finish and before any later ones
+    start.
+    """
+    if jobs < 1:
+        raise ValueError("Number of post-solve jobs must be at least 1.")
+    names = [m.__name__ for m in modules]
+    deps = dict()
+    for i, module in enumerate(modules):
+        deps[module] = set(getattr(module, "post_solve_dependencies", [])) & set(names)
+        if getattr(module, "post_solve_modifies_model", False):
+            deps[module].update(names[:i])
+        deps[module].update(
+            m.__name__
+            for m in modules[:i]
+            if getattr(m, "post_solve_modifies_model", False)
+        )
+
+    if jobs > 1:
+        context = multiprocessing.get_context("fork")
+    timings = []
+    pending = list(modules)
+    # process sentinel -> (module, process, start time, pipe for CPU time)
+    running = dict()
+    done = set()
+    while pending or running:
+        ready = [m for m in pending if deps[m] <= done]
+        if not ready and not running:
+            raise ValueError(
+                "Unable to run post_solve functions due to circular "
+                "post_solve_dependencies among modules {}.".format(
+                    [m.__name__ for m in pending]
+                )
+            )
+        ran_in_process = False
+        for module in ready:
+            if jobs == 1 or getattr(module, "post_solve_modifies_model", False):
+                if running:
+                    continue  # wait for child processes to finish first
+                start, start_cpu = time.time(), cpu_time()
+                module.post_solve(model, outputs_dir)
+                timings.append(
+                    (module.__name__, time.time() - start, cpu_time() - start_cpu)
+                )
+                done.add(module.__name__)
+                pending.remove(module)
+                ran_in_process = True
+                break  # check which modules are ready now
+            elif len(running) < jobs:
+                # flush buffers so the child doesn't write them again
+                sys.stdout.flush()
+                sys.stderr.flush()
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_post_solve_child,
+                    args=(module, model, outputs_dir, sender),
+                    name=module.__name__,
+                )
+                process.start()
+                sender.close()
+                running[process.sentinel] = (module, process, time.time(), receiver)
+                pending.remove(module)
+        if ran_in_process or not running:
+            continue
+
+        for sentinel in multiprocessing.connection.wait(list(running)):
+            module, process, start, receiver = running.pop(sentinel)
+            process.join()
+            if process.exitcode != 0:
+                for other_module, other_process, *rest in running.values():
+                    other_process.terminate()
+                    other_process.join()
+                raise RuntimeError(
+                    f"post_solve function in module {module.__name__} failed "
+                    f"with exit code {process.exitcode}; see error message above."
+                )
+            with receiver:
+                cpu = receiver.recv()
+            timings.append((module.__name__, time.time() - start, cpu))
+            done.add(module.__name__)
+
+    return timings
+
+
+def _post_solve_child(module, model, outputs_dir, sender):
+    """
+    Run module.post_solve in a forked child process and send the CPU time it
+    used back to the parent. (The CPU times of a forked process start at
+    zero, so cpu_time() gives the time used since the fork.)
+    """
+    module.post_solve(model, outputs_dir)
+    sender.send(cpu_time())
+    sender.close()
 
 
 def create_model(*args, **kwargs):
@@ -323,6 +730,86 @@ def create_model(*args, **kwargs):
     return SwitchAbstractModel(*args, **kwargs)
 
 
+def using_persistent_solver(m):
+    """
+    Return True if model instance m is being solved with a persistent solver
+    interface (--persistent-solver) that already holds a copy of the model.
+    In that case, changes to the model must also be sent to the solver (see
+    rebuild_components()).
+    """
+    return (
+        getattr(m.options, "persistent_solver", False)
+        and getattr(getattr(m, "solver", None), "has_instance", lambda: False)()
+    )
+
+
+def rebuild_components(m, *components):
+    """
+    Rebuild the specified components of model instance m, in order, e.g.,
+    after adding elements to the sets or params they are based on. This
+    replaces the reconstruct() method that was removed in Pyomo 6. Any
+    components that refer to the rebuilt components (e.g., constraints
+    that use rebuilt expressions) must be rebuilt too.
+
+    Variables are extended with any new indexes instead of being rebuilt,
+    so existing variables (and their values) are kept.
+
+    If m is being solved with a persistent solver, the same changes are
+    made in the solver's copy of the model: new variables are added and
+    rebuilt constraints are replaced, without sending the whole model to the
+    solver again. (The objective is sent again before each solve.)
+    """
+    persistent = using_persistent_solver(m)
+    for c in components:
+        if c.ctype is Var:
+            if c.is_indexed():
+                # accessing a missing index creates the variable
+                new_vars = [c[k] for k in c.index_set() if k not in c]
+                if persistent:
+                    for v in new_vars:
+                        m.solver.add_var(v)
+            continue
+        if persistent and c.ctype is Constraint:
+            for con in c.values():
+                if con.active:
+                    m.solver.remove_constraint(con)
+        if c.is_indexed():
+            c.clear()
+        c._constructed = False
+        c.construct()
+        if persistent and c.ctype is Constraint:
+            for con in c.values():
+                if con.active:
+                    m.solver.add_constraint(con)
+
+
+def update_persistent_constraints(m, *components):
+    """
+    Send the current version of all the constraints in the specified
+    components to the persistent solver for model instance m (if any), e.g.,
+    after adding terms to expressions that are used in them.
+    """
+    if using_persistent_solver(m):
+        for c in components:
+            for con in c.values():
+                if con.active:
+                    m.solver.remove_constraint(con)
+                    m.solver.add_constraint(con)
+
+
+def update_persistent_vars(m, expr):
+    """
+    Send the current bounds and fixed status of all the variables in expr to
+    the persistent solver for model instance m (if any), e.g., after fixing or
+    unfixing them between solves.
+    """
+    if using_persistent_solver(m):
+        from pyomo.core.expr.current import identify_variables
+
+        for v in identify_variables(expr, include_fixed=True):
+            m.solver.update_var(v)
+
+
 def unique_list(seq):
     """
     Create a list with the unique elements from seq, preserving original order.
@@ -337,6 +824,281 @@ def unique_list(seq):
     return list(dict.fromkeys(seq))
 
 
+def pop_construction_index(m, index_name, build_index, component, key=None):
+    """
+    Return the members of `component` for index `key` (None for unindexed
+    components) from a shared construction index, for use in Set
+    initialization rules.
+
+    This generalizes the 'construction dictionary' pattern used for
+    GENS_IN_ZONE to several components at once: on the first call,
+    build_index(m) is called to make a single traversal of the model data and
+    return a dict of {component name: {key: members}}, which is stored on m as
+    index_name. Each call pops the entry it uses, and the index is deleted
+    after the last one, so build_index(m) must include every key for every
+    component it covers.
+    """
+    index = getattr(m, index_name, None)
+    if index is None:
+        # components with no entries will never be constructed
+        index = {c: entries for c, entries in build_index(m).items() if entries}
+        setattr(m, index_name, index)
+        add_construction_helper(m, index_name)
+    entries = index[component]
+    result = entries.pop(key)
+    if not entries:
+        del index[component]
+        if not index:
+            delattr(m, index_name)
+    return result
+
+
+def add_construction_helper(m, name):
+    """
+    Record that attribute `name` of m holds data that are only needed while
+    the model is being constructed (e.g., a construction index), so it can
+    be deleted afterwards by switch_model.low_memory.release_construction_data().
+    """
+    helpers = getattr(m, "construction_helpers", None)
+    if helpers is None:
+        helpers = m.construction_helpers = []
+    if name not in helpers:
+        helpers.append(name)
+
+
+def delete_construction_helpers(m):
+    """
+    Delete all the attributes of m registered with add_construction_helper(),
+    and return the number deleted.
+    """
+    names = getattr(m, "construction_helpers", [])
+    deleted = 0
+    for name in names:
+        if hasattr(m, name):
+            delattr(m, name)
+            deleted += 1
+    if hasattr(m, "construction_helpers"):
+        del m.construction_helpers
+    return deleted
+
+
+def max_rss_mb():
+    """
+    Return the peak resident memory used by this process so far, in MB, or
+    None if it is not available (on Windows).
+    """
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on macOS and kilobytes elsewhere
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def cpu_time():
+    """
+    Return the CPU time used so far by this process and any child processes
+    that have finished (e.g., solvers run as separate programs), in seconds.
+    """
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def model_size(m):
+    """Return a dict with the number of variables and constraints in m."""
+    return dict(
+        variables=sum(1 for v in m.component_data_objects(Var)),
+        constraints=sum(1 for c in m.component_data_objects(Constraint, active=True)),
+    )
+
+
+def record_phase(m, phase, wall_time, cpu_time=None, module=None, **fields):
+    """
+    Append a record for one phase of the run to the file specified by
+    --telemetry-file (if any), as one line of JSON. The record shows the
+    scenario name, phase, module (for per-module phases), wall and CPU time,
+    peak memory so far and any other fields given. The model size stored in
+    m.model_size (if any) is included too.
+    """
+    path = getattr(m.options, "telemetry_file", None)
+    if path is None:
+        return
+    record = dict(
+        time=datetime.datetime.now().isoformat(timespec="seconds"),
+        scenario_name=getattr(m.options, "scenario_name", ""),
+        phase=phase,
+        module=module,
+        wall_time_s=wall_time,
+        cpu_time_s=cpu_time,
+        max_rss_mb=max_rss_mb(),
+    )
+    record.update(getattr(m, "model_size", {}))
+    record.update(fields)
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder, exist_ok=True)
+    # write each record with a single call, so records from scenarios solved
+    # at the same time are not mixed together
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def solution_cache(m):
+    """
+    Return a dict stored on m for values calculated from the current
+    solution, e.g., by constraint_duals() and expression_values(). Modules
+    can store their own derived values here too. The dict is emptied by
+    clear_solution_cache() whenever the model is solved or a solution is
+    loaded.
+    """
+    cache = getattr(m, "solution_cache", None)
+    if cache is None:
+        cache = m.solution_cache = {}
+    return cache
+
+
+def clear_solution_cache(m):
+    """Discard values calculated from the previous solution."""
+    if getattr(m, "solution_cache", None):
+        m.solution_cache.clear()
+
+
+def constraint_duals(m, constraint, undiscount=True):
+    """
+    Return the duals of all the elements of `constraint` (an indexed
+    constraint or its name) as a read-only numpy array, in the same order as
+    constraint.index_set(). Elements that were skipped or have no dual (e.g.,
+    if the solver doesn't report duals) are nan.
+
+    If `undiscount` is True (the default), the last element of each index
+    must be a timepoint, and each dual is divided by
+    bring_timepoint_costs_to_base_year for that timepoint. This gives the
+    marginal cost in undiscounted dollars of the base year per unit in that
+    timepoint, e.g., $/MWh for Zone_Energy_Balance.
+
+    The result is cached until the model is solved again (see
+    solution_cache()),
+    so modules can call this as often as needed instead of looking up each
+    element in m.dual.
+    """
+    global np
+    import numpy as np
+
+    if isinstance(constraint, string_types):
+        constraint = getattr(m, constraint)
+    cache = solution_cache(m)
+    key = ("constraint_duals", constraint.name, undiscount)
+    if key not in cache:
+        keys = list(constraint.index_set())
+        duals = getattr(m, "dual", {})
+        values = np.array(
+            [
+                duals.get(constraint[k], np.nan) if k in constraint else np.nan
+                for k in keys
+            ],
+            dtype=float,
+        )
+        if undiscount:
+            costs = m.bring_timepoint_costs_to_base_year
+            values /= np.array(
+                [costs[k[-1] if isinstance(k, tuple) else k] for k in keys],
+                dtype=float,
+            )
+        values.setflags(write=False)
+        cache[key] = values
+    return cache[key]
+
+
+def expression_values(m, expression):
+    """
+    Return the current values of all the elements of `expression` (an
+    indexed Expression or its name) as a numpy array, in the same order as
+    expression.keys(). Elements that divide by zero or use variables with no
+    value are nan.
+
+    The first time this is called for an expression after each solve, the
+    linear representation of each element is compiled into arrays of
+    coefficients and variable numbers. Then all the elements are evaluated
+    at once with numpy, using a vector of variable values that is shared by
+    all expressions. This is much faster than calling value() for each
+    element of large expressions that are built from other expressions
+    (e.g., SystemCostPerPeriod). Elements with nonlinear terms are evaluated
+    with value() instead.
+    """
+    global np
+    import numpy as np
+
+    if isinstance(expression, string_types):
+        expression = getattr(m, expression)
+    cache = solution_cache(m)
+    key = ("compiled_expression", expression.name)
+    if key not in cache:
+        cache[key] = compile_expression(m, expression)
+    rows, cols, coefs, constant, nonlinear = cache[key]
+
+    variables = cache["expression_variables"][0]
+    x = cache.get("solution_vector")
+    if x is None or len(x) < len(variables):
+        x = cache["solution_vector"] = np.array(
+            [np.nan if v.value is None else v.value for v in variables], dtype=float
+        )
+    values = constant + np.bincount(
+        rows, weights=coefs * x[cols], minlength=len(constant)
+    )
+    for i, e in nonlinear:
+        try:
+            values[i] = value(e)
+        except (ZeroDivisionError, ValueError):
+            # division by zero or a variable with no value
+            values[i] = np.nan
+    return values
+
+
+def compile_expression(m, expression):
+    """
+    Return arrays of rows (element positions), columns (variable numbers),
+    coefficients and constant terms for the linear elements of indexed
+    Expression `expression`, and a list of (position, element) for the
+    nonlinear elements, for use by expression_values(). Variables are
+    numbered in the list stored in solution_cache(m)["expression_variables"].
+    """
+    from pyomo.repn import generate_standard_repn
+
+    cache = solution_cache(m)
+    if "expression_variables" not in cache:
+        cache["expression_variables"] = ([], {})
+    variables, columns = cache["expression_variables"]
+
+    rows, cols, coefs = [], [], []
+    constant = np.zeros(len(expression))
+    nonlinear = []
+    for i, e in enumerate(expression.values()):
+        try:
+            repn = generate_standard_repn(e.expr, quadratic=False)
+        except ZeroDivisionError:
+            repn = None
+        if repn is None or repn.nonlinear_expr is not None:
+            nonlinear.append((i, e))
+            continue
+        constant[i] = value(repn.constant)
+        for v, a in zip(repn.linear_vars, repn.linear_coefs):
+            j = columns.get(id(v))
+            if j is None:
+                j = columns[id(v)] = len(variables)
+                variables.append(v)
+            rows.append(i)
+            cols.append(j)
+            coefs.append(value(a))
+    return (
+        np.array(rows, dtype=int),
+        np.array(cols, dtype=int),
+        np.array(coefs, dtype=float),
+        constant,
+        nonlinear,
+    )
+
+
 def make_iterable(item):
     """Return an iterable for the one or more items passed."""
     if isinstance(item, string_types):
@@ -354,11 +1116,15 @@ class StepTimer(object):
     """
     Keep track of elapsed time for steps of a process.
     Use timer = StepTimer() to create a timer, then retrieve elapsed time and/or
-    reset the timer at each step by calling timer.step_time()
+    reset the timer at each step by calling timer.step_time(). The elapsed
+    and CPU time for the last step are also kept in timer.last_step and
+    timer.last_cpu_step (e.g., for record_phase()).
     """
 
     def __init__(self):
         self.start_time = self.last_start = time.time()
+        self.start_cpu = self.last_cpu = cpu_time()
+        self.last_step = self.last_cpu_step = 0.0
 
     def step_time(self):
         """
@@ -366,7 +1132,11 @@ class StepTimer(object):
         """
         last_start = self.last_start
         self.last_start = now = time.time()
-        return now - last_start
+        cpu = cpu_time()
+        self.last_cpu_step = cpu - self.last_cpu
+        self.last_cpu = cpu
+        self.last_step = now - last_start
+        return self.last_step
 
     def total_time(self):
         return time.time() - self.start_time
@@ -799,7 +1569,11 @@ def load_aug(switch_data, optional=False, optional_params=[], **kwargs):
     # All done with cleaning optional bits. Pass the updated arguments
     # into the DataPortal.load() function.
     try:
-        switch_data.load(**kwargs)
+        cache = getattr(switch_data._model, "input_load_cache", None)
+        if cache is None:
+            load_data(switch_data, kwargs)
+        else:
+            load_with_cache(switch_data, cache, kwargs)
     except Exception as e:
         # Pyomo error messages can be very cryptic, so we at least make sure to
         # show which file is being read. Users can use --debug to try to dig a
@@ -828,6 +1602,335 @@ def load_aug(switch_data, optional=False, optional_params=[], **kwargs):
         raise
 
 
+def load_with_cache(switch_data, cache, kwargs):
+    """
+    Call switch_data.load(**kwargs), reusing the data from an earlier call
+    with the same arguments if the file hasn't changed since then. cache is a
+    dict that holds a copy of the data read in each call.
+    """
+    path = kwargs["filename"]
+    cache_key = (
+        os.path.abspath(path),
+        os.path.getmtime(path),
+        tuple(kwargs.get("select", ())),
+        tuple(loaded_component_names(kwargs)),
+    )
+    if cache_key in cache:
+        # use a copy, since modules may edit data after it is read
+        store_loaded_data(switch_data, kwargs, copy.deepcopy(cache[cache_key]))
+    else:
+        loaded = load_data(switch_data, kwargs)
+        cache[cache_key] = copy.deepcopy(loaded)
+
+
+def loaded_component_names(kwargs):
+    """
+    Return the names of the sets and params that will be loaded by calling
+    switch_data.load(**kwargs).
+    """
+    names = []
+    for key in ["set", "index", "param"]:
+        items = kwargs.get(key, [])
+        if not isinstance(items, (list, tuple)):
+            items = [items]
+        names.extend(c if isinstance(c, string_types) else c.name for c in items)
+    return names
+
+
+def store_loaded_data(switch_data, kwargs, loaded):
+    """
+    Add data previously returned by load_data() to switch_data, the same way
+    switch_data.load(**kwargs) would: sets are replaced and params are
+    updated, since several files can contribute values to the same param.
+    """
+    data = switch_data._data.setdefault(None, {})
+    set_names = loaded_component_names(
+        {k: v for k, v in kwargs.items() if k in {"set", "index"}}
+    )
+    for name, value in loaded.items():
+        if name in set_names:
+            data[name] = value
+        else:
+            data.setdefault(name, {}).update(value)
+
+
+def load_data(switch_data, kwargs):
+    """
+    Read one input file into switch_data and return a dict with the data
+    that were added for each component. If --input-cache was specified,
+    the data are taken from the cache if possible (see load_with_disk_cache).
+    """
+    options = getattr(switch_data._model, "options", None)
+    cache_dir = getattr(options, "input_cache", None)
+    if cache_dir is not None:
+        return load_with_disk_cache(switch_data, cache_dir, kwargs)
+    else:
+        return read_input_file(switch_data, kwargs)
+
+
+def read_input_file(switch_data, kwargs):
+    """
+    Read one input file into switch_data and return a dict with the data
+    that were added for each component. This uses load_columnar() if
+    --input-reader pandas was specified and the file has a layout it can
+    handle; otherwise it calls switch_data.load(**kwargs).
+    """
+    # set aside any existing data for these components (e.g., params that
+    # were partly read from another file), so we can see what this file adds
+    data = switch_data._data.setdefault(None, {})
+    names = loaded_component_names(kwargs)
+    prior = {n: data.pop(n) for n in names if n in data}
+
+    options = getattr(switch_data._model, "options", None)
+    if getattr(options, "input_reader", "pyomo") != "pandas" or not load_columnar(
+        switch_data, kwargs
+    ):
+        switch_data.load(**kwargs)
+
+    loaded = {n: data.pop(n) for n in names if n in data}
+    data.update(prior)
+    store_loaded_data(switch_data, kwargs, loaded)
+    return loaded
+
+
+def load_with_disk_cache(switch_data, cache_dir, kwargs):
+    """
+    Read one input file into switch_data, using a binary copy of the parsed
+    data stored in cache_dir (--input-cache) if one is available.
+
+    Cache entries are named by a hash of the file's contents, the arguments
+    used to read it, the --input-aliases mapping and the module list, so
+    they are ignored automatically when any of these change. Each entry is
+    a directory holding the numeric values of each param as a .npy array
+    (read with memory mapping, see read_cache_entry()) and an index.json
+    file with the keys, set members and any non-numeric values. Nothing in
+    the cache is executed when it is read, so a shared cache directory
+    can't be used to run code. Entries are written to a temporary directory
+    that is renamed into place, so parallel runs can share a cache.
+    """
+    model = switch_data._model
+    path = kwargs["filename"]
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(block)
+    key = repr(
+        (
+            file_hash.hexdigest(),
+            os.path.basename(path),
+            tuple(kwargs.get("select", ())),
+            tuple(loaded_component_names(kwargs)),
+            tuple(sorted(getattr(model.options, "input_aliases", []))),
+            tuple(getattr(model, "module_list", [])),
+            pyomo.version.version,
+        )
+    )
+    entry_dir = os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest())
+
+    if os.path.exists(os.path.join(entry_dir, "index.json")):
+        try:
+            loaded = read_cache_entry(entry_dir)
+        except Exception as e:
+            model.logger.warning(
+                f"WARNING: unable to use cached data for {path} ({e}); "
+                "reading the file instead."
+            )
+        else:
+            store_loaded_data(switch_data, kwargs, loaded)
+            model.logger.debug(f"Read cached data for {path} from {entry_dir}.")
+            return loaded
+
+    loaded = read_input_file(switch_data, kwargs)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(dir=cache_dir, suffix=".tmp")
+    try:
+        write_cache_entry(temp_dir, loaded)
+        os.replace(temp_dir, entry_dir)
+    except Exception as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        # another run may have saved the same entry in the meantime
+        if not os.path.exists(os.path.join(entry_dir, "index.json")):
+            model.logger.warning(
+                f"WARNING: unable to save cached data for {path} ({e})."
+            )
+    return loaded
+
+
+def write_cache_entry(entry_dir, loaded):
+    """
+    Save data returned by read_input_file() in entry_dir. Params whose
+    values are all numbers are stored as float arrays in <n>.npy, with a
+    matching <n>.is_int.npy that flags integer values (as in
+    switch_model.solve.save_solution()); everything else is stored in
+    index.json, which is written last.
+    """
+    import numpy as np
+
+    index = []
+    for name, data in loaded.items():
+        keys = list(data.keys())
+        values = list(data.values())
+        entry = {"name": name, "keys": keys}
+        # (type() is used so that bools are not stored as numbers)
+        if values and all(type(v) in {int, float} for v in values):
+            array_file = f"{len(index)}.npy"
+            np.save(os.path.join(entry_dir, array_file), np.array(values, dtype=float))
+            np.save(
+                os.path.join(entry_dir, array_file[:-4] + ".is_int.npy"),
+                np.array([type(v) is int for v in values], dtype=bool),
+            )
+            entry["array"] = array_file
+        else:
+            entry["values"] = values
+        index.append(entry)
+    with open(os.path.join(entry_dir, "index.json"), "w") as f:
+        json.dump(index, f)
+
+
+def read_cache_entry(entry_dir):
+    """
+    Return the data saved in entry_dir by write_cache_entry(), as a dict
+    like the one returned by read_input_file().
+    """
+    import numpy as np
+
+    def to_tuples(x):
+        # JSON stores tuples (multi-dimensional keys and set members) as lists
+        return tuple(to_tuples(i) for i in x) if isinstance(x, list) else x
+
+    with open(os.path.join(entry_dir, "index.json")) as f:
+        index = json.load(f)
+    loaded = {}
+    for entry in index:
+        keys = [to_tuples(k) for k in entry["keys"]]
+        if "array" in entry:
+            array_file = os.path.join(entry_dir, entry["array"])
+            values = np.load(array_file, mmap_mode="r").tolist()
+            is_int = np.load(array_file[:-4] + ".is_int.npy", mmap_mode="r")
+            for i in np.flatnonzero(is_int):
+                values[i] = int(values[i])
+        else:
+            # set data are stored as {None: [members]}
+            values = [
+                [to_tuples(m) for m in v] if isinstance(v, list) else v
+                for v in entry["values"]
+            ]
+        loaded[entry["name"]] = dict(zip(keys, values))
+    return loaded
+
+
+def load_columnar(switch_data, kwargs):
+    """
+    Read a .csv file into switch_data with pandas and store the values
+    directly in the DataPortal, bypassing Pyomo's token-by-token parser.
+    This gives the same data as switch_data.load(**kwargs) for the layouts
+    used by load_aug() (a set, or an optional index set plus parameter
+    columns), but is much faster for large files.
+
+    Returns True if the file was loaded, or False if the arguments or the
+    file contents call for something this reader doesn't handle (e.g., .tab
+    files, explicit formats, empty cells or files with no data rows). In
+    that case nothing is stored and the caller should use
+    switch_data.load() instead, which will also give the usual error
+    messages for malformed files.
+    """
+    import pandas as pd
+
+    path = kwargs["filename"]
+    if _process_token is None or not path.endswith(".csv"):
+        return False
+    if not set(kwargs).issubset({"filename", "select", "param", "index", "set"}):
+        return False
+    if ("set" in kwargs) == ("param" in kwargs) or (
+        "set" in kwargs and "index" in kwargs
+    ):
+        return False
+
+    def name(c):
+        return c if isinstance(c, string_types) else c.local_name
+
+    timer = StepTimer()
+    try:
+        # read everything as text, then convert the same way Pyomo does
+        df = pd.read_csv(
+            path, dtype=str, keep_default_na=False, na_filter=False, engine="c"
+        )
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, ValueError):
+        return False
+    if len(df) == 0 or df.isna().to_numpy().any() or (df.to_numpy() == "").any():
+        return False
+
+    data = switch_data._data.setdefault(None, {})
+    if "set" in kwargs:
+        # Pyomo uses all columns for sets, regardless of select
+        cols = [_parse_tokens(df[c]) for c in df.columns]
+        data[name(kwargs["set"])] = {
+            None: cols[0] if len(cols) == 1 else list(zip(*cols))
+        }
+    else:
+        params = kwargs["param"]
+        if not isinstance(params, (list, tuple)):
+            params = [params]
+        select = kwargs.get("select")
+        if select is None:
+            select = list(df.columns)
+        num_indexes = len(select) - len(params)
+        if len(params) == 0 or num_indexes < 0:
+            return False
+        if num_indexes == 0 and len(df) > 1:
+            return False
+        try:
+            cols = [_parse_tokens(df[str(c)]) for c in select]
+        except KeyError:
+            return False
+        if num_indexes == 0:
+            # scalar params get the first value as-is (including ".")
+            for p, values in zip(params, cols):
+                data.setdefault(name(p), {})[None] = values[0]
+        else:
+            if num_indexes == 1:
+                keys = cols[0]
+            else:
+                keys = list(zip(*cols[:num_indexes]))
+            if "index" in kwargs:
+                data[name(kwargs["index"])] = {None: list(keys)}
+            for p, values in zip(params, cols[num_indexes:]):
+                data.setdefault(name(p), {}).update(
+                    (k, v) for k, v in zip(keys, values) if v != "."
+                )
+
+    switch_data._model.logger.debug(
+        f"Read {len(df)} rows x {len(df.columns)} columns from {path} in "
+        f"{timer.step_time():.3f} s."
+    )
+    return True
+
+
+def _parse_tokens(column):
+    """
+    Convert a pandas Series of strings to a list of Python values, matching
+    the conversion Pyomo's DataPortal applies to each token (int if the
+    text is an integer without a decimal point, float for other numbers,
+    bool for true/false, text otherwise). Each distinct string is only
+    converted once, since index columns usually repeat many times.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(column, sort=False)
+    values = np.empty(len(uniques), dtype=object)
+    values[:] = [_parse_token(t) for t in uniques]
+    return values[codes].tolist()
+
+
+def _parse_token(token):
+    # fast path for numbers, equivalent to pyomo's _process_token()
+    if _num_pattern.match(token):
+        num = float(token)
+        return num if "." in token or not num.is_integer() else int(num)
+    return _process_token(token)
+
+
 # Define an argument parser that accepts the allow_abbrev flag to
 # prevent partial matches, even on versions of Python before 3.5.
 # See https://bugs.python.org/issue14910
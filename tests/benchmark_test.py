@@ -0,0 +1,50 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from testfixtures import compare
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_benchmark_phases(self):
+        from switch_model.benchmark import compare_results, generate_inputs, run_phases
+
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            rows = generate_inputs(
+                os.path.join(temp_dir, "inputs"),
+                zones=4,
+                projects=5,
+                timepoints=48,
+                transmission_density=1,
+            )
+            # all pairs of zones are connected; one battery per zone
+            self.assertEqual(rows["transmission_lines.csv"], 6)
+            self.assertEqual(rows["timepoints.csv"], 2 * 48)
+            self.assertEqual(rows["gen_info.csv"], 4 * 5)
+            results = run_phases(temp_dir, solver="glpk", solve=False)
+            compare(
+                [r["phase"] for r in results],
+                [
+                    "create_model",
+                    "load_inputs",
+                    "construct_instance",
+                    "pre_solve",
+                    "write_problem",
+                ],
+            )
+            self.assertTrue(results[0]["variables"] > 0)
+        finally:
+            shutil.rmtree(temp_dir)
+        old = [dict(scale=1, phase="solve", seconds=1.0, variables=10)]
+        new = [dict(scale=1, phase="solve", seconds=2.0, variables=10)]
+        self.assertEqual(len(compare_results(old, new, tolerance=0.25)), 1)
+        self.assertEqual(compare_results(new, old, tolerance=0.25), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import switch_model.solve
+from testfixtures import compare
+
+
+class BendersTest(unittest.TestCase):
+    def test_benders_decompose(self):
+        from pyomo.environ import Constraint
+        from switch_model.benders import decompose, partition_blocks
+
+        m = switch_model.solve.main(
+            args=[
+                "--inputs-dir",
+                os.path.join(
+                    os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+                ),
+                "--log-level",
+                "error",
+            ],
+            return_instance=True,
+        )
+        x_vars, master_cons, master_cost, blocks = decompose(m)
+        # fuel supply tiers link the timeseries in each period, so there is
+        # one subproblem per period, plus one for the unused supply tiers
+        compare(
+            [(b["y_vars"][0].name, len(b["x"])) for b in blocks],
+            [
+                ("WithdrawFromCentralGrid[North,1]", 44),
+                ("WithdrawFromCentralGrid[North,7]", 80),
+                ("ConsumeFuelTier[All_DistOil,2020,0]", 0),
+            ],
+        )
+        self.assertEqual(
+            {v.parent_component().name for v in x_vars},
+            {"BuildGen", "BuildMinGenCap", "BuildLocalTD", "BuildTx"},
+        )
+        # every variable and constraint is in exactly one part of the model
+        y_vars = [id(v) for b in blocks for v in b["y_vars"]]
+        self.assertEqual(len(y_vars), len(set(y_vars)))
+        self.assertEqual(
+            len(master_cons) + sum(len(b["constraints"]) for b in blocks),
+            len(list(m.component_data_objects(Constraint, active=True))),
+        )
+
+        # subproblems are divided among workers without overlap
+        partitions = partition_blocks(blocks, 2)
+        compare(sorted(k for part in partitions for k in part), [0, 1, 2])
+        self.assertEqual(len(partitions), 2)
+
+    def test_benders_convergence(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+
+        inputs_dir = os.path.join(
+            os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+        )
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            args = [
+                "--inputs-dir",
+                inputs_dir,
+                "--outputs-dir",
+                temp_dir,
+                "--benders",
+                "--matrix-backend",
+                "--log-level",
+                "error",
+            ]
+            with self.assertRaises(ValueError):
+                switch_model.solve.main(args=args + ["--benders-max-iter", "0"])
+            # subproblems are solved by two workers
+            switch_model.solve.main(args=args + ["--benders-jobs", "2"])
+            with open(os.path.join(temp_dir, "total_cost.txt")) as f:
+                total_cost = float(f.read())
+        finally:
+            shutil.rmtree(temp_dir)
+        # optimum found by solving the model directly
+        self.assertAlmostEqual(total_cost / 134733088.43, 1.0, places=7)
+
+
+if __name__ == "__main__":
+    unittest.main()
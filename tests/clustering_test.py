@@ -0,0 +1,76 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from testfixtures import compare
+
+
+class ClusteringTest(unittest.TestCase):
+    def test_cluster_inputs(self):
+        import pandas as pd
+        from types import SimpleNamespace
+        from switch_model.clustering import choose_representatives, cluster_inputs
+
+        inputs_dir = os.path.join(
+            os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+        )
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        options = SimpleNamespace(
+            inputs_dir=inputs_dir,
+            outputs_dir=temp_dir,
+            clustered_inputs_dir=None,
+            cluster_timeseries=1,
+            cluster_hours=24,
+            cluster_method="kmedoids",
+            cluster_extreme_days=["peak_load"],
+        )
+        try:
+            out_dir = cluster_inputs(options, logging.getLogger(__name__))
+            read = lambda d, f: pd.read_csv(os.path.join(d, f))
+            old_ts, new_ts = (read(d, "timeseries.csv") for d in (inputs_dir, out_dir))
+            new_tp = read(out_dir, "timepoints.csv")
+            new_loads = read(out_dir, "loads.csv")
+        finally:
+            shutil.rmtree(temp_dir)
+        # 2020 has three days (two in the winter timeseries), which are
+        # reduced to one representative day plus the peak day
+        self.assertEqual(list(new_ts["ts_period"]), [2020, 2020, 2030])
+        self.assertEqual(list(new_ts["ts_num_tps"]), [2, 2, 1])
+        # total weight of each period is unchanged
+        compare(
+            (new_ts["ts_num_tps"] * new_ts["ts_scale_to_period"])
+            .groupby(new_ts["ts_period"])
+            .sum()
+            .round(6)
+            .to_dict(),
+            (old_ts["ts_num_tps"] * old_ts["ts_scale_to_period"])
+            .groupby(old_ts["ts_period"])
+            .sum()
+            .round(6)
+            .to_dict(),
+        )
+        # timepoint-indexed files only refer to the representative timepoints
+        self.assertEqual(set(new_tp["timeseries"]), set(new_ts["TIMESERIES"]))
+        self.assertEqual(set(new_loads["TIMEPOINT"]), set(new_tp["timepoint_id"]))
+
+        # identical blocks may give fewer clusters than requested; every
+        # cluster has members and the extreme block is numbered last
+        import numpy as np
+
+        x = np.ones((6, 4))
+        x[5] = 5
+        for method in ["kmeans", "kmedoids"]:
+            labels, reps = choose_representatives(x, np.ones(6), 2, method, [5])
+            compare(sorted(set(labels)), list(range(len(reps))))
+            compare((labels[5], reps[-1]), (len(reps) - 1, 5))
+        labels, reps = choose_representatives(np.ones((6, 4)), np.ones(6), 2, "kmeans")
+        compare((list(labels), list(reps)), ([0] * 6, [0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
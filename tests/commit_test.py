@@ -0,0 +1,144 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import switch_model.solve
+from testfixtures import compare
+
+
+class CommitTest(unittest.TestCase):
+    def test_min_up_down_formulations(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        from switch_model.generators.core.commit.operate import circular_window_max
+
+        compare(circular_window_max([3, 1, 2, 0, 1], 2), [3, 3, 2, 2, 1])
+        compare(circular_window_max([3, 1, 2, 0, 1], 3), [3, 3, 3, 2, 2])
+        compare(circular_window_max([3, 1, 2], 5), [3, 3, 3])
+
+        # the cumulative formulation gives the same cost as the window one
+        example_dir = os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "examples",
+            "production_cost_models",
+            "unit_commit",
+        )
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            switch_model.solve.main(
+                args=[
+                    "--inputs-dir",
+                    os.path.join(example_dir, "inputs"),
+                    "--module-list",
+                    os.path.join(example_dir, "inputs", "modules.txt"),
+                    "--outputs-dir",
+                    temp_dir,
+                    "--min-up-down-formulation",
+                    "cumulative",
+                    "--matrix-backend",
+                    "--log-level",
+                    "error",
+                ]
+            )
+            with open(os.path.join(temp_dir, "total_cost.txt")) as f:
+                total_cost = float(f.read())
+        finally:
+            shutil.rmtree(temp_dir)
+        with open(os.path.join(example_dir, "outputs", "total_cost.txt")) as f:
+            expected = float(f.read())
+        self.assertAlmostEqual(total_cost / expected, 1.0, places=7)
+
+    def test_min_up_down_multi_timepoint(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        import csv
+        from switch_model.benchmark import generate_inputs
+
+        # a 24-hour timeseries with thermal plants whose minimum uptimes and
+        # downtimes range from 2 hours to longer than the timeseries, and
+        # whose available capacity varies from hour to hour
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            inputs_dir = os.path.join(temp_dir, "inputs")
+            generate_inputs(inputs_dir, zones=2, projects=4, periods=1, timepoints=24)
+            module_list = os.path.join(inputs_dir, "modules.txt")
+            with open(module_list) as f:
+                modules = f.read().replace(
+                    "switch_model.generators.core.no_commit",
+                    "switch_model.generators.core.commit.operate\n"
+                    "switch_model.generators.core.commit.fuel_use",
+                )
+            with open(module_list, "w") as f:
+                f.write(modules)
+            with open(os.path.join(inputs_dir, "gen_info.csv")) as f:
+                rows = list(csv.reader(f))
+            rows[0] += [
+                "gen_min_load_fraction",
+                "gen_startup_om",
+                "gen_min_uptime",
+                "gen_min_downtime",
+            ]
+            windows = iter([2, 38, 5, 24, 12, 3, 30, 8, 16, 6, 20, 4])
+            thermal = []
+            for row in rows[1:]:
+                if row[1] in ("Gas_CC", "Gas_CT"):
+                    thermal.append(row[0])
+                    row += ["0.4", "50", str(next(windows)), str(next(windows))]
+                else:
+                    row += [".", ".", ".", "."]
+            with open(os.path.join(inputs_dir, "gen_info.csv"), "w") as f:
+                csv.writer(f, lineterminator="\n").writerows(rows)
+            with open(os.path.join(inputs_dir, "timepoints.csv")) as f:
+                timepoints = [row[0] for row in csv.reader(f)][1:]
+            with open(
+                os.path.join(inputs_dir, "gen_timepoint_commit_bounds.csv"), "w"
+            ) as f:
+                f.write("GENERATION_PROJECT,TIMEPOINT,gen_max_commit_fraction\n")
+                for i, g in enumerate(thermal):
+                    for j, t in enumerate(timepoints):
+                        f.write(f"{g},{t},{0.5 if (i + j) % 3 == 0 else 1}\n")
+
+            def total_cost(*extra_args):
+                outputs_dir = os.path.join(temp_dir, "outputs")
+                switch_model.solve.main(
+                    args=[
+                        "--inputs-dir",
+                        inputs_dir,
+                        "--module-list",
+                        module_list,
+                        "--outputs-dir",
+                        outputs_dir,
+                        "--matrix-backend",
+                        "--log-level",
+                        "error",
+                    ]
+                    + list(extra_args)
+                )
+                with open(os.path.join(outputs_dir, "total_cost.txt")) as f:
+                    return float(f.read())
+
+            window_cost = total_cost()
+            cumulative_cost = total_cost("--min-up-down-formulation", "cumulative")
+            # drop the uptime and downtime limits to make sure they matter
+            for row in rows[1:]:
+                row[-2:] = [".", "."]
+            with open(os.path.join(inputs_dir, "gen_info.csv"), "w") as f:
+                csv.writer(f, lineterminator="\n").writerows(rows)
+            unconstrained_cost = total_cost()
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertAlmostEqual(cumulative_cost / window_cost, 1.0, places=9)
+        self.assertGreater(window_cost, unconstrained_cost * (1 + 1e-6))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,308 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import switch_model.solve
+from pyomo.core.expr.current import identify_variables
+from switch_model.benchmark import generate_inputs
+from testfixtures import compare
+
+demand_system = (
+    "switch_model.balancing.demand_response.iterative.constant_elasticity_demand_system"
+)
+
+
+def model_variables(expr):
+    return {v.name for v in identify_variables(expr, include_fixed=True)}
+
+
+def iterative_model(write_inputs, *extra_args):
+    """
+    Call write_inputs(inputs_dir) to create an inputs directory, then return
+    an instance of that model with the iterative demand response module.
+    """
+    temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+    try:
+        inputs_dir = os.path.join(temp_dir, "inputs")
+        write_inputs(inputs_dir)
+        with open(os.path.join(inputs_dir, "modules.txt"), "a") as f:
+            f.write(
+                "switch_model.balancing.demand_response.iterative\n"
+                + demand_system
+                + "\n"
+            )
+        return switch_model.solve.main(
+            args=[
+                "--inputs-dir",
+                inputs_dir,
+                "--dr-demand-module",
+                demand_system,
+                "--log-level",
+                "error",
+            ]
+            + list(extra_args),
+            return_instance=True,
+        )
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def commit_and_reserves_inputs(inputs_dir):
+    """
+    Write new_builds_only with unit commitment and spinning reserves to
+    inputs_dir.
+    """
+    shutil.copytree(
+        os.path.join(
+            os.path.dirname(__file__), "..", "examples", "new_builds_only", "inputs"
+        ),
+        inputs_dir,
+    )
+    with open(os.path.join(inputs_dir, "modules.txt")) as f:
+        modules = f.read().replace(
+            "switch_model.generators.core.no_commit",
+            "switch_model.generators.core.commit.operate",
+        )
+    with open(os.path.join(inputs_dir, "modules.txt"), "w") as f:
+        f.write(
+            modules
+            + "switch_model.balancing.operating_reserves.areas\n"
+            + "switch_model.balancing.operating_reserves.spinning_reserves\n"
+        )
+
+
+class DemandResponseTest(unittest.TestCase):
+    def test_hawaii_add_bids(self):
+        import switch_model.hawaii.demand_response_no_reserves as dr
+
+        m = switch_model.solve.main(
+            args=[
+                "--inputs-dir",
+                os.path.join(
+                    os.path.dirname(__file__),
+                    "..",
+                    "examples",
+                    "new_builds_only",
+                    "inputs",
+                ),
+                "--include-module",
+                "switch_model.hawaii.demand_response_no_reserves",
+                "--include-module",
+                demand_system,
+                "--dr-demand-module",
+                demand_system,
+                "--log-level",
+                "error",
+            ],
+            return_instance=True,
+        )
+        m.iteration_number = 0
+        for bid in [1, 2]:
+            dr.add_bids(
+                m,
+                [
+                    (
+                        z,
+                        ts,
+                        [10.0 * bid] * len(m.TPS_IN_TS[ts]),
+                        [float(bid)] * len(m.TPS_IN_TS[ts]),
+                        100.0 * bid,
+                    )
+                    for z in m.LOAD_ZONES
+                    for ts in m.TIMESERIES
+                ],
+            )
+
+        # the rebuilt components use the variables for both bids
+        compare(
+            sorted(m.DRBidWeight),
+            sorted(
+                (b, z, ts) for b in [1, 2] for z in m.LOAD_ZONES for ts in m.TIMESERIES
+            ),
+        )
+        for z in m.LOAD_ZONES:
+            for ts in m.TIMESERIES:
+                weights = {m.DRBidWeight[b, z, ts].name for b in [1, 2]}
+                self.assertEqual(
+                    model_variables(m.DR_Convex_Bid_Weight[z, ts].body), weights
+                )
+                for tp in m.TPS_IN_TS[ts]:
+                    self.assertTrue(
+                        weights <= model_variables(m.Zone_Energy_Balance[z, tp].body)
+                    )
+        self.assertTrue(
+            {v.name for v in m.DRBidWeight.values()}
+            <= model_variables(m.SystemCost.expr)
+        )
+
+    def test_add_bid_columns(self):
+        import switch_model.balancing.demand_response.iterative as dr
+
+        m = iterative_model(
+            commit_and_reserves_inputs, "--demand-response-reserve-types", "spinning"
+        )
+
+        def add_bid(bid):
+            dr.add_bids(
+                m,
+                [
+                    (
+                        z,
+                        ts,
+                        {
+                            prod: [10.0 * bid] * len(m.TPS_IN_TS[ts])
+                            for prod in m.DR_PRODUCTS
+                        },
+                        {
+                            prod: [float(bid)] * len(m.TPS_IN_TS[ts])
+                            for prod in m.DR_PRODUCTS
+                        },
+                        100.0 * bid,
+                    )
+                    for z in m.LOAD_ZONES
+                    for ts in m.TIMESERIES
+                ],
+            )
+
+        add_bid(1)
+        # keep the model elements for the first bid, which should not be rebuilt
+        components = [
+            m.Zone_Energy_Balance,
+            m.DR_Convex_Bid_Weight,
+            m.DR_Load_Zone_Shared_Bid_Weight,
+            m.FlexibleDemand,
+            m.DR_Welfare_Cost,
+            m.Satisfy_Spinning_Reserve_Up_Requirement,
+            m.SystemCost,
+        ]
+        elements = [dict(c.items()) for c in components]
+        with mock.patch.object(
+            dr, "rebuild_components", side_effect=AssertionError("rebuilt")
+        ):
+            add_bid(2)
+        for c, c_elements in zip(components, elements):
+            for k, e in c_elements.items():
+                self.assertIs(c[k], e)
+
+        # the new columns appear in the existing rows and the objective
+        compare(
+            sorted(m.DRBidWeight),
+            sorted(
+                (b, z, ts) for b in [1, 2] for z in m.LOAD_ZONES for ts in m.TIMESERIES
+            ),
+        )
+        for z in m.LOAD_ZONES:
+            for ts in m.TIMESERIES:
+                weights = {m.DRBidWeight[b, z, ts].name for b in [1, 2]}
+                self.assertEqual(
+                    model_variables(m.DR_Convex_Bid_Weight[z, ts].body), weights
+                )
+                self.assertIn(
+                    m.DRBidWeight[2, z, ts].name,
+                    model_variables(m.DR_Load_Zone_Shared_Bid_Weight[2, z, ts].body),
+                )
+                for tp in m.TPS_IN_TS[ts]:
+                    self.assertTrue(
+                        weights <= model_variables(m.Zone_Energy_Balance[z, tp].body)
+                    )
+        for c in m.Satisfy_Spinning_Reserve_Up_Requirement.values():
+            self.assertTrue(
+                {v.name for v in m.DRBidWeight.values()} <= model_variables(c.body)
+            )
+        self.assertTrue(
+            {v.name for v in m.DRBidWeight.values()}
+            <= model_variables(m.SystemCost.expr)
+        )
+
+    def test_bid_arrays(self):
+        from types import SimpleNamespace
+        import numpy as np
+        import switch_model.balancing.demand_response.iterative as dr
+
+        m = iterative_model(
+            lambda d: generate_inputs(d, zones=2, projects=3, periods=2, timepoints=48),
+            "--demand-response-reserve-types",
+            "none",
+        )
+        dr.calibrate_model(m)
+        keys = [(z, ts) for z in m.LOAD_ZONES for ts in m.TIMESERIES]
+        n_tps = len(m.TPS_IN_TS[keys[0][1]])
+        prices = {
+            prod: np.array(
+                [
+                    [(50.0 + 10 * i + j) * (prod == "energy") for j in range(n_tps)]
+                    for i in range(len(keys))
+                ]
+            )
+            for prod in m.DR_PRODUCTS
+        }
+        demand, wtp = dr.bid_arrays(m, keys, prices)
+        # the batch gives the same bids as calling bid() for each timeseries,
+        # which is also used for demand systems without bid_batch()
+        with mock.patch.object(
+            dr, "demand_module", SimpleNamespace(bid=dr.demand_module.bid)
+        ):
+            single_demand, single_wtp = dr.bid_arrays(m, keys, prices)
+        for i, (z, ts) in enumerate(keys):
+            d, w = dr.demand_module.bid(
+                m, z, ts, {prod: prices[prod][i].tolist() for prod in prices}
+            )
+            for prod in m.DR_PRODUCTS:
+                np.testing.assert_allclose(demand[prod][i], d[prod])
+                np.testing.assert_allclose(single_demand[prod][i], d[prod])
+            self.assertAlmostEqual(wtp[i], w)
+            self.assertAlmostEqual(single_wtp[i], w)
+
+    def test_find_flat_prices(self):
+        import switch_model.balancing.demand_response.iterative as dr
+
+        # a single zone and period uses newton()'s scalar mode
+        for write_inputs in [
+            lambda d: shutil.copytree(
+                os.path.join(
+                    os.path.dirname(__file__),
+                    "..",
+                    "examples",
+                    "new_builds_only",
+                    "inputs",
+                ),
+                d,
+            ),
+            lambda d: generate_inputs(d, zones=2, projects=3, periods=2, timepoints=48),
+        ]:
+            m = iterative_model(write_inputs, "--demand-response-reserve-types", "none")
+            m.iteration_number = 0
+            dr.calibrate_model(m)
+            # marginal costs that vary by zone and hour
+            marginal_costs = {
+                (z, ts): {
+                    prod: [
+                        (100.0 + 20 * j + 30 * k) * (prod == "energy")
+                        for k, tp in enumerate(m.TPS_IN_TS[ts])
+                    ]
+                    for prod in m.DR_PRODUCTS
+                }
+                for j, z in enumerate(m.LOAD_ZONES)
+                for ts in m.TIMESERIES
+            }
+            prices = dr.find_flat_prices(m, marginal_costs, True)
+            compare(sorted(prices), sorted(marginal_costs))
+
+            # the flat price for each zone and period is revenue neutral
+            zone_periods = [(z, p) for z in m.LOAD_ZONES for p in m.PERIODS]
+            for z, p in zone_periods:
+                price = prices[z, m.TS_IN_PERIOD[p].first()]["energy"][0]
+                cost = revenue = 0.0
+                for ts in m.TS_IN_PERIOD[p]:
+                    compare(prices[z, ts]["energy"], [price] * len(m.TPS_IN_TS[ts]))
+                    demand, wtp = dr.demand_module.bid(m, z, ts, prices[z, ts])
+                    weight = m.ts_duration_of_tp[ts] * m.ts_scale_to_year[ts]
+                    for mc, d in zip(marginal_costs[z, ts]["energy"], demand["energy"]):
+                        cost += mc * d * weight
+                        revenue += price * d * weight
+                self.assertAlmostEqual(revenue / cost, 1.0, places=6)
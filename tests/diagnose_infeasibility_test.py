@@ -0,0 +1,79 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import logging
+import os
+import unittest
+
+import switch_model.solve
+from testfixtures import compare
+
+
+class DiagnoseInfeasibilityTest(unittest.TestCase):
+    def test_find_conflict(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        from switch_model.balancing.diagnose_infeasibility import find_conflict
+
+        # the diagnose_infeasibility example has too little capacity to meet
+        # load in one timepoint
+        inputs_dir = os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "examples",
+            "diagnose_infeasibility",
+            "inputs",
+        )
+        m = switch_model.solve.main(
+            args=[
+                "--inputs-dir",
+                inputs_dir,
+                "--module-list",
+                os.path.join(inputs_dir, "modules.txt"),
+                "--exclude-module",
+                "switch_model.balancing.diagnose_infeasibility",
+                "--log-level",
+                "error",
+            ],
+            return_instance=True,
+        )
+        conflict = find_conflict(m)
+        compare(
+            sorted(con.name for con, family, violation in conflict),
+            [
+                "Distributed_Energy_Balance[South,1]",
+                "Enforce_Dispatch_Upper_Limit[S-Central_PV-1,1]",
+                "Enforce_Dispatch_Upper_Limit[S-Geothermal,1]",
+                "Zone_Energy_Balance[South,1]",
+            ],
+        )
+        # ranked by violation in the relaxed model
+        violations = [abs(violation) for con, family, violation in conflict]
+        compare(violations, sorted(violations, reverse=True))
+
+    def test_find_conflict_unequal_slacks(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        from pyomo.environ import ConcreteModel, Constraint, Objective, Var
+        from switch_model.balancing.diagnose_infeasibility import find_conflict
+
+        # a single slack shared by both rows can't relax Con[1] without
+        # pushing x[2] below its lower bound
+        m = ConcreteModel()
+        m.logger = logging.getLogger(__name__)
+        m.x = Var([1, 2], bounds=lambda m, i: (0, 50 * i))
+        m.Con = Constraint([1, 2], rule=lambda m, i: m.x[i] == {1: 100, 2: 10}[i])
+        m.Obj = Objective(expr=m.x[1] + m.x[2])
+        conflict = find_conflict(m)
+        compare(
+            [(con.name, family) for con, family, violation in conflict],
+            [("Con[1]", "Con")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import unittest
+
+import switch_model.solve
+from testfixtures import compare
+
+
+class LowMemoryTest(unittest.TestCase):
+    def test_low_memory(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        from pyomo.environ import Constraint, value
+        from switch_model.low_memory import release_construction_data
+        from switch_model.matrix import solve_matrix
+
+        args = [
+            "--inputs-dir",
+            os.path.join(
+                os.path.dirname(__file__), "..", "examples", "carbon_cap", "inputs"
+            ),
+            "--suffixes",
+            "dual",
+            "--log-level",
+            "error",
+        ]
+        m = switch_model.solve.main(args=args, return_instance=True)
+        solve_matrix(m)
+        expected = [m.dual[c] for c in m.component_data_objects(Constraint)]
+
+        m = switch_model.solve.main(
+            args=args + ["--low-memory", "--free-constraint-bodies"],
+            return_instance=True,
+        )
+        release_construction_data(m)
+        self.assertFalse(hasattr(m, "DataPortal"))
+        solve_matrix(m)
+        constraints = list(m.component_data_objects(Constraint))
+        self.assertFalse(any(c.active for c in constraints))
+        self.assertTrue(all(value(c.body) != value(c.body) for c in constraints))
+        compare([m.dual[c] for c in constraints], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import csv
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import switch_model.solve
+from pyomo.environ import Constraint, SolverFactory, value
+from switch_model.benchmark import generate_inputs
+from testfixtures import compare
+
+
+def example_inputs(example):
+    return lambda d: shutil.copytree(
+        os.path.join(os.path.dirname(__file__), "..", "examples", example, "inputs"), d
+    )
+
+
+def extended_inputs(inputs_dir):
+    """
+    Write synthetic inputs to inputs_dir that also use minimum builds, fixed
+    energy ratios and cycle limits for storage, and a fuel that is not
+    available in one zone and period.
+    """
+    generate_inputs(inputs_dir, zones=3, projects=6, periods=2, timepoints=24)
+
+    def rewrite(file_name, rule):
+        path = os.path.join(inputs_dir, file_name)
+        with open(path) as f:
+            rows = list(csv.DictReader(f))
+        rows = [r for r in map(rule, rows) if r is not None]
+        with open(path, "w") as f:
+            w = csv.DictWriter(f, rows[0].keys(), lineterminator="\n")
+            w.writeheader()
+            w.writerows(rows)
+
+    def gen_info(r):
+        storage = r["gen_tech"] == "Battery"
+        return dict(
+            r,
+            gen_min_build_capacity=50 if r["gen_tech"] == "Gas_CC" else 0,
+            gen_storage_energy_to_power_ratio=(
+                2 if storage and r["gen_load_zone"] == "Z2" else "."
+            ),
+            gen_storage_max_cycles_per_year=0.05 if storage else ".",
+        )
+
+    rewrite("gen_info.csv", gen_info)
+    rewrite(
+        "fuel_cost.csv",
+        lambda r: None
+        if (r["load_zone"], r["fuel"], r["period"]) == ("Z2", "NaturalGas", "2030")
+        else r,
+    )
+
+
+def lp_rows(lp):
+    """
+    Return a dict showing the bounds and the coefficient for each variable
+    name in each row of lp, identified by (constraint name, index). Each row
+    is scaled so its first coefficient is positive.
+    """
+    names = [v.name for v in lp["variables"]]
+    A = lp["A"].tocsr()
+    rows = {}
+    for i, con in enumerate(lp["constraints"]):
+        if not isinstance(con, tuple):
+            con = (con.parent_component().name, con.index())
+        start, end = A.indptr[i], A.indptr[i + 1]
+        coefs = dict(zip([names[j] for j in A.indices[start:end]], A.data[start:end]))
+        bounds = (lp["row_lb"][i], lp["row_ub"][i])
+        if coefs[min(coefs)] < 0:
+            coefs = {k: -a for k, a in coefs.items()}
+            bounds = (-bounds[1], -bounds[0])
+        rows[con] = (bounds, coefs)
+    return rows
+
+
+class MatrixTest(unittest.TestCase):
+    def assertClose(self, a, b):
+        self.assertTrue(math.isclose(a, b, rel_tol=1e-12, abs_tol=1e-9), (a, b))
+
+    def test_direct_assembly(self):
+        from switch_model.matrix import build_matrix
+
+        # Rows assembled directly from the input data should match the ones
+        # built by Pyomo from the constraint rules.
+        for write_inputs in [example_inputs("storage"), extended_inputs]:
+            temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+            try:
+                inputs_dir = os.path.join(temp_dir, "inputs")
+                write_inputs(inputs_dir)
+                instances = [
+                    switch_model.solve.main(
+                        args=["--inputs-dir", inputs_dir, "--log-level", "error"]
+                        + args,
+                        return_instance=True,
+                    )
+                    for args in [["--matrix-backend"], []]
+                ]
+            finally:
+                shutil.rmtree(temp_dir)
+            compare(
+                [m.constraints_assembled_directly for m in instances], [True, False]
+            )
+            direct, expected = [build_matrix(m) for m in instances]
+
+            direct_rows, expected_rows = lp_rows(direct), lp_rows(expected)
+            compare(sorted(direct_rows), sorted(expected_rows))
+            for con, (bounds, coefs) in expected_rows.items():
+                direct_bounds, direct_coefs = direct_rows[con]
+                for a, b in zip(direct_bounds, bounds):
+                    self.assertClose(a, b)
+                compare(sorted(direct_coefs), sorted(coefs))
+                for k, a in coefs.items():
+                    self.assertClose(direct_coefs[k], a)
+
+            cost = {
+                v.name: c for v, c in zip(expected["variables"], expected["c"]) if c
+            }
+            direct_cost = {
+                v.name: c for v, c in zip(direct["variables"], direct["c"]) if c
+            }
+            compare(sorted(direct_cost), sorted(cost))
+            for k, c in cost.items():
+                self.assertClose(direct_cost[k], c)
+            self.assertClose(direct["c0"], expected["c0"])
+            compare(
+                sorted(
+                    v.name
+                    for v, i in zip(direct["variables"], direct["integrality"])
+                    if i
+                ),
+                sorted(
+                    v.name
+                    for v, i in zip(expected["variables"], expected["integrality"])
+                    if i
+                ),
+            )
+
+    def test_matrix_backend(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        solver = next(
+            (s for s in ["cbc", "glpk"] if SolverFactory(s).available(False)), None
+        )
+        if solver is None:
+            self.skipTest("neither cbc nor glpk is available")
+
+        # The matrix backend should find the same objective as solving the
+        # same model via Pyomo's solver interface. Models that only use the
+        # core modules are assembled directly from the input data; the others
+        # (including mixed-integer models) are converted from the constructed
+        # constraints.
+        for write_inputs, direct in [
+            (example_inputs("new_builds_only"), True),
+            (example_inputs("copperplate0"), True),
+            (example_inputs("ccs"), True),
+            (example_inputs("storage"), True),
+            (
+                lambda d: generate_inputs(
+                    d, zones=3, projects=6, periods=2, timepoints=24
+                ),
+                True,
+            ),
+            (extended_inputs, True),
+            (example_inputs("3zone_toy"), False),
+            (example_inputs("discrete_and_min_build"), False),
+        ]:
+            temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+            try:
+                inputs_dir = os.path.join(temp_dir, "inputs")
+                write_inputs(inputs_dir)
+                args = ["--inputs-dir", inputs_dir, "--log-level", "error"]
+                m = switch_model.solve.main(
+                    args=args
+                    + [
+                        "--outputs-dir",
+                        os.path.join(temp_dir, "matrix"),
+                        "--matrix-backend",
+                        "--write-mps",
+                        os.path.join(temp_dir, "model.mps"),
+                    ]
+                )
+                self.assertEqual(m.constraints_assembled_directly, direct)
+                if direct:
+                    # no constraint data were constructed
+                    self.assertFalse(
+                        list(m.component_data_objects(Constraint, active=True))
+                    )
+                self.assertTrue(os.path.getsize(os.path.join(temp_dir, "model.mps")))
+                with open(os.path.join(temp_dir, "matrix", "total_cost.txt")) as f:
+                    total_cost = float(f.read())
+
+                expected = switch_model.solve.main(
+                    args=args
+                    + [
+                        "--outputs-dir",
+                        os.path.join(temp_dir, "pyomo"),
+                        "--solver",
+                        solver,
+                    ]
+                )
+                self.assertFalse(expected.constraints_assembled_directly)
+            finally:
+                shutil.rmtree(temp_dir)
+            self.assertAlmostEqual(
+                total_cost / value(expected.SystemCost), 1.0, places=6
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import switch_model.solve
+
+from testfixtures import compare
+
+
+class RollingHorizonTest(unittest.TestCase):
+    def test_rolling_horizon_windows(self):
+        from switch_model.rolling_horizon import get_windows
+
+        inputs_dir = os.path.join(
+            os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+        )
+        jobs = get_windows(inputs_dir, hours=24, overlap=12)
+        # the 48-hour winter timeseries is split into a chain of two windows,
+        # and the other timeseries are solved independently
+        compare(
+            [[w["name"] for w in job] for job in jobs],
+            [
+                ["0000_2020_01winter_0", "0001_2020_01winter_1"],
+                ["0002_2020_06summer"],
+                ["0003_2030_all"],
+            ],
+        )
+        winter = jobs[0]
+        compare([w["chained"] for w in winter], [False, True])
+        # first window looks ahead one timepoint; second has none left
+        compare(
+            [list(w["timeseries"]["timepoints"].iloc[0]) for w in winter],
+            [["1", "2", "3"], ["3", "4"]],
+        )
+        compare([w["core_tps"] for w in winter], [{"1", "2"}, {"3", "4"}])
+        # each window owns a share of its period, and the shares add up
+        windows = [w for job in jobs for w in job]
+        compare([round(w["share"], 4) for w in windows], [0.25, 0.25, 0.5, 1.0])
+
+    def test_rolling_horizon_solve(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        from switch_model.benchmark import generate_inputs
+        from switch_model.rolling_horizon import build_components
+
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            inputs_dir = os.path.join(temp_dir, "inputs")
+            generate_inputs(inputs_dir, zones=2, projects=5, periods=1, timepoints=24)
+            args = [
+                "--inputs-dir",
+                inputs_dir,
+                "--module-list",
+                os.path.join(inputs_dir, "modules.txt"),
+                "--matrix-backend",
+                "--log-level",
+                "error",
+            ]
+
+            def read(*path):
+                with open(os.path.join(temp_dir, *path)) as f:
+                    return list(csv.DictReader(f))
+
+            rolling_args = [
+                "--rolling-horizon",
+                "16",
+                "--rolling-horizon-overlap",
+                "8",
+            ]
+            # baseload plants must run at the same level for a whole period,
+            # which can't be enforced separately in each window
+            with self.assertRaisesRegex(ValueError, "Enforce_Dispatch_Baseload_Flat"):
+                switch_model.solve.main(
+                    args=args
+                    + ["--outputs-dir", os.path.join(temp_dir, "rolling")]
+                    + rolling_args
+                )
+            gen_info = read("inputs", "gen_info.csv")
+            with open(os.path.join(inputs_dir, "gen_info.csv"), "w") as f:
+                w = csv.DictWriter(f, gen_info[0].keys(), lineterminator="\n")
+                w.writeheader()
+                w.writerows(dict(r, gen_is_baseload=0) for r in gen_info)
+
+            # solve the whole day at once, then fix the capacity it chose, so
+            # the rolling horizon model only makes dispatch decisions
+            m = switch_model.solve.main(
+                args=args + ["--outputs-dir", os.path.join(temp_dir, "monolithic")]
+            )
+            capacity_file = os.path.join(inputs_dir, "rolling_horizon_capacity.csv")
+            with open(capacity_file, "w") as f:
+                w = csv.writer(f, lineterminator="\n")
+                w.writerow(["build_variable", "index_1", "index_2", "rh_capacity"])
+                for name in build_components:
+                    for k, v in getattr(m, name, {}).items():
+                        if v.value is not None and not v.fixed:
+                            w.writerow([name, *k, v.value])
+            # the day is split into two windows with lookahead
+            switch_model.solve.main(
+                args=args
+                + ["--outputs-dir", os.path.join(temp_dir, "rolling")]
+                + rolling_args
+            )
+            costs = [
+                float(open(os.path.join(temp_dir, d, "total_cost.txt")).read())
+                for d in ["monolithic", "rolling"]
+            ]
+            storage = read("rolling", "storage_dispatch.csv")
+            dispatch = read("rolling", "dispatch.csv")
+            annual = read("rolling", "gen_project_annual_summary.csv")
+            # storage_dispatch.csv identifies timepoints by timestamp
+            timepoints = [r["timestamp"] for r in read("inputs", "timepoints.csv")]
+            efficiency = {
+                r["GENERATION_PROJECT"]: float(r["gen_storage_efficiency"])
+                for r in read("inputs", "gen_info.csv")
+                if r["gen_storage_efficiency"] != "."
+            }
+            window_files = os.listdir(
+                os.path.join(
+                    temp_dir, "rolling", "rolling_horizon", "0000_2020_0_0", "outputs"
+                )
+            )
+            rolling_files = os.listdir(os.path.join(temp_dir, "rolling"))
+        finally:
+            shutil.rmtree(temp_dir)
+
+        # the stitched schedule is feasible for the whole day, so it can't cost
+        # less than the monolithic optimum
+        self.assertGreaterEqual(costs[1], costs[0] * (1 - 1e-9))
+        # state of charge is continuous across window boundaries, including
+        # the loop from the end of the day back to the start
+        soc = {(r["generation_project"], r["timepoint"]): r for r in storage}
+        self.assertTrue(any(float(r["StateOfCharge"]) > 1 for r in storage))
+        for g in efficiency:
+            for prev, t in zip(timepoints[-1:] + timepoints[:-1], timepoints):
+                r = soc[g, t]
+                self.assertAlmostEqual(
+                    float(r["StateOfCharge"]),
+                    float(soc[g, prev]["StateOfCharge"])
+                    + float(r["ChargeMW"]) * efficiency[g]
+                    - float(r["DischargeMW"]),
+                    delta=1e-3,  # storage_dispatch.csv is rounded
+                )
+        # annual summaries are calculated from the stitched schedule
+        energy = {}
+        for r in dispatch:
+            energy[r["generation_project"]] = energy.get(
+                r["generation_project"], 0
+            ) + float(r["Energy_GWh_typical_yr"])
+        self.assertTrue(any(v > 0 for v in energy.values()))
+        for r in annual:
+            self.assertAlmostEqual(
+                float(r["Energy_GWh_typical_yr"]),
+                energy[r["generation_project"]],
+                places=6,
+            )
+        # all the outputs are written for the full model, including annual
+        # summaries
+        compare(
+            [f for f in window_files if f not in rolling_files and f.endswith(".csv")],
+            [],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# Copyright 2015 The Switch Authors. All rights reserved.
+# Licensed under the Apache License, Version 2, which is in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from testfixtures import compare
+
+
+class ScenarioDataTest(unittest.TestCase):
+    def test_scenario_data_queries(self):
+        import sqlite3
+        import switch_model.hawaii.scenario_data as scenario_data
+
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        db_file = os.path.join(temp_dir, "switch.db")
+        with sqlite3.connect(db_file) as con:
+            con.execute("CREATE TABLE loads (year, zone, load_mw)")
+            con.executemany(
+                "INSERT INTO loads VALUES (?, ?, ?)",
+                [
+                    (2020, "Oahu", 1000.5),
+                    (2030, "Oahu", None),
+                    (2030, "Maui, Lanai", 3),
+                ],
+            )
+        executed = []
+
+        def connect():
+            con = sqlite3.connect(db_file, check_same_thread=False)
+            con.set_trace_callback(executed.append)
+            return con
+
+        def get_queries(args):
+            queries = []
+            scenario_data.add_query(
+                queries,
+                "loads.csv",
+                "SELECT zone, load_mw FROM loads WHERE year = :year",
+                args,
+            )
+            for table in ["zones.csv", "zones_copy.csv"]:
+                scenario_data.add_query(
+                    queries, table, "SELECT DISTINCT zone FROM loads", args
+                )
+            return queries
+
+        saved = scenario_data.connection_factory, scenario_data.get_queries
+        scenario_data.connection_factory = connect
+        scenario_data.get_queries = get_queries
+        try:
+            args = dict(
+                inputs_dir=os.path.join(temp_dir, "inputs"),
+                query_cache_dir=os.path.join(temp_dir, "cache"),
+                year=2020,
+            )
+            for repeat in range(2):
+                del executed[:]
+                scenario_data.write_tables(args, alt_args=[dict(tag="alt", year=2030)])
+                # each distinct query runs once, and not at all once cached
+                compare(len(executed), 0 if repeat else 3)
+            files = {}
+            for file in ["loads.csv", "loads.alt.csv", "zones_copy.csv"]:
+                with open(os.path.join(args["inputs_dir"], file)) as f:
+                    files[file] = f.read()
+        finally:
+            scenario_data.connection_factory, scenario_data.get_queries = saved
+            scenario_data.con = None
+            shutil.rmtree(temp_dir)
+        compare(
+            files,
+            {
+                "loads.csv": "zone,load_mw\nOahu,1000.5\n",
+                "loads.alt.csv": 'zone,load_mw\nOahu,.\n"Maui, Lanai",3\n',
+                "zones_copy.csv": 'zone\nOahu\n"Maui, Lanai"\n',
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@ import os
 import shutil
 import tempfile
 import unittest
+from unittest import mock
 
 import switch_model.utilities as utilities
 import switch_model.solve
@@ -76,6 +77,652 @@ class UtilitiesTest(unittest.TestCase):
         finally:
             shutil.rmtree(temp_dir)
 
+    def test_reload_inputs(self):
+        from pyomo.environ import Constraint
+        from pyomo.repn import generate_standard_repn
+
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            inputs_dir = os.path.join(temp_dir, "inputs")
+            shutil.copytree(
+                os.path.join(
+                    os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+                ),
+                inputs_dir,
+            )
+            # make an alternative fuel supply curve file with higher costs
+            with open(os.path.join(inputs_dir, "fuel_supply_curves.csv")) as f:
+                rows = [r.split(",") for r in f.read().splitlines()]
+            cost_col = rows[0].index("unit_cost")
+            for r in rows[1:]:
+                r[cost_col] = str(float(r[cost_col]) * 2)
+            with open(
+                os.path.join(inputs_dir, "fuel_supply_curves.high.csv"), "w"
+            ) as f:
+                f.write("\n".join(",".join(r) for r in rows) + "\n")
+
+            args = ["--inputs-dir", inputs_dir, "--log-level", "error"]
+            alias_args = args + [
+                "--input-alias",
+                "fuel_supply_curves.csv=fuel_supply_curves.high.csv",
+            ]
+            (model, instance) = switch_model.solve.main(
+                args=args, return_model=True, return_instance=True
+            )
+            model.options = model.parse_options(alias_args)
+            self.assertTrue(model.reload_inputs(instance))
+            fresh_instance = switch_model.solve.main(
+                args=alias_args, return_instance=True
+            )
+
+            def linear_coefs(m):
+                # coefficients of the objective and every constraint
+                exprs = [("SystemCost", m.SystemCost.expr)] + [
+                    (c.name, c.body)
+                    for c in m.component_data_objects(Constraint, active=True)
+                ]
+                coefs = {}
+                for name, expr in exprs:
+                    repn = generate_standard_repn(expr)
+                    for v, coef in zip(repn.linear_vars, repn.linear_coefs):
+                        coefs[name, v.name] = coef
+                return coefs
+
+            compare(linear_coefs(instance), linear_coefs(fresh_instance))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_reload_construction_helpers(self):
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            inputs_dir = os.path.join(temp_dir, "inputs")
+            shutil.copytree(
+                os.path.join(
+                    os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+                ),
+                inputs_dir,
+            )
+            # alternative existing capacity, which is read before the sets
+            # built from gen_build_period_index()
+            with open(os.path.join(inputs_dir, "gen_build_predetermined.csv")) as f:
+                rows = [r.split(",") for r in f.read().splitlines()]
+            for r in rows[1:]:
+                r[2] = str(float(r[2]) * 2)
+            with open(
+                os.path.join(inputs_dir, "gen_build_predetermined.high.csv"), "w"
+            ) as f:
+                f.write("\n".join(",".join(r) for r in rows) + "\n")
+
+            args = ["--inputs-dir", inputs_dir, "--log-level", "error"]
+            alias_args = args + [
+                "--input-alias",
+                "gen_build_predetermined.csv=gen_build_predetermined.high.csv",
+            ]
+            (model, instance) = switch_model.solve.main(
+                args=args, return_model=True, return_instance=True
+            )
+            # an entry left behind by an earlier partial rebuild, which was
+            # built from that scenario's data
+            instance.gen_build_period_index = {
+                "GEN_PERIODS": {None: [("N-Coal_ST", 2020)]}
+            }
+            utilities.add_construction_helper(instance, "gen_build_period_index")
+            model.options = model.parse_options(alias_args)
+            self.assertTrue(model.reload_inputs(instance))
+            fresh_instance = switch_model.solve.main(
+                args=alias_args, return_instance=True
+            )
+            compare(list(instance.GEN_PERIODS), list(fresh_instance.GEN_PERIODS))
+            compare(
+                dict(instance.build_gen_predetermined),
+                dict(fresh_instance.build_gen_predetermined),
+            )
+            self.assertFalse(hasattr(instance, "gen_build_period_index"))
+            self.assertFalse(hasattr(instance, "construction_helpers"))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_input_reader(self):
+        # the pandas reader should give exactly the same data as the DataPortal
+        inputs_dir = os.path.join(
+            os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+        )
+        data = {}
+        for reader in ["pyomo", "pandas"]:
+            model = switch_model.solve.main(
+                args=[
+                    "--inputs-dir",
+                    inputs_dir,
+                    "--log-level",
+                    "error",
+                    "--input-reader",
+                    reader,
+                ],
+                return_model=True,
+            )
+            data[reader] = model.load_inputs().DataPortal.data()
+        compare(data["pyomo"], data["pandas"])
+
+    def test_input_cache(self):
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            inputs_dir = os.path.join(temp_dir, "inputs")
+            cache_dir = os.path.join(temp_dir, "cache")
+            shutil.copytree(
+                os.path.join(
+                    os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+                ),
+                inputs_dir,
+            )
+
+            def read_data(*extra_args):
+                model = switch_model.solve.main(
+                    args=["--inputs-dir", inputs_dir, "--log-level", "error"]
+                    + list(extra_args),
+                    return_model=True,
+                )
+                return model.load_inputs().DataPortal.data()
+
+            uncached = read_data()
+            compare(uncached, read_data("--input-cache", cache_dir))
+            self.assertTrue(len(os.listdir(cache_dir)) > 0)
+            # entries hold numeric arrays and a JSON index, not pickles
+            cached_files = {
+                f
+                for d in os.listdir(cache_dir)
+                for f in os.listdir(os.path.join(cache_dir, d))
+            }
+            self.assertIn("index.json", cached_files)
+            self.assertIn("0.npy", cached_files)
+            compare([f for f in cached_files if f.endswith(".pickle")], [])
+            # second run reads from the cache
+            compare(uncached, read_data("--input-cache", cache_dir))
+
+            # changing a file should invalidate its cache entry
+            with open(os.path.join(inputs_dir, "loads.csv")) as f:
+                rows = f.read().splitlines()
+            rows[1] = ",".join(rows[1].split(",")[:-1] + ["1234.5"])
+            with open(os.path.join(inputs_dir, "loads.csv"), "w") as f:
+                f.write("\n".join(rows) + "\n")
+            compare(read_data(), read_data("--input-cache", cache_dir))
+            cached = read_data("--input-cache", cache_dir)
+            self.assertIn(1234.5, cached["zone_demand_mw"].values())
+
+            # a failed write should not leave partial files in the cache
+            failed_dir = os.path.join(temp_dir, "failed_cache")
+            with mock.patch.object(
+                utilities.json, "dump", side_effect=OSError("disk full")
+            ):
+                compare(read_data(), read_data("--input-cache", failed_dir))
+            compare(os.listdir(failed_dir), [])
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_profile_construction(self):
+        inputs_dir = os.path.join(
+            os.path.dirname(__file__), "..", "examples", "3zone_toy", "inputs"
+        )
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            instance = switch_model.solve.main(
+                args=[
+                    "--inputs-dir",
+                    inputs_dir,
+                    "--outputs-dir",
+                    temp_dir,
+                    "--log-level",
+                    "error",
+                    "--profile-construction",
+                ],
+                return_instance=True,
+            )
+            with open(os.path.join(temp_dir, "construction_profile.csv")) as f:
+                rows = [r.split(",") for r in f.read().splitlines()]
+            with open(os.path.join(temp_dir, "construction_profile.folded")) as f:
+                stacks = f.read().splitlines()
+            components = {r[0]: r for r in rows[1:]}
+            # one row for every component, attributed to its module
+            self.assertEqual(len(components), len(instance.component_map()))
+            compare(
+                components["BuildGen"][1:3],
+                ["Var", "switch_model.generators.core.build"],
+            )
+            self.assertEqual(components["BuildGen"][4], str(len(instance.BuildGen)))
+            seconds = [float(r[3]) for r in rows[1:]]
+            self.assertEqual(seconds, sorted(seconds, reverse=True))
+            self.assertIn(
+                "switch_model;generators;core;build;BuildGen "
+                + str(round(float(components["BuildGen"][3]) * 1e6)),
+                stacks,
+            )
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_save_generic_results(self):
+        from types import SimpleNamespace
+        from pyomo.environ import ConcreteModel, Set, Var
+        from switch_model.reporting import save_generic_results
+
+        m = ConcreteModel()
+        m.A = Set(dimen=2, initialize=[("b", 2020), ("a", 2030)])
+        m.x = Var(m.A, initialize={("b", 2020): 1.5, ("a", 2030): 2})
+        m.y = Var(initialize=3.25)
+        m.z = Var(m.A)  # never assigned a value
+        m.options = SimpleNamespace(save_expressions=[])
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            save_generic_results(m, temp_dir, sorted_output=True)
+            with open(os.path.join(temp_dir, "x.csv")) as f:
+                compare(f.read(), "A_1,A_2,x\na,2030,2\nb,2020,1.5\n")
+            with open(os.path.join(temp_dir, "y.csv")) as f:
+                compare(f.read(), "y\n3.25\n")
+            with open(os.path.join(temp_dir, "z.csv")) as f:
+                compare(f.read(), "A_1,A_2,z\na,2030,\nb,2020,\n")
+            try:
+                import pandas as pd, pyarrow
+            except ImportError:
+                pass  # parquet output not available
+            else:
+                save_generic_results(m, temp_dir, False, output_format="parquet")
+                df = pd.read_parquet(os.path.join(temp_dir, "x.parquet"))
+                compare(
+                    df.to_dict("list"),
+                    {"A_1": ["b", "a"], "A_2": [2020, 2030], "x": [1.5, 2.0]},
+                )
+                compare(str(df["A_2"].dtype), "int64")
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_run_post_solve(self):
+        from types import ModuleType, SimpleNamespace
+
+        def make_module(name, post_solve, **attrs):
+            module = ModuleType(name)
+            module.post_solve = post_solve
+            module.__dict__.update(attrs)
+            return module
+
+        def write(name, text):
+            def post_solve(m, outdir):
+                with open(os.path.join(outdir, name), "w") as f:
+                    f.write(text(m, outdir))
+
+            return post_solve
+
+        def modify(m, outdir):
+            m.smoothed = True
+
+        modules = [
+            # reads b.txt, so must run after b
+            make_module(
+                "a",
+                write("a.txt", lambda m, d: open(os.path.join(d, "b.txt")).read()),
+                post_solve_dependencies=["b", "not_in_model"],
+            ),
+            make_module("b", write("b.txt", lambda m, d: "b")),
+            make_module("c", modify, post_solve_modifies_model=True),
+            make_module("d", write("d.txt", lambda m, d: str(m.smoothed))),
+        ]
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            for jobs in [1, 3]:
+                model = SimpleNamespace(smoothed=False)
+                timings = utilities.run_post_solve(model, modules, temp_dir, jobs)
+                compare(sorted(name for name, t, cpu in timings), ["a", "b", "c", "d"])
+                self.assertTrue(all(cpu >= 0 for name, t, cpu in timings))
+                self.assertTrue(model.smoothed)
+                for name, text in [("a.txt", "b"), ("d.txt", "True")]:
+                    with open(os.path.join(temp_dir, name)) as f:
+                        compare(f.read(), text)
+                for name in os.listdir(temp_dir):
+                    os.remove(os.path.join(temp_dir, name))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_rebuild_components(self):
+        from types import SimpleNamespace
+        from pyomo.environ import (
+            ConcreteModel,
+            Constraint,
+            Expression,
+            Param,
+            Set,
+            Var,
+            value,
+        )
+
+        m = ConcreteModel()
+        m.options = SimpleNamespace(persistent_solver=False)
+        m.BIDS = Set(initialize=[1], ordered=True)
+        m.bid = Param(m.BIDS, initialize={1: 2.0}, mutable=True)
+        m.Weight = Var(m.BIDS, initialize=1.0)
+        m.Total = Expression(rule=lambda m: sum(m.bid[b] * m.Weight[b] for b in m.BIDS))
+        m.Limit = Constraint(rule=lambda m: m.Total <= 10)
+        m.BIDS.add(2)
+        m.bid[2] = 3.0
+        utilities.rebuild_components(m, m.Weight, m.Total, m.Limit)
+        m.Weight[2].value = 1.0
+        self.assertEqual(value(m.Total), 5.0)
+        self.assertEqual(value(m.Limit.body), 5.0)
+
+    def test_persistent_solver(self):
+        from types import SimpleNamespace
+        from pyomo.environ import (
+            ConcreteModel,
+            Constraint,
+            Expression,
+            NonNegativeReals,
+            Objective,
+            Param,
+            Set,
+            SolverFactory,
+            Var,
+            value,
+        )
+
+        solvers = [
+            s + "_persistent"
+            for s in ["gurobi", "cplex", "xpress", "mosek"]
+            if SolverFactory(s + "_persistent").available(exception_flag=False)
+        ]
+        if not solvers:
+            self.skipTest("no persistent solver interface is available")
+
+        # choose a convex combination of bids with the lowest cost
+        m = ConcreteModel()
+        m.options = SimpleNamespace(persistent_solver=True)
+        m.BIDS = Set(initialize=[1], ordered=True)
+        m.bid = Param(m.BIDS, initialize={1: 2.0}, mutable=True)
+        m.Weight = Var(m.BIDS, within=NonNegativeReals)
+        m.Convex = Constraint(rule=lambda m: sum(m.Weight[b] for b in m.BIDS) == 1)
+        m.Cost = Expression(rule=lambda m: sum(m.bid[b] * m.Weight[b] for b in m.BIDS))
+        m.Minimize_Cost = Objective(rule=lambda m: m.Cost)
+        m.solver = SolverFactory(solvers[0])
+        m.solver.set_instance(m)
+        m.solver.solve()
+        self.assertAlmostEqual(value(m.Minimize_Cost), 2.0)
+        self.assertTrue(utilities.using_persistent_solver(m))
+
+        # rebuilding sends the new variable and the new constraint to the solver
+        m.BIDS.add(2)
+        m.bid[2] = 1.0
+        utilities.rebuild_components(m, m.Weight, m.Convex, m.Cost, m.Minimize_Cost)
+        m.solver.set_objective(m.Minimize_Cost)
+        m.solver.solve()
+        self.assertAlmostEqual(value(m.Minimize_Cost), 1.0)
+        self.assertAlmostEqual(value(m.Weight[2]), 1.0)
+
+        # or a column can be added to the existing constraint and expression
+        m.BIDS.add(3)
+        m.bid[3] = 0.5
+        m.solver.add_var(m.Weight[3])
+        m.Convex.set_value(m.Convex.body + m.Weight[3] == 1)
+        m.Cost.expr += m.bid[3] * m.Weight[3]
+        utilities.update_persistent_constraints(m, m.Convex)
+        m.solver.set_objective(m.Minimize_Cost)
+        m.solver.solve()
+        self.assertAlmostEqual(value(m.Minimize_Cost), 0.5)
+        self.assertAlmostEqual(value(m.Weight[3]), 1.0)
+
+    def test_gen_build_period_index(self):
+        from types import SimpleNamespace
+        from unittest import mock
+        import switch_model.generators.core.build as build
+
+        def make_model(n_gens):
+            periods = [2020, 2030, 2040]
+            gens = ["g{}".format(i) for i in range(n_gens)]
+            return SimpleNamespace(
+                PERIODS=periods,
+                GENERATION_PROJECTS=gens,
+                # one existing plant and new builds in each period for each project
+                GEN_BLD_YRS=[(g, 2000 + i % 20) for i, g in enumerate(gens)]
+                + [(g, p) for g in gens for p in periods],
+                period_start={p: p for p in periods},
+                gen_max_age={g: 10 + 5 * (i % 6) for i, g in enumerate(gens)},
+            )
+
+        # compare to the direct definitions of these sets
+        m = make_model(20)
+        index = build.gen_build_period_index(m)
+        can_operate = build.gen_build_can_operate_in_period
+        for g, b in m.GEN_BLD_YRS:
+            self.assertEqual(
+                index["PERIODS_FOR_GEN_BLD_YR"][g, b],
+                [p for p in m.PERIODS if can_operate(m, g, b, p)],
+            )
+        for g in m.GENERATION_PROJECTS:
+            for p in m.PERIODS:
+                self.assertEqual(
+                    index["BLD_YRS_FOR_GEN_PERIOD"][g, p],
+                    [
+                        b
+                        for (_g, b) in m.GEN_BLD_YRS
+                        if _g == g and can_operate(m, g, b, p)
+                    ],
+                )
+        self.assertEqual(
+            index["GEN_PERIODS"][None],
+            [
+                (g, p)
+                for g in m.GENERATION_PROJECTS
+                for p in m.PERIODS
+                if index["BLD_YRS_FOR_GEN_PERIOD"][g, p]
+            ],
+        )
+
+        # construction work should grow linearly with the number of projects
+        calls = []
+        for n_gens in [100, 400]:
+            m = make_model(n_gens)
+            with mock.patch.object(
+                build, "gen_build_can_operate_in_period", wraps=can_operate
+            ) as check:
+                build.gen_build_period_index(m)
+            calls.append(check.call_count)
+            self.assertEqual(check.call_count, len(m.GEN_BLD_YRS) * len(m.PERIODS))
+        self.assertEqual(calls[1], 4 * calls[0])
+
+        # the index is discarded after its last entry is used
+        m = make_model(2)
+        keys = {
+            c: list(entries) for c, entries in build.gen_build_period_index(m).items()
+        }
+        for c, c_keys in keys.items():
+            for k in c_keys:
+                utilities.pop_construction_index(
+                    m, "gen_build_period_index", build.gen_build_period_index, c, k
+                )
+        self.assertFalse(hasattr(m, "gen_build_period_index"))
+
+    def test_gens_in_zone_tp_index(self):
+        from types import SimpleNamespace
+        from switch_model.generators.core.dispatch import gens_in_zone_tp_index
+
+        tps = {"2020": ["t1", "t2"], "2030": ["t3", "t4"]}
+        active = {"a": ["2020"], "b": ["2020", "2030"], "c": ["2030"], "d": []}
+        zones = {"a": "z1", "b": "z2", "c": "z1", "d": "z1"}
+        m = SimpleNamespace(
+            LOAD_ZONES=["z1", "z2"],
+            TIMEPOINTS=[t for p in tps for t in tps[p]],
+            GEN_TPS=[(g, t) for g in active for p in active[g] for t in tps[p]],
+            gen_load_zone=zones,
+        )
+        index = gens_in_zone_tp_index(m)["GENS_IN_ZONE_TP"]
+        # same as scanning all the projects in each zone for every timepoint
+        for z in m.LOAD_ZONES:
+            for t in m.TIMEPOINTS:
+                self.assertEqual(
+                    index[z, t],
+                    [g for g in zones if zones[g] == z and (g, t) in m.GEN_TPS],
+                )
+        self.assertEqual(index["z1", "t1"], ["a"])
+        self.assertEqual(index["z1", "t3"], ["c"])
+
+    def test_constraint_duals(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        from switch_model.matrix import solve_matrix
+
+        m = switch_model.solve.main(
+            args=[
+                "--inputs-dir",
+                os.path.join(
+                    os.path.dirname(__file__), "..", "examples", "carbon_cap", "inputs"
+                ),
+                "--suffixes",
+                "dual",
+                "--log-level",
+                "error",
+            ],
+            return_instance=True,
+        )
+        solve_matrix(m)
+        duals = utilities.constraint_duals(m, "Zone_Energy_Balance")
+        compare(
+            duals.tolist(),
+            [
+                m.dual[m.Zone_Energy_Balance[z, t]]
+                / m.bring_timepoint_costs_to_base_year[t]
+                for z, t in m.Zone_Energy_Balance.index_set()
+            ],
+        )
+        # results are cached until the next solve
+        self.assertIs(utilities.constraint_duals(m, m.Zone_Energy_Balance), duals)
+        solve_matrix(m)
+        self.assertIsNot(utilities.constraint_duals(m, m.Zone_Energy_Balance), duals)
+
+    def test_expression_values(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        from pyomo.environ import value
+        from switch_model.matrix import solve_matrix
+
+        m = switch_model.solve.main(
+            args=[
+                "--inputs-dir",
+                os.path.join(
+                    os.path.dirname(__file__), "..", "examples", "carbon_cap", "inputs"
+                ),
+                "--log-level",
+                "error",
+            ],
+            return_instance=True,
+        )
+        solve_matrix(m)
+        for name in ["SystemCostPerPeriod", "GenCapacity", "DispatchEmissions"]:
+            e = getattr(m, name)
+            for actual, expected in zip(
+                utilities.expression_values(m, name).tolist(),
+                [value(e[k]) for k in e],
+            ):
+                self.assertAlmostEqual(actual, expected, delta=1e-9 * abs(expected))
+
+    def test_telemetry(self):
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            self.skipTest("scipy 1.9 or later is not available")
+        import json
+        from switch_model.matrix import solve_matrix
+
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            telemetry_file = os.path.join(temp_dir, "telemetry.jsonl")
+            m = switch_model.solve.main(
+                args=[
+                    "--inputs-dir",
+                    os.path.join(
+                        os.path.dirname(__file__),
+                        "..",
+                        "examples",
+                        "carbon_cap",
+                        "inputs",
+                    ),
+                    "--log-level",
+                    "error",
+                    "--scenario-name",
+                    "test",
+                    "--telemetry-file",
+                    telemetry_file,
+                ],
+                return_instance=True,
+            )
+            solve_matrix(m)
+            m.options.post_solve_jobs = 2
+            m.post_solve(os.path.join(temp_dir, "outputs"))
+            with open(telemetry_file) as f:
+                records = [json.loads(line) for line in f]
+        finally:
+            shutil.rmtree(temp_dir)
+        # post_solve CPU time is reported per module, whether or not the
+        # module runs in a child process
+        post_solve = [r for r in records if r["phase"] == "post_solve"]
+        self.assertTrue(post_solve)
+        self.assertTrue(all(r["cpu_time_s"] >= 0 for r in post_solve))
+        compare(
+            [r["phase"] for r in records if r["module"] is None],
+            [
+                "define_model",
+                "read_inputs",
+                "construct_instance",
+                "pre_solve",
+                "assemble_matrix",
+                "solver",
+                "load_solution",
+            ],
+        )
+        self.assertIn(
+            "switch_model.timescales",
+            [r["module"] for r in records if r["phase"] == "load_inputs"],
+        )
+        for r in records:
+            self.assertEqual(r["scenario_name"], "test")
+            self.assertGreaterEqual(r["wall_time_s"], 0)
+        self.assertEqual(
+            [r for r in records if r["module"] is None][-1]["constraints"],
+            m.model_size["constraints"],
+        )
+
+    def test_save_and_load_solution(self):
+        from pyomo.environ import ConcreteModel, Constraint, Set, Suffix, Var
+        from switch_model.solve import save_solution, load_solution
+
+        def make_model():
+            m = ConcreteModel()
+            m.A = Set(dimen=2, initialize=[("a", 1), ("b", 2), ("c", 3)])
+            m.x = Var(m.A)
+            m.y = Var()
+            m.c = Constraint(m.A, rule=lambda m, a, i: m.x[a, i] >= m.y)
+            m.dual = Suffix(direction=Suffix.IMPORT)
+            return m
+
+        m = make_model()
+        m.x["a", 1] = 1.5
+        m.x["b", 2] = 3  # int, e.g., fixed var
+        m.y = -2.25
+        m.dual[m.c["c", 3]] = 7.5
+        temp_dir = tempfile.mkdtemp(prefix="switch_test_")
+        try:
+            save_solution(m, temp_dir)
+            m2 = make_model()
+            load_solution(m2, temp_dir)
+        finally:
+            shutil.rmtree(temp_dir)
+        compare(
+            [v.value for v in m2.x.values()] + [m2.y.value],
+            [1.5, 3, None, -2.25],
+        )
+        self.assertIs(type(m2.x["b", 2].value), int)
+        compare(
+            {c.name: v for c, v in m2.dual.items()},
+            {"c[c,3]": 7.5},
+        )
+
     def test_check_mandatory_components(self):
         from pyomo.environ import ConcreteModel, Param, Set, Any
         from switch_model.utilities import check_mandatory_components